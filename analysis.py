@@ -0,0 +1,226 @@
+"""
+시나리오 질의 엔진.
+전체 궤적을 만들지 않고 위험 기준 도달 시각, 최소/최대 농도, 추세 기울기를 계산한다.
+물질수지 모델은 해석해로, 그 밖의 모델은 시뮬레이터 커널에 대한 이분 탐색으로 답한다.
+모든 질의는 run_simulation_batch와 같은 열(column) 입력을 받아 여러 시나리오를 한 번에 처리한다.
+"""
+import numpy as np
+
+from simulator import (
+    BASE_CO2_PCT,
+    BASE_O2_PCT,
+    DANGER_CO2_PCT,
+    DANGER_O2_PCT,
+    _as_columns,
+    _get_model,
+    _mass_balance_rates,
+    _n_steps,
+)
+
+
+class _Scenarios:
+    """질의용으로 정리한 시나리오 열 묶음"""
+    def __init__(self, room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model):
+        (room_volume_m3, people, plants, ach, duration_min, dt_min, light_on) = _as_columns(
+            room_volume_m3, people, plants, ach, duration_min, dt_min, light_on
+        )
+        self.model = model
+        self.kernel = _get_model(model)
+        self.room_volume_m3 = room_volume_m3.astype(float)
+        self.people = people
+        self.plants = plants
+        self.ach = ach.astype(float)
+        self.duration_min = duration_min.astype(float)
+        self.dt_min = dt_min.astype(float)
+        self.light_on = light_on.astype(bool)
+        self.n_steps = _n_steps(duration_min, dt_min)
+
+    def __len__(self):
+        return len(self.n_steps)
+
+    def evaluate(self, step_idx):
+        """(N, K) 스텝 번호에서의 O2/CO2 값"""
+        return self.kernel(
+            step_idx * self.dt_min[:, None],
+            self.room_volume_m3[:, None],
+            self.people[:, None],
+            self.plants[:, None],
+            self.ach[:, None],
+            self.duration_min[:, None],
+            self.light_on[:, None],
+        )
+
+
+def _first_true_index(check, n_steps, n_coarse=64):
+    """
+    check(step_idx)가 처음 참이 되는 스텝 번호 (없으면 -1).
+    성긴 표본으로 구간을 잡은 뒤 그 안에서 이분 탐색하므로
+    시나리오마다 n_coarse + log2(n_steps) 번만 평가한다.
+    """
+    rows = np.arange(len(n_steps))
+    coarse = np.round(np.linspace(0.0, 1.0, n_coarse + 1)[None, :] * n_steps[:, None]).astype(int)
+    hit = check(coarse)
+    found = hit.any(axis=1)
+    j = np.argmax(hit, axis=1)
+
+    # 불변식: lo는 거짓(또는 -1), hi는 참
+    hi = coarse[rows, j]
+    lo = np.where(j > 0, coarse[rows, j - 1], -1)
+    active = found & (hi - lo > 1)
+    while np.any(active):
+        mid = np.where(active, (lo + hi) // 2, hi)
+        ok = check(mid[:, None])[:, 0]
+        hi = np.where(active & ok, mid, hi)
+        lo = np.where(active & ~ok, mid, lo)
+        active = found & (hi - lo > 1)
+    return np.where(found, hi, -1)
+
+
+def _exp_first_rise(c0, c_out, rate, lam, threshold):
+    """
+    C(t) = C_ss + (C0 - C_ss) e^(-λt) 가 처음 threshold를 넘는 연속 시각 (없으면 inf).
+    λ = 0 이면 C(t) = C0 + rate * t.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_lam = np.where(lam > 0, lam, 1.0)
+        c_ss = c_out + rate / safe_lam
+        t_decay = np.where(c_ss > threshold, np.log((c_ss - c0) / (c_ss - threshold)) / safe_lam, np.inf)
+        t_linear = np.where(rate > 0, (threshold - c0) / np.where(rate > 0, rate, 1.0), np.inf)
+    t = np.where(lam > 0, t_decay, t_linear)
+    return np.where(c0 > threshold, 0.0, t)
+
+
+def _mass_balance_first_index(scenarios, check, c0, c_out, rate, threshold):
+    """해석해로 구한 도달 시각을 시간 격자로 옮기고, 반올림 오차는 앞뒤 한 칸 확인으로 보정"""
+    lam = scenarios.ach / 60.0
+    t_cross = _exp_first_rise(c0, c_out, rate, lam, threshold)
+    reachable = np.isfinite(t_cross) & (t_cross <= scenarios.duration_min + scenarios.dt_min)
+    est = np.where(reachable, np.ceil(np.where(reachable, t_cross, 0.0) / scenarios.dt_min), 0).astype(int)
+    est = np.minimum(est, scenarios.n_steps)
+
+    est = np.where(check(est[:, None])[:, 0], est, est + 1)
+    prev = np.maximum(est - 1, 0)
+    est = np.where((est > 0) & check(prev[:, None])[:, 0], prev, est)
+
+    inside = est <= scenarios.n_steps
+    ok = check(np.minimum(est, scenarios.n_steps)[:, None])[:, 0]
+    return np.where(reachable & inside & ok, est, -1)
+
+
+def first_crossing_times(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on,
+                         model="linear", o2_threshold=DANGER_O2_PCT, co2_threshold=DANGER_CO2_PCT):
+    """
+    O2가 기준 미만, CO2가 기준 초과가 되는 첫 시각(분)을 시나리오별 배열로 반환한다.
+    시간은 run_simulation과 같은 dt_min 격자 위의 값이며, 기간 안에 넘지 않으면 NaN.
+    """
+    scenarios = _Scenarios(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model)
+
+    def o2_check(idx):
+        return scenarios.evaluate(idx)[0] < o2_threshold
+
+    def co2_check(idx):
+        return scenarios.evaluate(idx)[1] > co2_threshold
+
+    if model == "mass_balance":
+        o2_rate, co2_rate = _mass_balance_rates(
+            scenarios.room_volume_m3, scenarios.people, scenarios.plants, scenarios.light_on
+        )
+        # O2 하강은 부호를 뒤집어 "처음 넘는" 문제로 바꾼다
+        o2_idx = _mass_balance_first_index(scenarios, o2_check, -BASE_O2_PCT, -BASE_O2_PCT, -o2_rate, -o2_threshold)
+        co2_idx = _mass_balance_first_index(scenarios, co2_check, BASE_CO2_PCT, BASE_CO2_PCT, co2_rate, co2_threshold)
+    else:
+        o2_idx = _first_true_index(o2_check, scenarios.n_steps)
+        co2_idx = _first_true_index(co2_check, scenarios.n_steps)
+
+    o2_times = np.where(o2_idx >= 0, o2_idx * scenarios.dt_min, np.nan)
+    co2_times = np.where(co2_idx >= 0, co2_idx * scenarios.dt_min, np.nan)
+    return o2_times, co2_times
+
+
+def _scan(scenarios, chunk_size=4096):
+    """시간 축을 chunk 단위로 훑으며 최소/최대와 회귀용 합계를 누적한다 (궤적 전체는 만들지 않음)"""
+    n = len(scenarios)
+    stats = {
+        "o2_min": np.full(n, np.inf),
+        "co2_max": np.full(n, -np.inf),
+        "count": np.zeros(n),
+        "t": np.zeros(n),
+        "tt": np.zeros(n),
+        "o2": np.zeros(n),
+        "co2": np.zeros(n),
+        "t_o2": np.zeros(n),
+        "t_co2": np.zeros(n),
+    }
+    for start in range(0, int(scenarios.n_steps.max()) + 1, chunk_size):
+        step_idx = np.arange(start, min(start + chunk_size, int(scenarios.n_steps.max()) + 1))[None, :]
+        valid = step_idx <= scenarios.n_steps[:, None]
+        times = np.where(valid, step_idx * scenarios.dt_min[:, None], 0.0)
+        o2, co2 = scenarios.evaluate(step_idx)
+        o2 = np.where(valid, o2, 0.0)
+        co2 = np.where(valid, co2, 0.0)
+
+        stats["o2_min"] = np.minimum(stats["o2_min"], np.where(valid, o2, np.inf).min(axis=1))
+        stats["co2_max"] = np.maximum(stats["co2_max"], np.where(valid, co2, -np.inf).max(axis=1))
+        stats["count"] += valid.sum(axis=1)
+        stats["t"] += times.sum(axis=1)
+        stats["tt"] += (times * times).sum(axis=1)
+        stats["o2"] += o2.sum(axis=1)
+        stats["co2"] += co2.sum(axis=1)
+        stats["t_o2"] += (times * o2).sum(axis=1)
+        stats["t_co2"] += (times * co2).sum(axis=1)
+    return stats
+
+
+def _slope_from_sums(count, t, tt, y, ty):
+    denom = count * tt - t * t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom > 0, (count * ty - t * y) / denom, 0.0)
+
+
+def extrema(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear"):
+    """시나리오별 (O2 최소값, CO2 최대값) 배열"""
+    scenarios = _Scenarios(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model)
+    if model == "mass_balance":
+        # 지수 해는 단조이므로 양 끝점만 보면 된다
+        ends = np.stack([np.zeros_like(scenarios.n_steps), scenarios.n_steps], axis=1)
+        o2, co2 = scenarios.evaluate(ends)
+        return o2.min(axis=1), co2.max(axis=1)
+    stats = _scan(scenarios)
+    return stats["o2_min"], stats["co2_max"]
+
+
+def trend_slopes(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear"):
+    """시나리오별 O2/CO2 1차 회귀 기울기 (%/분), np.polyfit(..., 1)[0]과 같은 값"""
+    scenarios = _Scenarios(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model)
+    stats = _scan(scenarios)
+    o2_slope = _slope_from_sums(stats["count"], stats["t"], stats["tt"], stats["o2"], stats["t_o2"])
+    co2_slope = _slope_from_sums(stats["count"], stats["t"], stats["tt"], stats["co2"], stats["t_co2"])
+    return o2_slope, co2_slope
+
+
+# --- 이미 계산된 결과(SimulationResult)에 대한 벡터 연산 ---
+
+def first_crossing_time(times_min, values, threshold, below=False):
+    """values가 처음 threshold를 넘는(below=True면 미만이 되는) 시각, 없으면 None"""
+    values = np.asarray(values)
+    mask = values < threshold if below else values > threshold
+    idx = np.flatnonzero(mask)
+    return float(np.asarray(times_min)[idx[0]]) if idx.size else None
+
+
+def linear_slope(times_min, values):
+    """1차 회귀 기울기 (np.polyfit(times, values, 1)[0]의 닫힌 형태)"""
+    t = np.asarray(times_min, dtype=float)
+    y = np.asarray(values, dtype=float)
+    return float(_slope_from_sums(len(t), t.sum(), (t * t).sum(), y.sum(), (t * y).sum()))
+
+
+def summarize_result(sim, o2_threshold=DANGER_O2_PCT, co2_threshold=DANGER_CO2_PCT):
+    """자동 분석에 필요한 지표를 한 번에 계산"""
+    return {
+        "o2_min": float(np.min(sim.o2_pct)),
+        "co2_max": float(np.max(sim.co2_pct)),
+        "o2_danger_time": first_crossing_time(sim.times_min, sim.o2_pct, o2_threshold, below=True),
+        "co2_danger_time": first_crossing_time(sim.times_min, sim.co2_pct, co2_threshold),
+        "co2_slope": linear_slope(sim.times_min, sim.co2_pct),
+    }
@@ -1,19 +1,14 @@
 import streamlit as st
-import json
-import os
 
-USER_DB = "users.json"
+from passwords import hash_password, verify_password
+from scenario_store import get_scenario_store
+from user_store import get_user_store
 
-def load_users():
-    if os.path.exists(USER_DB):
-        with open(USER_DB, "r") as f:
-            return json.load(f)
-    else:
-        return {}
+# 사용자 정보는 SQLite 저장소(user_store)에 두고, 기존 users.json은 처음 열 때 옮겨 온다
 
-def save_users(users):
-    with open(USER_DB, "w") as f:
-        json.dump(users, f, indent=2)
+def load_users():
+    """전체 사용자 dict (users.json과 같은 형식)"""
+    return get_user_store().users()
 
 def signup():
     st.subheader("회원가입")
@@ -29,13 +24,10 @@ def signup():
             st.error("비밀번호가 일치하지 않습니다.")
             return None
 
-        users = load_users()
-        if new_user in users:
+        if not get_user_store().add(new_user, hash_password(new_pw)):
             st.error("이미 존재하는 아이디입니다.")
             return None
 
-        users[new_user] = {"password": new_pw}
-        save_users(users)
         st.success("회원가입이 완료되었습니다! 로그인 탭에서 로그인하세요.")
         return new_user
     return None
@@ -46,8 +38,13 @@ def login():
     pw = st.text_input("비밀번호", type="password", key="login_pw")
 
     if st.button("로그인"):
-        users = load_users()
-        if user in users and users[user]["password"] == pw:
+        store = get_user_store()
+        stored = store.get_password(user)
+        ok, needs_rehash = verify_password(stored, pw)
+        if ok:
+            # 평문이거나 예전 설정으로 만든 해시는 로그인에 성공한 김에 새 해시로 바꿔 둔다
+            if needs_rehash:
+                store.set_password(user, hash_password(pw))
             st.success(f"{user}님 환영합니다!")
             return user
         else:
@@ -56,47 +53,22 @@ def login():
     return None
 
 # --- 시나리오 저장 및 불러오기 함수 ---
-SCENARIO_DIR = "user_scenarios"
+# 시나리오는 SQLite 저장소(scenario_store)에 두고, 기존 user_scenarios/ JSON 파일은 처음 열 때 옮겨 온다
 
-def save_scenario(user, scenario_name, inputs, favorite=False):
-    user_dir = os.path.join(SCENARIO_DIR, user)
-    os.makedirs(user_dir, exist_ok=True)
-    filepath = os.path.join(user_dir, f"{scenario_name}.json")
-
-    data = {
-        "inputs": inputs,
-        "favorite": favorite
-    }
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+def save_scenario(user, scenario_name, inputs, favorite=False, result=None):
+    """result에 이 입력으로 계산한 SimulationResult를 주면 함께 저장한다"""
+    get_scenario_store().save(user, scenario_name, inputs, favorite=favorite, result=result)
 
 def load_scenarios(user):
     """사용자 시나리오 목록과 즐겨찾기 목록 반환"""
-    user_dir = os.path.join(SCENARIO_DIR, user)
-    if not os.path.exists(user_dir):
-        return [], []
-
-    scenario_files = [f for f in os.listdir(user_dir) if f.endswith(".json")]
-    all_scenarios = []
-    favorite_scenarios = []
-    for f in scenario_files:
-        filepath = os.path.join(user_dir, f)
-        with open(filepath, "r", encoding="utf-8") as file:
-            data = json.load(file)
-            name = f[:-5]  # .json 제거
-            all_scenarios.append(name)
-            if data.get("favorite", False):
-                favorite_scenarios.append(name)
-    return all_scenarios, favorite_scenarios
+    return get_scenario_store().list(user)
 
 def load_scenario(user, scenario_name):
-    user_dir = os.path.join(SCENARIO_DIR, user)
-    filepath = os.path.join(user_dir, f"{scenario_name}.json")
-    if not os.path.exists(filepath):
-        return None
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get("inputs", None)
+    return get_scenario_store().load(user, scenario_name)
+
+def load_scenario_result(user, scenario_name):
+    """시나리오와 함께 저장된 시뮬레이션 결과, 없으면 None"""
+    return get_scenario_store().load_result(user, scenario_name)
 
 # --- 시뮬레이터 입력 받는 함수 예시 ---
 def get_inputs():
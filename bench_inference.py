@@ -0,0 +1,124 @@
+"""
+전체 모델과 CPU 서빙용 경량 모델(평탄화 RF, TFLite LSTM)의 추론 비교.
+학습에서 제외한 뒤쪽 시나리오(prediction.HOLDOUT_SCENARIOS)의 1스텝 윈도우로 지연 시간, 메모리, 정확도를 잰다.
+모델이 저장소에 없으면 먼저 학습/변환한다.
+전체 LSTM은 MC Dropout 평균을 내므로 TFLite와의 차이에는 dropout 표본 차이도 들어 있다.
+
+    python bench_inference.py [--model rf|lstm|all] [--rows 1024] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# 새 프로세스에서 모델 하나만 불러와 한 번 예측했을 때의 최대 RSS.
+# ru_maxrss는 fork한 부모의 값을 이어받으므로 리눅스에서는 /proc의 VmHWM을 쓴다.
+_PROBE = """
+import json, resource, sys
+import numpy as np
+import prediction
+model, predict_fn, layout, _ = prediction._load_model({model_type!r}, "recursive", "mass_balance", {runtime!r})
+x = np.zeros({shape!r}, dtype=np.float32)
+predict_fn(model, x)
+try:
+    with open("/proc/self/status") as f:
+        max_rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+except OSError:
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{
+    "max_rss_mb": max_rss_mb,
+    "tensorflow_loaded": "tensorflow" in sys.modules,
+    "sklearn_loaded": "sklearn" in sys.modules,
+}}))
+"""
+
+
+def _probe_memory(model_type, runtime, shape):
+    # 저장소(model_store)는 현재 작업 디렉터리 기준이므로 cwd는 그대로 두고 import 경로만 넘긴다
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3", PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    code = _PROBE.format(model_type=model_type, runtime=runtime, shape=(1,) + tuple(shape[1:]))
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _holdout(model_type, n_rows):
+    from dataset import make_sequences, make_windows
+    from prediction import N_LAGS, holdout_scenarios
+
+    trajectories, params = (np.asarray(a) for a in holdout_scenarios())
+    if model_type == "lstm":
+        X, y = make_sequences(trajectories, params, N_LAGS)
+    else:
+        X, y = make_windows(trajectories[:, :, 0], trajectories[:, :, 1], params, N_LAGS)
+    idx = np.random.default_rng(0).choice(len(X), min(n_rows, len(X)), replace=False)
+    return X[idx], y[idx]
+
+
+def _latency_ms(predict_fn, model, X, repeat):
+    predict_fn(model, X)  # 준비 (인터프리터 생성, 첫 호출 그래프 추적 등)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict_fn(model, X)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def run_benchmark(model_types=("rf", "lstm"), n_rows=1024, repeat=20):
+    from model_registry import unload_models
+    from prediction import _load_model
+
+    # 먼저 모든 모델을 학습/변환해 저장해 두고, 측정은 한 번에 한 모델만 메모리에 올려서 한다
+    for model_type in model_types:
+        for runtime in ("full", "lite"):
+            _load_model(model_type, "recursive", "mass_balance", runtime)
+            unload_models()
+
+    results = []
+    for model_type in model_types:
+        X, y = _holdout(model_type, n_rows)
+        full_pred = None
+        for runtime in ("full", "lite"):
+            memory = _probe_memory(model_type, runtime, X.shape)
+            model, predict_fn, _, _ = _load_model(model_type, "recursive", "mass_balance", runtime)
+            pred, _ = predict_fn(model, X)
+            if full_pred is None:
+                full_pred = pred
+            results.append({
+                "model": f"{model_type} ({runtime})",
+                "latency_1_ms": _latency_ms(predict_fn, model, X[:1], repeat),
+                "latency_batch_ms": _latency_ms(predict_fn, model, X, max(1, repeat // 4)),
+                "rmse_o2": float(np.sqrt(np.mean((pred[:, 0] - y[:, 0]) ** 2))),
+                "rmse_co2": float(np.sqrt(np.mean((pred[:, 1] - y[:, 1]) ** 2))),
+                "max_diff_vs_full": float(np.max(np.abs(pred - full_pred))),
+                **memory,
+            })
+            del model
+            unload_models()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", choices=["rf", "lstm", "all"], default="all")
+    parser.add_argument("--rows", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    model_types = ("rf", "lstm") if args.model == "all" else (args.model,)
+    results = run_benchmark(model_types, args.rows, args.repeat)
+    print(f"{'모델':<14}{'1행(ms)':>10}{f'{args.rows}행(ms)':>12}{'RMSE O2':>10}{'RMSE CO2':>10}"
+          f"{'전체 대비 최대 차이':>14}{'최대 RSS(MB)':>14}{'TF':>5}{'sklearn':>9}")
+    for r in results:
+        print(f"{r['model']:<14}{r['latency_1_ms']:>10.2f}{r['latency_batch_ms']:>12.2f}"
+              f"{r['rmse_o2']:>10.4f}{r['rmse_co2']:>10.5f}{r['max_diff_vs_full']:>14.2e}{r['max_rss_mb']:>14.0f}"
+              f"{'O' if r['tensorflow_loaded'] else '-':>5}{'O' if r['sklearn_loaded'] else '-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+비밀번호 해시 방식/작업량별 로그인 처리량.
+방식과 작업량마다 해시 하나를 만들어 두고 정해진 시간 동안 verify_password를 반복해
+코어 하나당 초당 로그인 수와 검증 1회 지연 시간을 잰다.
+--processes를 주면 그 수만큼 프로세스에서 동시에 돌려 전체 처리량도 함께 본다.
+
+    python bench_password.py [--seconds 2] [--processes 1]
+"""
+import argparse
+import multiprocessing
+import time
+
+from passwords import hash_password, verify_password
+
+# (방식, 작업량) 목록: scrypt는 log2 N, pbkdf2는 반복 수, argon2는 time_cost
+SETTINGS = [
+    ("scrypt", 12), ("scrypt", 14), ("scrypt", 16),
+    ("pbkdf2_sha256", 100_000), ("pbkdf2_sha256", 310_000), ("pbkdf2_sha256", 600_000),
+    ("argon2", 1), ("argon2", 3),
+]
+
+
+def _verify_loop(stored, scheme, cost, seconds):
+    n = 0
+    start = time.perf_counter()
+    while True:
+        ok, _ = verify_password(stored, "correct horse", scheme=scheme, cost=cost)
+        assert ok
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return n, elapsed
+
+
+def run_benchmark(settings=SETTINGS, seconds=2.0, n_processes=1):
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(n_processes) as pool:
+        for scheme, cost in settings:
+            try:
+                stored = hash_password("correct horse", scheme=scheme, cost=cost)
+            except ImportError as e:
+                results.append({"scheme": scheme, "cost": cost, "error": str(e)})
+                continue
+            runs = pool.starmap(_verify_loop, [(stored, scheme, cost, seconds)] * n_processes)
+            total = sum(n / elapsed for n, elapsed in runs)
+            results.append({
+                "scheme": scheme,
+                "cost": cost,
+                "logins_per_s": total,
+                "logins_per_s_per_core": total / n_processes,
+                "latency_ms": 1000 * sum(elapsed / n for n, elapsed in runs) / n_processes,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'방식':<16}{'작업량':>10}{'검증(ms)':>10}{'로그인/초/코어':>16}{'로그인/초 (전체)':>18}")
+    for r in run_benchmark(seconds=args.seconds, n_processes=args.processes):
+        if "error" in r:
+            print(f"{r['scheme']:<16}{r['cost']:>10}  건너뜀: {r['error']}")
+            continue
+        print(f"{r['scheme']:<16}{r['cost']:>10}{r['latency_ms']:>10.1f}"
+              f"{r['logins_per_s_per_core']:>16.1f}{r['logins_per_s']:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
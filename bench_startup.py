@@ -0,0 +1,77 @@
+"""
+앱 시작 비용 측정.
+매번 새 파이썬 프로세스에서 simulator_app을 import한 뒤 (Streamlit 앱 시작과 같은 import 경로),
+AI 탭을 처음 사용할 때 불러오는 ML 백엔드까지 import했을 때의 시간과 최대 메모리(RSS)를 비교한다.
+
+    python bench_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 시나리오 이름 -> AI 탭에서 추가로 불러오는 백엔드 모듈
+SCENARIOS = {
+    "앱 시작 (AI 탭 미사용)": [],
+    "AI 탭 사용 (rf)": ["sklearn.ensemble", "joblib"],
+    "AI 탭 사용 (lstm)": ["tensorflow"],
+}
+
+_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import simulator_app
+t1 = time.perf_counter()
+for name in {backends!r}:
+    __import__(name)
+t2 = time.perf_counter()
+print(json.dumps({{
+    "app_s": t1 - t0,
+    "backend_s": t2 - t1,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "tensorflow_loaded": "tensorflow" in sys.modules,
+    "sklearn_loaded": "sklearn" in sys.modules,
+}}))
+"""
+
+
+def _probe(backends):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(backends=backends)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(repeat=3):
+    results = {}
+    for name, backends in SCENARIOS.items():
+        runs = [_probe(backends) for _ in range(repeat)]
+        results[name] = {
+            "app_s": statistics.median(r["app_s"] for r in runs),
+            "backend_s": statistics.median(r["backend_s"] for r in runs),
+            "max_rss_mb": statistics.median(r["max_rss_mb"] for r in runs),
+            "tensorflow_loaded": runs[-1]["tensorflow_loaded"],
+            "sklearn_loaded": runs[-1]["sklearn_loaded"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat)
+    print(f"{'시나리오':<24}{'앱 import(s)':>14}{'백엔드(s)':>12}{'최대 RSS(MB)':>14}{'TF':>5}{'sklearn':>9}")
+    for name, r in results.items():
+        print(f"{name:<24}{r['app_s']:>14.2f}{r['backend_s']:>12.2f}{r['max_rss_mb']:>14.0f}"
+              f"{'O' if r['tensorflow_loaded'] else '-':>5}{'O' if r['sklearn_loaded'] else '-':>9}")
+
+
+if __name__ == "__main__":
+    main()
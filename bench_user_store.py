@@ -0,0 +1,132 @@
+"""
+사용자 저장소 동시 가입 부하 테스트.
+여러 프로세스 x 스레드가 동시에 서로 다른 아이디로 가입하고, 같은 아이디 하나를 모두가 가입 시도한다.
+끝난 뒤 사라진 사용자와 중복 가입이 없는지 확인하고, 가입/로그인 처리량과
+기존 방식(users.json 전체를 읽고 다시 쓰기)의 결과를 함께 보여 준다.
+임시 디렉터리에서 실행하므로 현재 디렉터리의 users.db / users.json은 건드리지 않는다.
+
+    python bench_user_store.py [--processes 4] [--threads 8] [--signups 200]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SHARED_USER = "shared"
+
+
+def _json_signup(path, user, password):
+    # 기존 auth_and_scenario의 load_users / save_users와 같은 방식
+    users = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                users = json.load(f)
+        except json.JSONDecodeError:
+            # 다른 쓰기가 진행 중인 파일을 읽은 경우
+            users = {}
+    if user in users:
+        return False
+    users[user] = {"password": password}
+    with open(path, "w") as f:
+        json.dump(users, f, indent=2)
+    return True
+
+
+def _worker(backend, path, worker_id, n_threads, n_signups):
+    """한 프로세스: n_threads개 스레드가 각자 n_signups명 가입 + 공유 아이디 가입 시도"""
+    from user_store import UserStore
+
+    store = UserStore(path, json_path="") if backend == "sqlite" else None
+
+    def signup(user):
+        if store is not None:
+            return store.add(user, "pw")
+        return _json_signup(path, user, "pw")
+
+    def run_thread(thread_id):
+        created = 0
+        for i in range(n_signups):
+            created += signup(f"user-{worker_id}-{thread_id}-{i}")
+        shared = signup(SHARED_USER)
+        return created, int(shared)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as pool:
+        results = list(pool.map(run_thread, range(n_threads)))
+    elapsed = time.perf_counter() - start
+    return sum(r[0] for r in results), sum(r[1] for r in results), elapsed
+
+
+def _count_users(backend, path):
+    if backend == "sqlite":
+        from user_store import UserStore
+        return len(UserStore(path, json_path=""))
+    with open(path, "r") as f:
+        return len(json.load(f))
+
+
+def _login_rate(path, n_lookups=100_000):
+    from user_store import UserStore
+
+    store = UserStore(path, json_path="")
+    users = list(store.users())
+    for user in users:  # 캐시 준비
+        store.get_password(user)
+    start = time.perf_counter()
+    for i in range(n_lookups):
+        store.get_password(users[i % len(users)])
+    return n_lookups / (time.perf_counter() - start)
+
+
+def run_load_test(backend, n_processes=4, n_threads=8, n_signups=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.db" if backend == "sqlite" else "users.json")
+        if backend == "sqlite":
+            from user_store import UserStore
+            UserStore(path, json_path="")  # 스키마를 먼저 만들어 둔다
+
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        with ctx.Pool(n_processes) as pool:
+            results = pool.starmap(
+                _worker, [(backend, path, w, n_threads, n_signups) for w in range(n_processes)]
+            )
+        elapsed = time.perf_counter() - start
+
+        expected = n_processes * n_threads * n_signups + 1
+        stored = _count_users(backend, path)
+        return {
+            "backend": backend,
+            "expected": expected,
+            "stored": stored,
+            "reported_created": sum(r[0] for r in results),
+            "shared_created": sum(r[1] for r in results),
+            "signups_per_s": (expected - 1) / max(r[2] for r in results),
+            "elapsed_s": elapsed,
+            "logins_per_s": _login_rate(path) if backend == "sqlite" else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--signups", type=int, default=200, help="스레드당 가입 수")
+    args = parser.parse_args()
+
+    for backend in ("json", "sqlite"):
+        r = run_load_test(backend, args.processes, args.threads, args.signups)
+        print(f"[{r['backend']}] 저장된 사용자 {r['stored']}/{r['expected']} "
+              f"(가입 성공 보고 {r['reported_created']}, 공유 아이디 가입 성공 {r['shared_created']}회), "
+              f"가입 {r['signups_per_s']:.0f}건/초, 전체 {r['elapsed_s']:.1f}초")
+        if r["logins_per_s"] is not None:
+            print(f"[{r['backend']}] 로그인 조회 {r['logins_per_s']:.0f}건/초 (캐시)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+시뮬레이터 기반 학습 데이터 생성.
+시나리오 파라미터를 무작위로 뽑아 run_simulation_batch로 한꺼번에 계산하고,
+과거 O2/CO2(lag)와 방 조건을 feature로, horizon 스텝 뒤의 O2/CO2를 target으로 하는
+윈도우 데이터를 디스크의 메모리 맵(.npy) 파일에 chunk 단위로 기록한다.
+
+    datasets/<이름>/trajectories.npy  (시나리오, 시간, [O2, CO2])
+                    params.npy        (시나리오, 방 조건)
+                    X.npy, y.npy      (행, feature) / (행, target)
+                    meta.json
+"""
+import json
+import os
+
+import numpy as np
+
+from simulator import run_simulation_batch
+
+DATASET_DIR = "datasets"
+
+# 방 조건 feature (순서가 곧 열 순서)
+PARAM_NAMES = ["room_volume_m3", "people", "plants", "ach", "light_on", "dt_min"]
+TARGET_NAMES = ["oxygen", "co2"]
+
+
+def feature_names(n_lags):
+    """lag는 오래된 값부터 (lag n_lags-1 ... lag 0 = 현재)"""
+    o2 = [f"oxygen_lag{k}" for k in range(n_lags - 1, -1, -1)]
+    co2 = [f"co2_lag{k}" for k in range(n_lags - 1, -1, -1)]
+    return o2 + co2 + PARAM_NAMES
+
+
+def _with_horizons(schema, n_horizons):
+    # 1스텝 모델의 스키마(저장소 키)는 그대로 두고 다중 출력 모델에만 출력 스텝 수를 기록한다
+    if n_horizons > 1:
+        schema["n_horizons"] = n_horizons
+    return schema
+
+
+def feature_schema(n_lags, horizon, model="mass_balance", n_horizons=1):
+    """model_registry 키로 쓰는 입력/출력 구성"""
+    return _with_horizons({
+        "features": feature_names(n_lags),
+        "targets": TARGET_NAMES,
+        "n_lags": n_lags,
+        "horizon": horizon,
+        "sim_model": model,
+    }, n_horizons)
+
+
+def sequence_schema(window, horizon, model="mass_balance", n_horizons=1):
+    """LSTM용 입력/출력 구성. 입력은 시점마다 [O2, CO2, 방 조건]인 (window, feature) 시퀀스"""
+    return _with_horizons({
+        "layout": "sequence",
+        "step_features": TARGET_NAMES + PARAM_NAMES,
+        "targets": TARGET_NAMES,
+        "window": window,
+        "horizon": horizon,
+        "sim_model": model,
+    }, n_horizons)
+
+
+def sample_scenarios(n, rng):
+    """get_inputs 입력 범위 안에서 방 조건을 무작위로 뽑는다"""
+    return {
+        "room_volume_m3": rng.uniform(5.0, 200.0, n),
+        "people": rng.integers(0, 11, n),
+        "plants": rng.integers(0, 21, n),
+        "ach": rng.lognormal(np.log(0.7), 0.8, n),
+        "light_on": rng.random(n) < 0.5,
+        "dt_min": np.round(rng.uniform(0.1, 5.0, n), 1),
+    }
+
+
+def params_matrix(room_volume_m3, people, plants, ach, light_on, dt_min):
+    """방 조건을 PARAM_NAMES 순서의 (N, P) float32 배열로"""
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=np.float32)) for a in
+                                    (room_volume_m3, people, plants, ach, light_on, dt_min)))
+    return np.stack(columns, axis=1)
+
+
+def _horizon_targets(trajectories, first, n_windows, n_horizons):
+    """
+    윈도우마다 first 스텝부터 n_horizons개 스텝의 [O2, CO2]를 이어 붙인 target.
+    반환: (N * W, n_horizons * 2), 열 순서는 [O2 h1, CO2 h1, O2 h2, CO2 h2, ...]
+    """
+    n, _, n_targets = trajectories.shape
+    # (N, W, target, n_horizons) -> (N, W, n_horizons, target)
+    y = np.lib.stride_tricks.sliding_window_view(trajectories[:, first:first + n_windows + n_horizons - 1],
+                                                 n_horizons, axis=1)
+    return y.transpose(0, 1, 3, 2).reshape(n * n_windows, n_horizons * n_targets)
+
+
+def make_windows(o2, co2, params, n_lags, horizon=1, n_horizons=1):
+    """
+    (N, T) 궤적에서 윈도우 feature/target을 만든다.
+    target은 마지막 lag에서 horizon 스텝 뒤부터 n_horizons개 스텝의 O2/CO2이다.
+    반환: X (N * W, 2 * n_lags + P), y (N * W, 2 * n_horizons),  W = T - n_lags - horizon - n_horizons + 2
+    """
+    n, t = o2.shape
+    span = horizon + n_horizons - 1
+    n_windows = t - n_lags - span + 1
+    if n_windows <= 0:
+        raise ValueError(f"궤적 길이({t})가 n_lags + horizon + n_horizons - 1보다 짧습니다.")
+
+    o2_win = np.lib.stride_tricks.sliding_window_view(o2[:, :t - span], n_lags, axis=1)
+    co2_win = np.lib.stride_tricks.sliding_window_view(co2[:, :t - span], n_lags, axis=1)
+    params_rep = np.broadcast_to(params[:, None, :], (n, n_windows, params.shape[1]))
+
+    X = np.concatenate([o2_win, co2_win, params_rep], axis=2).reshape(n * n_windows, -1)
+    y = _horizon_targets(np.stack([o2, co2], axis=2), n_lags - 1 + horizon, n_windows, n_horizons)
+    return X.astype(np.float32), y.astype(np.float32)
+
+
+def make_sequences(trajectories, params, window, horizon=1, n_horizons=1):
+    """
+    (N, T, 2) 궤적에서 LSTM용 시퀀스 윈도우를 만든다.
+    반환: X (N * W, window, 2 + P), y (N * W, 2 * n_horizons),  W = T - window - horizon - n_horizons + 2
+    """
+    n, t, _ = trajectories.shape
+    span = horizon + n_horizons - 1
+    n_windows = t - window - span + 1
+    if n_windows <= 0:
+        raise ValueError(f"궤적 길이({t})가 window + horizon + n_horizons - 1보다 짧습니다.")
+
+    steps = np.concatenate(
+        [trajectories, np.broadcast_to(params[:, None, :], (n, t, params.shape[1]))], axis=2
+    )
+    # (N, W, feature, window) -> (N * W, window, feature)
+    X = np.lib.stride_tricks.sliding_window_view(steps[:, :t - span], window, axis=1)
+    X = X.transpose(0, 1, 3, 2).reshape(n * n_windows, window, -1)
+    y = _horizon_targets(trajectories, window - 1 + horizon, n_windows, n_horizons)
+    return X.astype(np.float32), y.astype(np.float32)
+
+
+def sequence_moments(trajectories, params):
+    """시퀀스 입력 feature별 평균/분산 (정규화 층 초기값)"""
+    traj = np.asarray(trajectories, dtype=np.float64).reshape(-1, trajectories.shape[2])
+    params = np.asarray(params, dtype=np.float64)
+    # 방 조건은 시나리오 안에서 일정하므로 시나리오 단위 통계가 시점 단위 통계와 같다
+    mean = np.concatenate([traj.mean(axis=0), params.mean(axis=0)])
+    var = np.concatenate([traj.var(axis=0), params.var(axis=0)])
+    return mean.astype(np.float32), var.astype(np.float32)
+
+
+def generate_dataset(name="default", n_scenarios=10000, n_steps=120, n_lags=6, horizon=1,
+                     model="mass_balance", chunk_scenarios=1000, seed=0, root=DATASET_DIR):
+    """
+    시나리오 n_scenarios개를 chunk_scenarios개씩 시뮬레이션해 디스크에 기록한다.
+    모든 시나리오는 자기 dt_min으로 n_steps 스텝을 진행하므로 시나리오당 행 수가 같다.
+    같은 설정으로 이미 만들어진 데이터가 있으면 다시 만들지 않는다.
+    """
+    config = dict(n_scenarios=n_scenarios, n_steps=n_steps, n_lags=n_lags, horizon=horizon,
+                  model=model, seed=seed)
+    path = os.path.join(root, name)
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("config") == config:
+                return path
+    os.makedirs(path, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    n_points = n_steps + 1
+    n_windows = n_points - n_lags - horizon + 1
+    n_features = len(feature_names(n_lags))
+
+    open_memmap = np.lib.format.open_memmap
+    traj = open_memmap(os.path.join(path, "trajectories.npy"), mode="w+", dtype=np.float32,
+                       shape=(n_scenarios, n_points, 2))
+    params_out = open_memmap(os.path.join(path, "params.npy"), mode="w+", dtype=np.float32,
+                             shape=(n_scenarios, len(PARAM_NAMES)))
+    X_out = open_memmap(os.path.join(path, "X.npy"), mode="w+", dtype=np.float32,
+                        shape=(n_scenarios * n_windows, n_features))
+    y_out = open_memmap(os.path.join(path, "y.npy"), mode="w+", dtype=np.float32,
+                        shape=(n_scenarios * n_windows, 2))
+
+    for start in range(0, n_scenarios, chunk_scenarios):
+        stop = min(start + chunk_scenarios, n_scenarios)
+        scen = sample_scenarios(stop - start, rng)
+        batch = run_simulation_batch(
+            scen["room_volume_m3"], scen["people"], scen["plants"], scen["ach"],
+            duration_min=scen["dt_min"] * n_steps, dt_min=scen["dt_min"],
+            light_on=scen["light_on"], model=model,
+        )
+        o2 = batch.o2_pct[:, :n_points]
+        co2 = batch.co2_pct[:, :n_points]
+        params = params_matrix(**scen)
+
+        traj[start:stop, :, 0] = o2
+        traj[start:stop, :, 1] = co2
+        params_out[start:stop] = params
+        X, y = make_windows(o2, co2, params, n_lags, horizon)
+        X_out[start * n_windows:stop * n_windows] = X
+        y_out[start * n_windows:stop * n_windows] = y
+
+    for arr in (traj, params_out, X_out, y_out):
+        arr.flush()
+    del traj, params_out, X_out, y_out
+
+    meta = {
+        "config": config,
+        "schema": feature_schema(n_lags, horizon, model),
+        "param_names": PARAM_NAMES,
+        "n_rows": n_scenarios * n_windows,
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+    return path
+
+
+def load_dataset(path):
+    """메모리 맵으로 연다 (필요한 부분만 디스크에서 읽힌다)"""
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+              for name in ("trajectories", "params", "X", "y")}
+    return arrays, meta
+
+
+def sample_rows(X, y, max_rows, seed=0):
+    """메모리에 올릴 학습 행을 최대 max_rows개로 제한 (정렬된 인덱스로 순차 읽기)"""
+    if len(X) <= max_rows:
+        return np.asarray(X), np.asarray(y)
+    idx = np.sort(np.random.default_rng(seed).choice(len(X), max_rows, replace=False))
+    return X[idx], y[idx]
@@ -0,0 +1,82 @@
+"""
+그래프용 시계열 다운샘플링.
+화면 픽셀 수보다 많은 점을 그려도 보이는 모양은 같으므로, 그리기 전에 점 수를 픽셀 수 정도로 줄인다.
+여러 계열(O2, CO2)이 같은 시간 축을 쓰므로 모두 인덱스를 돌려주고 계열들이 같은 인덱스를 공유한다.
+
+    minmax_indices: 구간마다 각 계열의 최소/최대 점을 남긴다 (급격한 변화/극값 보존, 완전 벡터화)
+    lttb_indices:   Largest-Triangle-Three-Buckets (선 모양 보존, 구간 수만큼 반복)
+"""
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+def _as_series(ys):
+    ys = np.asarray(ys)
+    return ys[None, :] if ys.ndim == 1 else ys
+
+
+def minmax_indices(ys, n_buckets):
+    """
+    ys: (T,) 또는 (K, T). 전체를 n_buckets개 구간으로 나눠 구간마다 계열별 최소/최대 위치를 고른다.
+    첫 점과 마지막 점은 항상 포함한다. 반환: 정렬된 인덱스 (최대 2 * K * n_buckets + 2개)
+    """
+    ys = _as_series(ys)
+    n = ys.shape[1]
+    if n <= 2 * ys.shape[0] * n_buckets + 2:
+        return np.arange(n)
+    bucket = -(-n // n_buckets)
+    # 마지막 구간은 끝 값으로 채워 (K, n_buckets, bucket) 모양으로 한 번에 argmin/argmax
+    padded = np.pad(ys, ((0, 0), (0, bucket * n_buckets - n)), mode="edge").reshape(ys.shape[0], n_buckets, bucket)
+    offsets = np.arange(n_buckets) * bucket
+    picks = np.concatenate([
+        (padded.argmin(axis=2) + offsets).ravel(),
+        (padded.argmax(axis=2) + offsets).ravel(),
+        [0, n - 1],
+    ])
+    return np.unique(np.minimum(picks, n - 1))
+
+
+def _lttb_single(x, y, n_out):
+    n = len(x)
+    bucket_edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+        # 다음 구간의 평균점 (마지막 구간 다음은 마지막 점)
+        next_end = bucket_edges[i + 2] if i + 2 < n_out - 1 else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # 이전에 고른 점, 이번 구간의 후보, 다음 구간 평균점이 만드는 삼각형 넓이(의 2배)가 가장 큰 후보
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(area.argmax())
+        out[i + 1] = prev
+    return out
+
+
+def lttb_indices(x, ys, n_out):
+    """
+    x: (T,), ys: (T,) 또는 (K, T). 계열마다 LTTB로 n_out개를 고르고 합친 인덱스를 반환한다.
+    계열별 값 범위가 달라도 넓이 비교는 계열 안에서만 하므로 따로 정규화하지 않는다.
+    """
+    ys = _as_series(ys)
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    return np.unique(np.concatenate([_lttb_single(x, np.asarray(y, dtype=np.float64), n_out) for y in ys]))
+
+
+def downsample_indices(x, ys, max_points, method="minmax"):
+    """
+    그릴 점이 계열당 대략 max_points개를 넘지 않도록 고른 인덱스.
+    (minmax는 구간당 최소/최대 두 점을 남기므로 구간 수를 max_points의 절반으로 잡는다)
+    """
+    if method == "minmax":
+        return minmax_indices(ys, max(1, max_points // 2))
+    if method == "lttb":
+        return lttb_indices(x, ys, max_points)
+    raise ValueError(f"지원하지 않는 다운샘플링 방식입니다: {method} (가능: {METHODS})")
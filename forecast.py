@@ -0,0 +1,67 @@
+"""
+여러 스텝 앞 예측(rollout).
+N개 시나리오를 한 배치로 묶어 블록마다 모델을 한 번만 호출한다.
+
+    recursive: 1스텝 모델의 예측값을 다음 스텝의 lag 입력으로 다시 넣는다 (스텝마다 1회 호출)
+    direct:    n_horizons 스텝을 한 번에 내는 다중 출력 모델 (n_horizons 스텝마다 1회 호출).
+               예측 구간이 더 길면 마지막 예측값들로 다음 블록의 입력을 만든다.
+"""
+import numpy as np
+
+STRATEGIES = ("recursive", "direct")
+
+
+class BatchForecastResult:
+    """
+    시나리오별 예측 결과를 (N, S) 배열로 묶은 결과.
+    시나리오마다 예측 스텝 수가 다르면 남는 칸은 NaN이고 lengths에 실제 길이를 둔다.
+    """
+    def __init__(self, times_min, o2_pct, co2_pct, o2_std, co2_std, lengths):
+        self.times_min = times_min
+        self.o2_pct = o2_pct
+        self.co2_pct = co2_pct
+        self.o2_std = o2_std
+        self.co2_std = co2_std
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.lengths)
+
+
+def model_inputs(o2_window, co2_window, room, layout="flat"):
+    """
+    (N, L) 최근 O2/CO2 값과 (N, P) 방 조건으로 모델 입력 배치를 만든다.
+    layout="flat"이면 (N, 2L + P) lag feature, "sequence"면 (N, L, 2 + P) 시퀀스.
+    """
+    if layout == "sequence":
+        n, n_lags = o2_window.shape
+        room_steps = np.broadcast_to(room[:, None, :], (n, n_lags, room.shape[1]))
+        steps = np.concatenate([o2_window[:, :, None], co2_window[:, :, None], room_steps], axis=2)
+        return steps.astype(np.float32)
+    return np.concatenate([o2_window, co2_window, room], axis=1).astype(np.float32)
+
+
+def rollout(predict_fn, model, o2_hist, co2_hist, room, n_steps, n_horizons=1, layout="flat"):
+    """
+    마지막 L개 값(o2_hist, co2_hist: (N, L))에서 시작해 n_steps 스텝을 예측한다.
+    predict_fn(model, X)는 (N, 2 * n_horizons) 평균과 표준편차를 돌려주는 함수이다.
+    반환: preds (N, n_steps, 2), std (N, n_steps, 2)
+    """
+    n, n_lags = o2_hist.shape
+    # 관측값과 예측값을 한 버퍼에 이어 써서 다음 블록의 입력 윈도우를 슬라이스로 바로 얻는다
+    o2 = np.empty((n, n_lags + n_steps))
+    co2 = np.empty((n, n_lags + n_steps))
+    o2[:, :n_lags] = o2_hist
+    co2[:, :n_lags] = co2_hist
+    preds = np.empty((n, n_steps, 2))
+    std = np.empty((n, n_steps, 2))
+
+    for start in range(0, n_steps, n_horizons):
+        x = model_inputs(o2[:, start:start + n_lags], co2[:, start:start + n_lags], room, layout)
+        mean, sd = predict_fn(model, x)
+        k = min(n_horizons, n_steps - start)
+        preds[:, start:start + k] = np.reshape(mean, (n, n_horizons, 2))[:, :k]
+        std[:, start:start + k] = np.reshape(sd, (n, n_horizons, 2))[:, :k]
+        o2[:, n_lags + start:n_lags + start + k] = preds[:, start:start + k, 0]
+        co2[:, n_lags + start:n_lags + start + k] = preds[:, start:start + k, 1]
+    return preds, std
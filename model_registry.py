@@ -0,0 +1,201 @@
+"""
+학습된 예측 모델 저장소.
+모델 종류와 입력 스키마(feature 구성)마다 한 번만 학습하고 디스크에 버전별로 저장한 뒤,
+이후 요청에서는 불러와서 추론만 한다.
+
+    model_store/<model_type>/<schema_hash>/v<N>/model.*, meta.json
+
+버전은 같은 위치의 임시 디렉터리에 모두 쓴 뒤 os.rename으로 한 번에 옮기므로,
+다른 스레드/프로세스가 반쯤 쓰인 버전을 읽지 않는다. meta.json이 없는 디렉터리는 버전으로 보지 않는다.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+MODEL_DIR = "model_store"
+REGISTRY_VERSION = 1
+
+
+def _save_joblib(model, path):
+    import joblib
+    joblib.dump(model, path)
+
+
+def _load_joblib(path):
+    import joblib
+    return joblib.load(path)
+
+
+def _save_keras(model, path):
+    model.save(path)
+
+
+def _load_keras(path):
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def _save_self(model, path):
+    model.save(path)
+
+
+def _load_flat_forest(path):
+    from models import FlatForest
+    return FlatForest.load(path)
+
+
+def _load_tflite(path):
+    from models import TFLiteModel
+    return TFLiteModel.load(path)
+
+
+# model_type -> (저장 함수, 불러오기 함수, 파일 이름)
+SERIALIZERS = {
+    "rf": (_save_joblib, _load_joblib, "model.joblib"),
+    "lstm": (_save_keras, _load_keras, "model.keras"),
+    # CPU 서빙용 경량 추론 모델 (models.export_*로 만든 것)
+    "rf_flat": (_save_self, _load_flat_forest, "forest.npz"),
+    "lstm_tflite": (_save_self, _load_tflite, "model.tflite"),
+}
+
+
+def schema_hash(schema):
+    """feature 스키마 dict의 정규화 해시 (앞 16자리)"""
+    canonical = json.dumps(schema, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class ModelRegistry:
+    def __init__(self, root=MODEL_DIR):
+        self.root = root
+        # 이미 불러온 모델은 프로세스 안에서 재사용
+        self._loaded = {}
+        self._lock = threading.Lock()
+        # 같은 모델을 여러 세션이 동시에 학습하지 않도록 학습 구간은 직렬화
+        self._train_lock = threading.Lock()
+
+    def _schema_dir(self, model_type, schema):
+        return os.path.join(self.root, model_type, schema_hash(schema))
+
+    def _versions(self, model_type, schema):
+        schema_dir = self._schema_dir(model_type, schema)
+        if not os.path.exists(schema_dir):
+            return []
+        return sorted(
+            int(d[1:]) for d in os.listdir(schema_dir)
+            if d.startswith("v") and d[1:].isdigit() and os.path.exists(os.path.join(schema_dir, d, "meta.json"))
+        )
+
+    def _serializer(self, model_type):
+        if model_type not in SERIALIZERS:
+            raise ValueError(f"알 수 없는 model_type: {model_type}")
+        return SERIALIZERS[model_type]
+
+    def save(self, model_type, schema, model, extra_meta=None):
+        """새 버전으로 저장하고 메타데이터를 반환"""
+        save_fn, _, filename = self._serializer(model_type)
+        schema_dir = self._schema_dir(model_type, schema)
+        os.makedirs(schema_dir, exist_ok=True)
+        tmp_dir = os.path.join(schema_dir, f".tmp-{os.getpid()}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            save_fn(model, os.path.join(tmp_dir, filename))
+            meta = {
+                "registry_version": REGISTRY_VERSION,
+                "model_type": model_type,
+                "schema": schema,
+                "schema_hash": schema_hash(schema),
+                "version": None,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            meta.update(extra_meta or {})
+            versions = self._versions(model_type, schema)
+            version = versions[-1] + 1 if versions else 1
+            while True:
+                meta["version"] = version
+                with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False, indent=4)
+                version_dir = os.path.join(schema_dir, f"v{version}")
+                if not os.path.exists(version_dir):
+                    try:
+                        os.rename(tmp_dir, version_dir)
+                        break
+                    except OSError:
+                        # 다른 저장이 같은 번호를 먼저 차지함
+                        if not os.path.exists(version_dir):
+                            raise
+                version += 1
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._loaded[(model_type, meta["schema_hash"])] = (model, meta)
+        return meta
+
+    def load_latest(self, model_type, schema):
+        """가장 최근 버전의 (모델, 메타데이터), 저장된 것이 없으면 None"""
+        key = (model_type, schema_hash(schema))
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+
+        versions = self._versions(model_type, schema)
+        if not versions:
+            return None
+        _, load_fn, filename = self._serializer(model_type)
+        version_dir = os.path.join(self._schema_dir(model_type, schema), f"v{versions[-1]}")
+        with open(os.path.join(version_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("registry_version") != REGISTRY_VERSION:
+            return None
+        model = load_fn(os.path.join(version_dir, filename))
+
+        with self._lock:
+            self._loaded[key] = (model, meta)
+        return model, meta
+
+    def unload(self):
+        """메모리에 올려 둔 모델을 모두 내려놓는다 (저장된 파일은 그대로)"""
+        with self._lock:
+            self._loaded.clear()
+
+    def get_or_train(self, model_type, schema, train_fn, extra_meta=None):
+        """저장된 모델이 있으면 불러오고, 없으면 train_fn()으로 학습 후 저장"""
+        entry = self.load_latest(model_type, schema)
+        if entry is not None:
+            return entry[0]
+        with self._train_lock:
+            entry = self.load_latest(model_type, schema)
+            if entry is not None:
+                return entry[0]
+            model = train_fn()
+            self.save(model_type, schema, model, extra_meta)
+        return model
+
+
+_DEFAULT_REGISTRY = ModelRegistry()
+
+
+def load_latest(model_type, schema):
+    return _DEFAULT_REGISTRY.load_latest(model_type, schema)
+
+
+def unload_models():
+    _DEFAULT_REGISTRY.unload()
+
+
+def set_train_lock(lock):
+    """
+    학습 구간 락을 교체한다.
+    여러 프로세스가 같은 저장소를 쓸 때 multiprocessing 락을 넘겨 프로세스 간에도 한 번만 학습하게 한다.
+    """
+    _DEFAULT_REGISTRY._train_lock = lock
+
+
+def get_or_train(model_type, schema, train_fn, extra_meta=None):
+    return _DEFAULT_REGISTRY.get_or_train(model_type, schema, train_fn, extra_meta)
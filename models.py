@@ -1,36 +1,343 @@
 # models.py
-from sklearn.ensemble import RandomForestRegressor
+# scikit-learn / TensorFlow는 import만으로 수 초와 수백 MB가 들기 때문에
+# 모듈 최상단이 아니라 각 함수 안에서 처음 쓸 때 불러온다.
+import threading
+
 import numpy as np
-import tensorflow as tf
+
+from dataset import make_sequences
 
 def train_random_forest(X_train, y_train):
+    from sklearn.ensemble import RandomForestRegressor
     rf = RandomForestRegressor(n_estimators=100)
     rf.fit(X_train, y_train)
     return rf
 
-def predict_random_forest_with_uncertainty(model, X_test):
-    preds = model.predict(X_test)
-    # 단순하게 여러 트리 예측 분산 사용(간단 신뢰구간 예시)
-    all_tree_preds = np.array([tree.predict(X_test) for tree in model.estimators_])
-    std = np.std(all_tree_preds, axis=0)
+def _tree_moments(trees, X):
+    """트리 예측의 (개수, 평균, 제곱편차합)을 Welford 방식으로 누적 (예측을 쌓아두지 않음)"""
+    n = 0
+    mean = None
+    m2 = None
+    for tree in trees:
+        pred = tree.predict(X, check_input=False)
+        n += 1
+        if mean is None:
+            mean = pred.astype(np.float64)
+            m2 = np.zeros_like(mean)
+        else:
+            delta = pred - mean
+            mean += delta / n
+            m2 += delta * (pred - mean)
+    return n, mean, m2
+
+
+def _merge_moments(a, b):
+    """두 부분 집합의 (개수, 평균, 제곱편차합) 병합 (Chan et al.)"""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (n_b / n)
+    m2 = m2_a + m2_b + delta * delta * (n_a * n_b / n)
+    return n, mean, m2
+
+
+def predict_random_forest_with_uncertainty(model, X_test, n_jobs=-1):
+    """
+    숲 전체를 한 번만 훑어 예측 평균과 타깃별 표준편차를 함께 계산한다.
+    트리를 묶음으로 나눠 여러 코어에서 병렬로 누적한 뒤 모멘트를 병합한다.
+    n_jobs: 기본은 모든 코어(트리 수까지), None이면 모델의 n_jobs (그것도 None이면 모든 코어).
+    반환: preds (n_samples, n_targets), std (n_samples, n_targets)
+    """
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    X = np.ascontiguousarray(X_test, dtype=np.float32)
+    trees = model.estimators_
+    if n_jobs is None:
+        n_jobs = model.n_jobs if model.n_jobs is not None else -1
+    n_jobs = min(effective_n_jobs(n_jobs), len(trees))
+    chunks = [trees[i::n_jobs] for i in range(n_jobs)]
+
+    # 트리 예측은 GIL을 놓으므로 스레드 병렬로 충분하다
+    parts = Parallel(n_jobs=n_jobs, prefer="threads")(delayed(_tree_moments)(chunk, X) for chunk in chunks)
+    moments = parts[0]
+    for part in parts[1:]:
+        moments = _merge_moments(moments, part)
+
+    n, preds, m2 = moments
+    std = np.sqrt(m2 / n)
     return preds, std
 
-def build_lstm_model(input_shape):
-    model = tf.keras.Sequential([
-        tf.keras.layers.LSTM(64, return_sequences=True, input_shape=input_shape),
+def build_lstm_model(input_shape, n_outputs=2, dropout=0.2, feature_mean=None, feature_variance=None):
+    """
+    input_shape = (window, n_features) 시퀀스 입력.
+    feature_mean/feature_variance를 주면 입력을 정규화하는 층을 앞에 둔다 (모델과 함께 저장됨).
+    """
+    import tensorflow as tf
+    if len(input_shape) != 2:
+        raise ValueError(f"LSTM 입력은 (window, n_features) 형태여야 합니다: {input_shape}")
+    layers = [tf.keras.Input(shape=tuple(input_shape))]
+    if feature_mean is not None:
+        layers.append(tf.keras.layers.Normalization(mean=feature_mean, variance=feature_variance))
+    # Dropout 층은 MC Dropout 불확실성 추정에도 사용된다
+    layers += [
+        tf.keras.layers.LSTM(64, return_sequences=True),
+        tf.keras.layers.Dropout(dropout),
         tf.keras.layers.LSTM(32),
-        tf.keras.layers.Dense(1)
-    ])
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(n_outputs)
+    ]
+    model = tf.keras.Sequential(layers)
     model.compile(optimizer='adam', loss='mse')
     return model
 
-def train_lstm_model(model, X_train, y_train, epochs=10):
-    model.fit(X_train, y_train, epochs=epochs)
+def _shuffle_rows(X, y):
+    import tensorflow as tf
+    idx = tf.random.shuffle(tf.range(tf.shape(X)[0]))
+    return tf.gather(X, idx), tf.gather(y, idx)
+
+def sequence_dataset(trajectories, params, window, horizon=1, batch_size=256, chunk_scenarios=256,
+                     shuffle=True, cache=None, n_horizons=1):
+    """
+    (N, T, 2) 궤적과 (N, P) 방 조건(메모리 맵 가능)으로 LSTM 학습용 tf.data 파이프라인을 만든다.
+    시나리오 chunk 단위로 읽어 여러 코어에서 병렬로 윈도우를 만들고,
+    chunk 순서와 chunk 안의 행을 섞은 뒤 batch_size로 다시 묶어 prefetch한다.
+    cache=""이면 만든 윈도우를 메모리에, 파일 경로이면 디스크에 캐시해 다음 epoch부터 재사용한다.
+    """
+    import tensorflow as tf
+    n_scenarios = len(trajectories)
+    n_targets = trajectories.shape[2]
+    n_features = n_targets + params.shape[1]
+    n_chunks = -(-n_scenarios // chunk_scenarios)
+
+    def load_chunk(i):
+        start = int(i) * chunk_scenarios
+        stop = min(start + chunk_scenarios, n_scenarios)
+        return make_sequences(np.asarray(trajectories[start:stop]), np.asarray(params[start:stop]),
+                              window, horizon, n_horizons)
+
+    def read_chunk(i):
+        X, y = tf.numpy_function(load_chunk, [i], (tf.float32, tf.float32))
+        X.set_shape((None, window, n_features))
+        y.set_shape((None, n_targets * n_horizons))
+        return X, y
+
+    ds = tf.data.Dataset.range(n_chunks).map(read_chunk, num_parallel_calls=tf.data.AUTOTUNE)
+    if cache is not None:
+        ds = ds.cache(cache)
+    if shuffle:
+        ds = ds.shuffle(n_chunks, reshuffle_each_iteration=True)
+        ds = ds.map(_shuffle_rows, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.rebatch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def train_lstm_model(model, X_train, y_train=None, epochs=10):
+    """X_train은 (샘플, window, feature) 배열 또는 (X, y) 배치를 내는 tf.data.Dataset"""
+    import tensorflow as tf
+    if isinstance(X_train, tf.data.Dataset):
+        model.fit(X_train, epochs=epochs)
+    else:
+        model.fit(X_train, y_train, epochs=epochs)
     return model
 
-def predict_lstm_with_uncertainty(model, X_test, n_samples=20):
-    # MC Dropout 등으로 불확실성 계산 가능 (간단화)
-    preds = model.predict(X_test)
-    # 신뢰구간 계산 코드 추가 가능
-    std = np.zeros_like(preds)  # placeholder
-    return preds, std
+def predict_lstm_with_uncertainty(model, X_test, n_samples=20, batch_size=1024):
+    """
+    MC Dropout: 추론 때도 dropout을 켠 채 n_samples번 예측해 평균과 표준편차를 구한다.
+    입력을 n_samples배로 이어 붙여(tile) 한 번의 model(x, training=True) 호출로 처리하고,
+    입력이 크면 batch_size 행씩 나눠 메모리를 제한한다.
+    """
+    import tensorflow as tf
+    X = np.asarray(X_test, dtype=np.float32)
+    means = []
+    stds = []
+    for start in range(0, len(X), batch_size):
+        x = tf.convert_to_tensor(X[start:start + batch_size])
+        n = x.shape[0]
+        tiled = tf.tile(x, [n_samples] + [1] * (len(x.shape) - 1))
+        out = model(tiled, training=True).numpy()
+        out = out.reshape((n_samples, n) + out.shape[1:])
+        means.append(out.mean(axis=0))
+        stds.append(out.std(axis=0))
+    return np.concatenate(means), np.concatenate(stds)
+
+
+# --- CPU 서빙용 경량 추론 모델 ---
+
+class FlatForest:
+    """
+    학습된 RandomForestRegressor의 모든 트리 노드를 하나의 평탄한 배열 묶음으로 옮긴 추론 전용 모델.
+    sklearn 없이 NumPy만으로 (샘플 x 트리) 전체를 깊이 단위로 한 번에 내려보내 평가한다.
+    잎 노드는 자기 자신을 자식으로 가리키므로 이미 잎에 닿은 경로는 그 자리에 머물고,
+    예측값은 잎 노드에만 저장한다 (leaf[node] -> value 행).
+    """
+    __slots__ = ("left", "right", "feature", "threshold", "leaf", "value", "roots", "max_depth")
+
+    ARRAYS = ("left", "right", "feature", "threshold", "leaf", "value", "roots")
+
+    def __init__(self, left, right, feature, threshold, leaf, value, roots, max_depth):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf = leaf
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        parts = {name: [] for name in cls.ARRAYS}
+        offset = 0
+        n_leaves = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            node = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            parts["left"].append(np.where(is_leaf, node, tree.children_left) + offset)
+            parts["right"].append(np.where(is_leaf, node, tree.children_right) + offset)
+            parts["feature"].append(np.where(is_leaf, 0, tree.feature))
+            parts["threshold"].append(tree.threshold)
+            parts["leaf"].append(np.where(is_leaf, np.cumsum(is_leaf) - 1 + n_leaves, -1))
+            parts["value"].append(tree.value[is_leaf, :, 0])
+            parts["roots"].append([offset])
+            offset += tree.node_count
+            n_leaves += int(is_leaf.sum())
+
+        dtypes = {"left": np.int32, "right": np.int32, "feature": np.int32, "leaf": np.int32,
+                  "value": np.float32, "roots": np.int32}
+        arrays = {name: np.concatenate(parts[name]).astype(dtypes[name]) for name in dtypes}
+        # 입력은 float32이므로 x <= t(float64)는 x <= (t 이하의 가장 큰 float32)와 같다.
+        # threshold를 아래쪽으로 반올림해 float32로 저장해도 sklearn과 분기가 같다.
+        threshold = np.concatenate(parts["threshold"])
+        threshold32 = threshold.astype(np.float32)
+        arrays["threshold"] = np.where(threshold32 > threshold,
+                                       np.nextafter(threshold32, np.float32(-np.inf)), threshold32)
+        return cls(max_depth=max(est.tree_.max_depth for est in model.estimators_), **arrays)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, max_depth=self.max_depth, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(max_depth=int(data["max_depth"]), **{name: data[name] for name in cls.ARRAYS})
+
+    def leaf_values(self, X):
+        """트리별 예측 (n_samples, n_trees, n_outputs)"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            if np.array_equal(child, node):
+                break
+            node = child
+        return self.value[self.leaf[node]]
+
+
+def export_random_forest(model):
+    return FlatForest.from_sklearn(model)
+
+
+def predict_flat_forest_with_uncertainty(forest, X_test, batch_size=4096):
+    """predict_random_forest_with_uncertainty와 같은 (평균, 타깃별 표준편차)를 FlatForest로 계산"""
+    means = []
+    stds = []
+    for start in range(0, len(X_test), batch_size):
+        leaves = forest.leaf_values(X_test[start:start + batch_size])
+        means.append(leaves.mean(axis=1, dtype=np.float64))
+        stds.append(leaves.std(axis=1, dtype=np.float64))
+    return np.concatenate(means), np.concatenate(stds)
+
+
+class TFLiteModel:
+    """
+    TFLite flatbuffer와 그 인터프리터.
+    LiteRT(ai_edge_litert)가 설치되어 있으면 TensorFlow를 불러오지 않고 실행한다.
+    """
+    def __init__(self, content):
+        self.content = content
+        self._interpreter = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return len(self.content)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def _get_interpreter(self):
+        if self._interpreter is None:
+            try:
+                from ai_edge_litert.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+            self._interpreter = Interpreter(model_content=self.content)
+            self._interpreter.allocate_tensors()
+        return self._interpreter
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        # 인터프리터는 스레드 안전하지 않으므로 호출을 직렬화한다
+        with self._lock:
+            interpreter = self._get_interpreter()
+            inp = interpreter.get_input_details()[0]
+            if tuple(inp["shape"]) != X.shape:
+                interpreter.resize_tensor_input(inp["index"], X.shape)
+                interpreter.allocate_tensors()
+            interpreter.set_tensor(inp["index"], X)
+            interpreter.invoke()
+            return interpreter.get_tensor(interpreter.get_output_details()[0]["index"]).copy()
+
+
+# quantization -> 변환기 설정 (None이면 float32 그대로)
+TFLITE_QUANTIZATIONS = (None, "float16", "int8")
+
+
+def export_lstm_tflite(model, quantization="float16"):
+    """
+    Keras LSTM을 추론 전용 TFLite 모델로 변환한다.
+    펼치지 않은 LSTM의 while 루프는 가변 배치로 변환되지 않으므로,
+    LSTM을 펼친(unroll) 같은 구조의 모델에 가중치를 옮겨 변환한다. (윈도우가 짧아 펼쳐도 작다)
+    quantization: None | "float16" (가중치 fp16) | "int8" (가중치 int8, 동적 범위 양자화)
+    """
+    import tensorflow as tf
+    if quantization not in TFLITE_QUANTIZATIONS:
+        raise ValueError(f"알 수 없는 quantization: {quantization}")
+
+    config = model.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] == "LSTM":
+            layer["config"]["unroll"] = True
+    unrolled = tf.keras.Sequential.from_config(config)
+    unrolled.set_weights(model.get_weights())
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(unrolled)
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    return TFLiteModel(converter.convert())
+
+
+def predict_tflite_with_uncertainty(model, X_test, batch_size=1024):
+    """
+    TFLite LSTM 예측. 추론 그래프에는 dropout이 빠져 MC Dropout 샘플링을 할 수 없으므로
+    표준편차는 0으로 돌려준다 (불확실성이 필요하면 전체 Keras 모델을 사용).
+    """
+    X = np.asarray(X_test, dtype=np.float32)
+    preds = np.concatenate([model.predict(X[start:start + batch_size]) for start in range(0, len(X), batch_size)])
+    return preds, np.zeros_like(preds)
@@ -0,0 +1,278 @@
+"""
+입력 불확실성의 몬테카를로 전파.
+재실 인원, 환기 횟수처럼 정확히 알 수 없는 입력을 분포에서 뽑아 수천 번 시뮬레이션하고,
+시간별 O2/CO2 백분위 띠와 위험 기준 도달 시각의 백분위를 구한다.
+
+    people ~ Poisson(평균 = 입력값), ach ~ Lognormal(중앙값 = 입력값, sigma = 0.3) 이 기본 분포이다.
+
+뽑은 값들은 chunk 단위로 한 번의 배열 연산(analysis._Scenarios)으로 계산하고,
+결과는 시간별 고정 구간 히스토그램에 누적하므로 메모리는 draw 수와 무관하게
+(출력 시점 수 x 구간 수)로 고정된다. 히스토그램은 더해서 합칠 수 있어 여러 프로세스로 나눠 돌릴 수 있다.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analysis import _Scenarios, first_crossing_times
+from simulator import DANGER_CO2_PCT, DANGER_O2_PCT, _n_steps
+
+PERCENTILES = (5, 25, 50, 75, 95)
+UNCERTAIN_INPUTS = ("room_volume_m3", "people", "plants", "ach")
+DEFAULT_DISTRIBUTIONS = {
+    "people": ("poisson",),
+    "ach": ("lognormal", 0.3),
+}
+MAX_TIMES = 500
+N_BINS = 512
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _sample(kind, center, args, n, rng):
+    """center(입력값)를 기준으로 한 분포에서 n개를 뽑는다"""
+    if kind == "fixed":
+        return np.full(n, center)
+    if kind == "poisson":
+        return rng.poisson(center, n)
+    if kind == "lognormal":
+        (sigma,) = args
+        return center * rng.lognormal(0.0, sigma, n)  # 중앙값이 center
+    if kind == "normal":
+        (sd,) = args
+        return np.maximum(rng.normal(center, sd, n), 0)
+    if kind == "uniform":
+        low, high = args
+        return rng.uniform(low, high, n)
+    raise ValueError(f"지원하지 않는 분포입니다: {kind} (가능: fixed, poisson, lognormal, normal, uniform)")
+
+
+def sample_inputs(inputs, distributions, n, rng):
+    """입력 dict와 {이름: (분포, *모수)}로 n개의 입력 열(column)을 뽑는다"""
+    columns = {}
+    for name in UNCERTAIN_INPUTS:
+        kind, *args = distributions.get(name, ("fixed",))
+        columns[name] = _sample(kind, inputs[name], args, n, rng)
+    columns["people"] = np.asarray(columns["people"]).round().astype(int)
+    columns["plants"] = np.asarray(columns["plants"]).round().astype(int)
+    return columns
+
+
+class StreamingHistogram:
+    """
+    K개 위치(시간 등)마다 고정 구간 히스토그램으로 분포를 누적하는 분위수 추정기.
+    범위를 벗어난 값은 양 끝 구간에 넣고 위치별 최소/최대를 따로 기록해 끝 구간의 보간 범위를 좁힌다.
+    NaN은 "끝내 도달하지 않음"(+inf)으로 세어 전체 개수에만 포함된다.
+    """
+    def __init__(self, lo, hi, n_bins=N_BINS):
+        self.lo = np.asarray(lo, dtype=float)
+        self.width = np.maximum(np.asarray(hi, dtype=float) - self.lo, 1e-12) / n_bins
+        self.n_bins = n_bins
+        k = len(self.lo)
+        self.counts = np.zeros((k, n_bins), dtype=np.int64)
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.total = 0
+        self.sum = np.zeros(k)
+
+    @classmethod
+    def from_sample(cls, values, n_bins=N_BINS, margin=0.25):
+        """첫 표본 (N, K)의 위치별 범위를 margin만큼 넓혀 구간을 정한다"""
+        lo = np.nanmin(values, axis=0)
+        hi = np.nanmax(values, axis=0)
+        pad = margin * (hi - lo) + 1e-9 * np.maximum(np.abs(hi), 1.0)
+        return cls(lo - pad, hi + pad, n_bins)
+
+    def update(self, values):
+        """(N, K) 값을 누적한다"""
+        n, k = values.shape
+        valid = np.isfinite(values)
+        scaled = np.where(valid, (values - self.lo) / self.width, 0.0)
+        bins = np.clip(scaled, 0, self.n_bins - 1).astype(np.int64)
+        flat = (np.arange(k) * self.n_bins + bins)[valid]
+        self.counts += np.bincount(flat, minlength=k * self.n_bins).reshape(k, self.n_bins)
+        self.minimum = np.minimum(self.minimum, np.where(valid, values, np.inf).min(axis=0))
+        self.maximum = np.maximum(self.maximum, np.where(valid, values, -np.inf).max(axis=0))
+        self.sum += np.where(valid, values, 0.0).sum(axis=0)
+        self.total += n
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.sum += other.sum
+        self.total += other.total
+        return self
+
+    def fraction_valid(self):
+        return self.counts.sum(axis=1) / max(self.total, 1)
+
+    def mean(self):
+        """유효한 값의 평균 (K,)"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.sum / self.counts.sum(axis=1)
+
+    def quantiles(self, percentiles):
+        """(P, K) 백분위 값. NaN(+inf)에 해당하는 백분위는 NaN"""
+        q = np.asarray(percentiles, dtype=float) / 100.0
+        cum = np.cumsum(self.counts, axis=1)                    # (K, B)
+        target = q[:, None] * self.total                         # (P, 1)
+        # 목표 개수에 처음 도달하는 구간
+        j = np.minimum((cum[None, :, :] < target[:, :, None]).sum(axis=2), self.n_bins - 1)  # (P, K)
+        rows = np.arange(cum.shape[0])[None, :]
+        below = np.where(j > 0, cum[rows, np.maximum(j - 1, 0)], 0)
+        count = self.counts[rows, j]
+        left = np.maximum(self.lo + j * self.width, self.minimum)
+        right = np.minimum(self.lo + (j + 1) * self.width, self.maximum)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.clip((target - below) / count, 0.0, 1.0)
+        value = left + frac * np.maximum(right - left, 0.0)
+        return np.where(target <= cum[:, -1][None, :], value, np.nan)
+
+
+class MonteCarloResult:
+    """
+    times_min (K,): 출력 시점, percentiles (P,)
+    o2_bands / co2_bands (P, K): 시간별 백분위, o2_mean / co2_mean (K,)
+    o2_danger_time / co2_danger_time (P,): 기준 도달 시각 백분위 (그 백분위까지 도달하지 않으면 NaN)
+    o2_danger_prob / co2_danger_prob: 기간 안에 기준에 도달할 확률
+    """
+    def __init__(self, times_min, percentiles, o2_bands, co2_bands, o2_mean, co2_mean,
+                 o2_danger_time, co2_danger_time, o2_danger_prob, co2_danger_prob, n_draws):
+        self.times_min = times_min
+        self.percentiles = percentiles
+        self.o2_bands = o2_bands
+        self.co2_bands = co2_bands
+        self.o2_mean = o2_mean
+        self.co2_mean = co2_mean
+        self.o2_danger_time = o2_danger_time
+        self.co2_danger_time = co2_danger_time
+        self.o2_danger_prob = o2_danger_prob
+        self.co2_danger_prob = co2_danger_prob
+        self.n_draws = n_draws
+
+    def to_pandas(self):
+        """시간별 평균/백분위 표 (columns: time, o2_mean, o2_p5, ..., co2_mean, co2_p5, ...)"""
+        import pandas as pd
+        data = {"time": self.times_min, "o2_mean": self.o2_mean}
+        data.update({f"o2_p{p:g}": band for p, band in zip(self.percentiles, self.o2_bands)})
+        data["co2_mean"] = self.co2_mean
+        data.update({f"co2_p{p:g}": band for p, band in zip(self.percentiles, self.co2_bands)})
+        return pd.DataFrame(data)
+
+
+def _output_steps(n_steps, max_times):
+    """전체 스텝 중 출력할 스텝 번호 (양 끝 포함, 최대 max_times개)"""
+    return np.unique(np.round(np.linspace(0, n_steps, min(max_times, n_steps + 1))).astype(int))
+
+
+def _simulate_chunk(inputs, distributions, n, seed, step_idx, o2_threshold, co2_threshold):
+    """n개 draw: (O2 (n, K), CO2 (n, K), O2 도달 시각 (n, 1), CO2 도달 시각 (n, 1))"""
+    rng = np.random.default_rng(seed)
+    columns = sample_inputs(inputs, distributions, n, rng)
+    args = (columns["room_volume_m3"], columns["people"], columns["plants"], columns["ach"],
+            inputs["duration_min"], inputs["dt_min"], inputs["light_on"])
+    model = inputs.get("model", "linear")
+    scenarios = _Scenarios(*args, model)
+    o2, co2 = scenarios.evaluate(np.broadcast_to(step_idx, (n, len(step_idx))))
+    o2_time, co2_time = first_crossing_times(*args, model=model,
+                                             o2_threshold=o2_threshold, co2_threshold=co2_threshold)
+    return o2, co2, o2_time[:, None], co2_time[:, None]
+
+
+def _accumulate(hists, chunk):
+    for hist, values in zip(hists, chunk):
+        hist.update(values)
+
+
+def _run_chunks(inputs, distributions, sizes, seeds, step_idx, o2_threshold, co2_threshold, hists):
+    """작업 프로세스: 주어진 chunk들을 빈 히스토그램 복사본에 누적해 돌려준다"""
+    for n, seed in zip(sizes, seeds):
+        _accumulate(hists, _simulate_chunk(inputs, distributions, n, seed, step_idx, o2_threshold, co2_threshold))
+    return hists
+
+
+def _empty_like(hist):
+    empty = StreamingHistogram.__new__(StreamingHistogram)
+    empty.lo, empty.width, empty.n_bins = hist.lo, hist.width, hist.n_bins
+    empty.counts = np.zeros_like(hist.counts)
+    empty.minimum = np.full_like(hist.minimum, np.inf)
+    empty.maximum = np.full_like(hist.maximum, -np.inf)
+    empty.total = 0
+    empty.sum = np.zeros_like(hist.sum)
+    return empty
+
+
+def run_monte_carlo(inputs, n_draws=5000, distributions=None, percentiles=PERCENTILES,
+                    max_times=MAX_TIMES, n_bins=N_BINS, chunk_size=None, n_workers=1, seed=0,
+                    o2_threshold=DANGER_O2_PCT, co2_threshold=DANGER_CO2_PCT):
+    """
+    inputs(run_simulation 인자 dict)에 distributions({이름: (분포, *모수)}, 없으면 DEFAULT_DISTRIBUTIONS)의
+    불확실성을 주고 n_draws번 시뮬레이션한 MonteCarloResult를 반환한다.
+    분포를 줄 수 있는 입력: room_volume_m3, people, plants, ach.
+    n_workers > 1 이면 chunk들을 여러 프로세스에 나눠 계산한다 (같은 seed면 결과가 같다).
+    """
+    if n_draws < 1:
+        raise ValueError("n_draws는 1 이상이어야 합니다.")
+    distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+    unknown = set(distributions) - set(UNCERTAIN_INPUTS)
+    if unknown:
+        raise ValueError(f"분포를 줄 수 없는 입력입니다: {sorted(unknown)} (가능: {UNCERTAIN_INPUTS})")
+
+    n_steps = int(_n_steps(inputs["duration_min"], inputs["dt_min"]))
+    step_idx = _output_steps(n_steps, max_times)
+    times_min = step_idx * float(inputs["dt_min"])
+    if chunk_size is None:
+        # chunk 하나의 중간 배열(시간 x 여러 개)이 CHUNK_BYTES 안에 들도록
+        chunk_size = max(1, min(n_draws, CHUNK_BYTES // (len(step_idx) * 8 * 16)))
+    sizes = [min(chunk_size, n_draws - start) for start in range(0, n_draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    thresholds = (o2_threshold, co2_threshold)
+
+    # 첫 chunk로 히스토그램 구간을 정한다 (도달 시각은 0 ~ duration 격자로 고정)
+    first = _simulate_chunk(inputs, distributions, sizes[0], seeds[0], step_idx, *thresholds)
+    half_dt = 0.5 * float(inputs["dt_min"])
+    time_bins = min(n_steps + 1, 4096)
+    hists = [
+        StreamingHistogram.from_sample(first[0], n_bins),
+        StreamingHistogram.from_sample(first[1], n_bins),
+        StreamingHistogram([-half_dt], [n_steps * float(inputs["dt_min"]) + half_dt], time_bins),
+        StreamingHistogram([-half_dt], [n_steps * float(inputs["dt_min"]) + half_dt], time_bins),
+    ]
+    _accumulate(hists, first)
+
+    rest = list(zip(sizes[1:], seeds[1:]))
+    if n_workers > 1 and rest:
+        groups = [rest[i::n_workers] for i in range(n_workers) if rest[i::n_workers]]
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(groups), mp_context=ctx) as pool:
+            futures = [
+                pool.submit(_run_chunks, inputs, distributions, [n for n, _ in group], [s for _, s in group],
+                            step_idx, *thresholds, [_empty_like(h) for h in hists])
+                for group in groups
+            ]
+            for future in futures:
+                for hist, part in zip(hists, future.result()):
+                    hist.merge(part)
+    else:
+        for n, s in rest:
+            _accumulate(hists, _simulate_chunk(inputs, distributions, n, s, step_idx, *thresholds))
+
+    o2_hist, co2_hist, o2_time_hist, co2_time_hist = hists
+    dt_min = float(inputs["dt_min"])
+    # 도달 시각은 dt 격자 위의 값이므로 구간 안 보간값을 가장 가까운 격자로 맞춘다
+    o2_time = np.round(o2_time_hist.quantiles(percentiles)[:, 0] / dt_min) * dt_min
+    co2_time = np.round(co2_time_hist.quantiles(percentiles)[:, 0] / dt_min) * dt_min
+    return MonteCarloResult(
+        times_min,
+        tuple(percentiles),
+        o2_hist.quantiles(percentiles),
+        co2_hist.quantiles(percentiles),
+        o2_hist.mean(),
+        co2_hist.mean(),
+        o2_time,
+        co2_time,
+        float(o2_time_hist.fraction_valid()[0]),
+        float(co2_time_hist.fraction_valid()[0]),
+        n_draws,
+    )
@@ -0,0 +1,167 @@
+"""
+여러 방(zone)이 공기로 연결된 건물 시뮬레이션.
+방마다 부피/인원/식물/외기 환기율(ACH)이 있고, 방 사이 공기 흐름은 airflow[i, j] (방 i -> 방 j, m³/h)로 준다.
+각 방은 단일 방 물질수지 모델(simulator._mass_balance_model)과 같은 완전 혼합 가정을 따른다.
+
+    V_i dC_i/dt = S_i + Σ_j Q_ji C_j - (Σ_j Q_ij) C_i + λ_i V_i (C_out - C_i)
+                  + (보충 외기) C_out - (초과 배기) C_i
+
+방 사이 유입과 유출이 맞지 않는 방은 모자라는 만큼 외기를 들이고(보충), 남는 만큼 밖으로 배기한다.
+공조기(AHU)나 공용 덕트는 부피가 작은 방 하나로 두면 된다.
+
+dC/dt = A C + b 꼴의 희소 선형 ODE이고 A는 O2/CO2가 공유한다.
+    method="exact":          상수항을 붙인 확장 행렬의 지수 함수(scipy.sparse.linalg.expm_multiply)로
+                             전체 시간 격자의 해를 정확히 구한다.
+    method="crank_nicolson": (I - dt/2 A)를 한 번 LU 분해해 두고 스텝마다 희소 삼각 풀이를 한다.
+scipy는 scikit-learn과 함께 설치되며 이 모드를 쓸 때만 불러온다.
+"""
+import numpy as np
+
+from simulator import (
+    BASE_CO2_PCT,
+    BASE_O2_PCT,
+    BatchSimulationResult,
+    SimulationResult,
+    _mass_balance_rates,
+    _time_axis,
+)
+
+METHODS = ("exact", "crank_nicolson")
+
+
+class MultiZoneResult(BatchSimulationResult):
+    """
+    방별 결과를 (Z, T) 배열로 쌓은 결과 (BatchSimulationResult와 같은 형식, 시간 축은 모든 방이 공유).
+    result[i]는 방 i의 SimulationResult, result.zone("이름")으로 이름으로도 꺼낼 수 있다.
+    """
+    def __init__(self, times_min, o2_pct, co2_pct, zone_names, params):
+        n_zones, n_times = o2_pct.shape
+        super().__init__(np.broadcast_to(times_min, (n_zones, n_times)), o2_pct, co2_pct,
+                         np.full(n_zones, n_times))
+        self.zone_names = list(zone_names)
+        self.params = params
+
+    def __getitem__(self, i):
+        sim = super().__getitem__(i)
+        sim.params = self.params[i]
+        return sim
+
+    def zone(self, name):
+        return self[self.zone_names.index(name)]
+
+
+def _as_zone_arrays(n_zones, **columns):
+    arrays = {}
+    for name, value in columns.items():
+        value = np.broadcast_to(np.asarray(value), (n_zones,))
+        arrays[name] = value
+    return arrays
+
+
+def _system_matrix(airflow, room_volume_m3, ach):
+    """
+    희소 행렬 A (1/분)와 외기 유입 계수 (1/분, C_out에 곱함).
+    airflow: (Z, Z) 배열 또는 scipy 희소 행렬 (m³/h), 대각 성분은 무시한다.
+    """
+    import scipy.sparse as sp
+
+    flow = sp.csr_matrix(airflow, dtype=float) / 60.0   # m³/분
+    flow.setdiag(0)
+    flow.eliminate_zeros()
+    if flow.nnz and flow.data.min() < 0:
+        raise ValueError("방 사이 공기 흐름(airflow)은 0 이상이어야 합니다.")
+    outflow = np.asarray(flow.sum(axis=1)).ravel()
+    inflow = np.asarray(flow.sum(axis=0)).ravel()
+    exhaust = np.maximum(inflow - outflow, 0.0)   # 들어온 만큼 나가지 못한 공기는 밖으로
+    makeup = np.maximum(outflow - inflow, 0.0)    # 나간 만큼 들어오지 못한 공기는 외기로 채움
+
+    lam = np.asarray(ach, dtype=float) / 60.0
+    inv_volume = sp.diags(1.0 / room_volume_m3)
+    A = inv_volume @ flow.T - sp.diags((outflow + exhaust) / room_volume_m3 + lam)
+    return A.tocsc(), lam + makeup / room_volume_m3
+
+
+def _solve_exact(A, b, c0, times_min):
+    """확장 행렬 [[A, B], [0, 0]]의 지수 함수로 (T, Z, K) 해를 구한다 (K: 기체 수)"""
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import expm_multiply
+
+    n_zones, n_gases = b.shape
+    augmented = sp.bmat([
+        [A, sp.csc_matrix(b)],
+        [None, sp.csc_matrix((n_gases, n_gases))],
+    ]).tocsc()
+    y0 = np.vstack([c0, np.eye(n_gases)])
+    y = expm_multiply(augmented, y0, start=0.0, stop=times_min[-1], num=len(times_min), endpoint=True)
+    return np.asarray(y).reshape(len(times_min), n_zones + n_gases, n_gases)[:, :n_zones]
+
+
+def _solve_crank_nicolson(A, b, c0, times_min):
+    """고정 dt Crank-Nicolson: (I - dt/2 A) C_{n+1} = (I + dt/2 A) C_n + dt b"""
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+
+    out = np.empty((len(times_min),) + c0.shape)
+    out[0] = c0
+    if len(times_min) < 2:
+        return out
+    dt = times_min[1] - times_min[0]
+    identity = sp.identity(A.shape[0], format="csc")
+    lu = splu((identity - 0.5 * dt * A).tocsc())
+    explicit = (identity + 0.5 * dt * A).tocsr()
+    forcing = dt * b
+    c = c0
+    for k in range(1, len(times_min)):
+        c = lu.solve(explicit @ c + forcing)
+        out[k] = c
+    return out
+
+
+def run_multizone_simulation(room_volume_m3, people, plants, ach, airflow, duration_min, dt_min, light_on,
+                             zone_names=None, o2_start=BASE_O2_PCT, co2_start=BASE_CO2_PCT, method="exact"):
+    """
+    Z개 방의 O2/CO2를 함께 계산해 MultiZoneResult를 반환한다.
+    room_volume_m3, people, plants, ach, light_on, o2_start, co2_start는 (Z,) 배열 또는 모든 방에 공통인 스칼라,
+    airflow는 (Z, Z) 방 사이 공기 흐름 (m³/h, 배열 또는 scipy 희소 행렬).
+    연결이 없으면 각 방의 결과는 run_simulation(model="mass_balance")과 같다.
+    """
+    if method not in METHODS:
+        raise ValueError(f"지원하지 않는 풀이 방법입니다: {method} (가능: {METHODS})")
+    room_volume_m3 = np.atleast_1d(np.asarray(room_volume_m3, dtype=float))
+    n_zones = len(room_volume_m3)
+    if np.shape(airflow) != (n_zones, n_zones):
+        raise ValueError(f"airflow는 ({n_zones}, {n_zones}) 행렬이어야 합니다: {np.shape(airflow)}")
+    if np.any(room_volume_m3 <= 0):
+        raise ValueError("방 부피는 0보다 커야 합니다.")
+    zones = _as_zone_arrays(n_zones, people=people, plants=plants, ach=ach, light_on=light_on,
+                            o2_start=o2_start, co2_start=co2_start)
+    zone_names = [f"zone_{i}" for i in range(n_zones)] if zone_names is None else list(zone_names)
+    if len(zone_names) != n_zones:
+        raise ValueError(f"zone_names는 {n_zones}개여야 합니다.")
+
+    times_min = _time_axis(duration_min, dt_min)
+    A, outdoor = _system_matrix(airflow, room_volume_m3, zones["ach"])
+    o2_rate, co2_rate = _mass_balance_rates(room_volume_m3, zones["people"], zones["plants"], zones["light_on"])
+    # 두 기체를 열로 나란히 두고 한 번에 푼다: (Z, 2)
+    b = np.stack([o2_rate + outdoor * BASE_O2_PCT, co2_rate + outdoor * BASE_CO2_PCT], axis=1)
+    c0 = np.stack([zones["o2_start"], zones["co2_start"]], axis=1).astype(float)
+
+    solve = _solve_exact if method == "exact" else _solve_crank_nicolson
+    conc = np.maximum(solve(A, b, c0, times_min), 0.0)   # (T, Z, 2)
+
+    params = [
+        dict(
+            room_volume_m3=float(room_volume_m3[i]),
+            people=int(zones["people"][i]),
+            plants=int(zones["plants"][i]),
+            ach=float(zones["ach"][i]),
+            duration_min=duration_min,
+            dt_min=dt_min,
+            light_on=bool(zones["light_on"][i]),
+            model="multizone",
+            zone=zone_names[i],
+        )
+        for i in range(n_zones)
+    ]
+    return MultiZoneResult(times_min, np.ascontiguousarray(conc[:, :, 0].T),
+                           np.ascontiguousarray(conc[:, :, 1].T), zone_names, params)
@@ -0,0 +1,135 @@
+"""
+비밀번호 해시.
+저장 형식에 방식과 작업량(cost)이 함께 들어 있어 설정을 바꿔도 예전 해시를 검증할 수 있고,
+로그인에 성공했을 때 현재 설정과 다르면(평문 포함) 새 해시로 바꿔 저장하면 된다.
+
+    scrypt$<log2 N>$<r>$<p>$<salt>$<hash>     hashlib.scrypt (OpenSSL)
+    pbkdf2_sha256$<반복 수>$<salt>$<hash>      hashlib.pbkdf2_hmac (OpenSSL, SHA 확장 명령 사용)
+    $argon2id$...                              argon2-cffi가 설치되어 있을 때만
+
+방식은 PASSWORD_HASH 환경 변수(scrypt | pbkdf2_sha256 | argon2, 기본 scrypt),
+작업량은 PASSWORD_COST(scrypt는 log2 N, pbkdf2는 반복 수, argon2는 time_cost)로 정한다.
+argon2를 골랐는데 argon2-cffi가 없으면 scrypt 기본 설정으로 해시한다.
+"""
+import base64
+import hashlib
+import hmac
+import os
+
+SCHEMES = ("scrypt", "pbkdf2_sha256", "argon2")
+# 방식별 기본 작업량: 이 장비(1코어)에서 검증 1회 약 50~60ms
+DEFAULT_COSTS = {"scrypt": 14, "pbkdf2_sha256": 100_000, "argon2": 3}
+DEFAULT_SCHEME = os.environ.get("PASSWORD_HASH", "scrypt")
+DEFAULT_COST = int(os.environ["PASSWORD_COST"]) if "PASSWORD_COST" in os.environ else None
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    # OpenSSL 기본 메모리 한도(32MB)보다 큰 N도 쓸 수 있도록 필요한 만큼 허용
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * n * p + (1 << 20), dklen=HASH_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=HASH_BYTES)
+
+
+def _argon2_hasher(cost):
+    try:
+        from argon2 import PasswordHasher
+    except ImportError as e:
+        raise ImportError("argon2 방식에는 argon2-cffi가 필요합니다.") from e
+    return PasswordHasher(time_cost=cost)
+
+
+def _argon2_available():
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _resolve(scheme, cost):
+    if scheme not in SCHEMES:
+        raise ValueError(f"지원하지 않는 해시 방식입니다: {scheme} (가능: {SCHEMES})")
+    if scheme == "argon2" and not _argon2_available():
+        # argon2의 작업량(time_cost)은 scrypt에 맞지 않으므로 scrypt 기본값을 쓴다
+        return "scrypt", DEFAULT_COSTS["scrypt"]
+    return scheme, DEFAULT_COSTS[scheme] if cost is None else int(cost)
+
+
+def hash_password(password, scheme=DEFAULT_SCHEME, cost=DEFAULT_COST):
+    """임의의 salt로 비밀번호를 해시해 저장용 문자열을 반환"""
+    scheme, cost = _resolve(scheme, cost)
+    if scheme == "argon2":
+        return _argon2_hasher(cost).hash(password)
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        digest = _scrypt(password, salt, cost, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${cost}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = _pbkdf2(password, salt, cost)
+    return f"pbkdf2_sha256${cost}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(("scrypt$", "pbkdf2_sha256$", "$argon2"))
+
+
+# 없는 아이디도 같은 시간이 걸리도록 검증하는 더미 해시 ((방식, 작업량) -> 해시)
+_DUMMY_HASHES = {}
+
+
+def _dummy_hash(scheme, cost):
+    if (scheme, cost) not in _DUMMY_HASHES:
+        _DUMMY_HASHES[(scheme, cost)] = hash_password("", scheme, cost)
+    return _DUMMY_HASHES[(scheme, cost)]
+
+
+def verify_password(stored, password, scheme=DEFAULT_SCHEME, cost=DEFAULT_COST):
+    """
+    (일치 여부, 다시 해시해야 하는지)를 반환한다.
+    평문으로 저장된 값이거나 방식/작업량이 현재 설정과 다르면 다시 해시해야 한다.
+    stored가 None(없는 아이디)이면 응답 시간으로 아이디 존재 여부가 드러나지 않도록
+    현재 설정의 더미 해시를 검증한 뒤 (False, False)를 반환한다.
+    argon2 해시는 argon2-cffi가 없으면 검증할 수 없으므로 (False, False)를 반환한다.
+    """
+    scheme, cost = _resolve(scheme, cost)
+    if stored is None:
+        verify_password(_dummy_hash(scheme, cost), password, scheme, cost)
+        return False, False
+    if stored.startswith("$argon2"):
+        if not _argon2_available():
+            return False, False
+        from argon2.exceptions import VerificationError, InvalidHashError
+        hasher = _argon2_hasher(cost)
+        try:
+            hasher.verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False, False
+        return True, scheme != "argon2" or hasher.check_needs_rehash(stored)
+    if stored.startswith("scrypt$"):
+        _, log_n, r, p, salt, digest = stored.split("$")
+        ok = hmac.compare_digest(_scrypt(password, _unb64(salt), int(log_n), int(r), int(p)), _unb64(digest))
+        current = (scheme, cost, SCRYPT_R, SCRYPT_P) == ("scrypt", int(log_n), int(r), int(p))
+        return ok, ok and not current
+    if stored.startswith("pbkdf2_sha256$"):
+        _, iterations, salt, digest = stored.split("$")
+        ok = hmac.compare_digest(_pbkdf2(password, _unb64(salt), int(iterations)), _unb64(digest))
+        return ok, ok and (scheme, cost) != ("pbkdf2_sha256", int(iterations))
+    # 해시 형식이 아니면 예전 users.json의 평문 비밀번호
+    ok = hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+    return ok, ok
@@ -1,3 +1,6 @@
+import os
+from functools import partial
+
 import numpy as np
 import pandas as pd
 from models import (
@@ -6,10 +9,151 @@ from models import (
     build_lstm_model,
     train_lstm_model,
     predict_lstm_with_uncertainty,
+    sequence_dataset,
+    export_random_forest,
+    predict_flat_forest_with_uncertainty,
+    export_lstm_tflite,
+    predict_tflite_with_uncertainty,
+)
+from dataset import (
+    PARAM_NAMES,
+    feature_schema,
+    generate_dataset,
+    load_dataset,
+    make_windows,
+    params_matrix,
+    sample_rows,
+    sequence_moments,
+    sequence_schema,
 )
+from forecast import STRATEGIES, BatchForecastResult, rollout
+from model_registry import get_or_train, load_latest
+from simulator import _n_steps, run_simulation_batch, run_simulation_cached
 
 import matplotlib.pyplot as plt
 
+# 모델 입력/출력 구성. 바뀌면 저장소에서 새 모델을 학습한다.
+N_LAGS = 6
+# 뒤쪽 HOLDOUT_SCENARIOS개 시나리오는 어떤 모델의 학습에도 쓰지 않는다 (평가/벤치마크용)
+HOLDOUT_SCENARIOS = 200
+FEATURE_SCHEMA = dict(feature_schema(n_lags=N_LAGS, horizon=1), holdout_scenarios=HOLDOUT_SCENARIOS)
+# LSTM은 같은 길이의 시퀀스 윈도우를 입력으로 받는다
+LSTM_SCHEMA = sequence_schema(window=N_LAGS, horizon=1)
+
+# direct 예측 모델이 한 번에 내는 스텝 수 (더 긴 구간은 블록 단위로 이어 붙인다)
+DIRECT_HORIZONS = 30
+
+# "full": sklearn / Keras 모델, "lite": 평탄화한 RF와 TFLite LSTM (CPU 서빙용)
+RUNTIMES = ("full", "lite")
+DEFAULT_RUNTIME = os.environ.get("PREDICTION_RUNTIME", "full")
+LITE_QUANTIZATION = "float16"
+
+# 학습 때 메모리에 올리는 최대 행 수 (데이터 자체는 디스크에 메모리 맵으로 둔다)
+MAX_TRAIN_ROWS = 200_000
+
+
+def _load_training_arrays():
+    arrays, _ = load_dataset(generate_dataset(n_lags=N_LAGS, horizon=1, model=FEATURE_SCHEMA["sim_model"]))
+    return arrays
+
+
+def _n_training_scenarios(arrays):
+    return max(1, len(arrays["trajectories"]) - HOLDOUT_SCENARIOS)
+
+
+def _load_training_rows():
+    """홀드아웃을 뺀 앞쪽 시나리오의 윈도우 행에서 최대 MAX_TRAIN_ROWS개 (X, y의 행은 시나리오 순서대로 놓여 있다)"""
+    arrays = _load_training_arrays()
+    rows_per_scenario = len(arrays["X"]) // len(arrays["trajectories"])
+    n_rows = _n_training_scenarios(arrays) * rows_per_scenario
+    return sample_rows(arrays["X"][:n_rows], arrays["y"][:n_rows], MAX_TRAIN_ROWS)
+
+
+def holdout_scenarios():
+    """학습에 쓰지 않은 뒤쪽 시나리오의 (trajectories, params) (메모리 맵 슬라이스)"""
+    arrays = _load_training_arrays()
+    n_train = _n_training_scenarios(arrays)
+    return arrays["trajectories"][n_train:], arrays["params"][n_train:]
+
+
+def _train_rf():
+    X_train, y_train = _load_training_rows()
+    return train_random_forest(X_train, y_train)
+
+
+def _training_scenarios(n_horizons):
+    """윈도우 행 수가 MAX_TRAIN_ROWS를 넘지 않는 만큼의 앞쪽 시나리오 (홀드아웃 제외, 메모리 맵 슬라이스)"""
+    arrays = _load_training_arrays()
+    windows_per_scenario = arrays["trajectories"].shape[1] - N_LAGS - n_horizons + 1
+    n = min(_n_training_scenarios(arrays), max(1, MAX_TRAIN_ROWS // windows_per_scenario))
+    return arrays["trajectories"][:n], arrays["params"][:n]
+
+
+def _train_direct_rf(n_horizons):
+    trajectories, params = _training_scenarios(n_horizons)
+    trajectories = np.asarray(trajectories)
+    X_train, y_train = make_windows(trajectories[:, :, 0], trajectories[:, :, 1], np.asarray(params),
+                                    N_LAGS, horizon=1, n_horizons=n_horizons)
+    return train_random_forest(X_train, y_train)
+
+
+def _train_lstm(n_horizons=1):
+    trajectories, params = _training_scenarios(n_horizons)
+    mean, variance = sequence_moments(trajectories, params)
+    model = build_lstm_model((N_LAGS, len(mean)), n_outputs=len(LSTM_SCHEMA["targets"]) * n_horizons,
+                             feature_mean=mean, feature_variance=variance)
+    # 윈도우는 첫 epoch에 만들고 메모리에 캐시
+    train_ds = sequence_dataset(trajectories, params, N_LAGS, horizon=1, cache="", n_horizons=n_horizons)
+    return train_lstm_model(model, train_ds)
+
+
+def _get_or_export(lite_type, full_type, schema, train_fn, export_fn, **export_kwargs):
+    """경량 모델이 저장되어 있으면 불러오고, 없으면 전체 모델(필요하면 학습)에서 변환해 저장"""
+    lite_schema = dict(schema, **export_kwargs)
+    entry = load_latest(lite_type, lite_schema)
+    if entry is not None:
+        return entry[0]
+    full = get_or_train(full_type, schema, train_fn)
+    return get_or_train(lite_type, lite_schema, partial(export_fn, full, **export_kwargs))
+
+
+def _load_model(model_type, strategy, sim_model, runtime=DEFAULT_RUNTIME):
+    """
+    (모델, 예측 함수, 입력 형태, 한 번에 내는 스텝 수).
+    모델은 최초 1회 학습하고 이후에는 저장소에서 불러온다.
+    runtime="lite"이면 전체 모델 대신 CPU 서빙용으로 변환한 경량 모델을 쓴다.
+    """
+    if sim_model != FEATURE_SCHEMA["sim_model"]:
+        raise ValueError(f"모델은 {FEATURE_SCHEMA['sim_model']} 시뮬레이션 데이터로 학습되었습니다: {sim_model}")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"알 수 없는 strategy: {strategy}")
+    if runtime not in RUNTIMES:
+        raise ValueError(f"알 수 없는 runtime: {runtime}")
+    n_horizons = DIRECT_HORIZONS if strategy == "direct" else 1
+
+    if model_type == "rf":
+        if strategy == "direct":
+            schema = feature_schema(n_lags=N_LAGS, horizon=1, n_horizons=n_horizons)
+            train_fn = partial(_train_direct_rf, n_horizons)
+        else:
+            schema, train_fn = FEATURE_SCHEMA, _train_rf
+        if runtime == "lite":
+            model = _get_or_export("rf_flat", "rf", schema, train_fn, export_random_forest)
+            return model, predict_flat_forest_with_uncertainty, "flat", n_horizons
+        model = get_or_train("rf", schema, train_fn)
+        return model, predict_random_forest_with_uncertainty, "flat", n_horizons
+    if model_type == "lstm":
+        schema = sequence_schema(window=N_LAGS, horizon=1, n_horizons=n_horizons)
+        train_fn = partial(_train_lstm, n_horizons)
+        if runtime == "lite":
+            model = _get_or_export("lstm_tflite", "lstm", schema, train_fn, export_lstm_tflite,
+                                   quantization=LITE_QUANTIZATION)
+            return model, predict_tflite_with_uncertainty, "sequence", n_horizons
+        model = get_or_train("lstm", schema, train_fn)
+        return model, predict_lstm_with_uncertainty, "sequence", n_horizons
+    raise ValueError(f"알 수 없는 model_type: {model_type}")
+
+
 def plot_prediction(df_all):
     plt.figure(figsize=(10,5))
     for col in ['oxygen', 'co2']:
@@ -37,67 +181,51 @@ def run_prediction_ai(
     dt_min,
     light_on,
     model_type="rf",
+    sim_model="mass_balance",
+    strategy="recursive",
+    runtime=DEFAULT_RUNTIME,
 ):
     """
     AI 예측 함수 (랜덤포레스트, LSTM 선택 가능)
-    
-    (실제 데이터 전처리 및 feature 생성 코드는 구현 필요)
-    """
 
-    # === 데이터 준비 (더미 데이터 예시) ===
-    n_train = 100
-    n_test = int(predict_hours / dt_min)
-    n_features = 5
+    시뮬레이션 구간은 시뮬레이터 캐시를 거치므로 sim_hours만 늘어난 경우
+    이전 결과의 마지막 상태에서 이어서 계산된다.
+    모델은 시뮬레이터로 생성한 데이터로 최초 1회 학습되며,
+    시뮬레이션 마지막 N_LAGS개 값에서 시작해 예측한다.
+    strategy="recursive"는 한 스텝씩 예측값을 다시 입력으로 넣고,
+    "direct"는 DIRECT_HORIZONS 스텝을 한 번에 예측한다.
+    runtime="lite"이면 변환된 경량 모델로 추론한다 (LSTM은 이때 불확실성이 0).
+    """
+    # === 시뮬레이션 구간 계산 ===
+    sim = run_simulation_cached(
+        room_volume_m3=room_volume_m3,
+        people=people,
+        plants=plants,
+        ach=ach,
+        duration_min=sim_hours,
+        dt_min=dt_min,
+        light_on=light_on,
+        model=sim_model,
+    )
+    time_sim = sim.times_min
+    oxygen_sim = sim.o2_pct
+    co2_sim = sim.co2_pct
+    if len(time_sim) < N_LAGS:
+        raise ValueError(f"시뮬레이션 구간이 너무 짧습니다. 최소 {N_LAGS}개 시점이 필요합니다.")
 
-    X_train = np.random.rand(n_train, n_features)
-    y_train = np.random.rand(n_train, 2)  # 산소, 이산화탄소 농도
-    X_test = np.random.rand(n_test, n_features)
+    # === 모델 학습(최초 1회, 이후 저장소에서 불러옴) ===
+    model, predict_fn, layout, n_horizons = _load_model(model_type, strategy, sim_model, runtime)
 
-    # LSTM 입력 형태 (예시)
-    input_shape = (X_train.shape[1],)
+    # === 마지막 N_LAGS개 시뮬레이션 값에서 이어서 예측 ===
+    n_test = int(_n_steps(predict_hours, dt_min))
+    room = params_matrix(room_volume_m3, people, plants, ach, light_on, dt_min)
+    preds, uncertainty = rollout(predict_fn, model, oxygen_sim[None, -N_LAGS:], co2_sim[None, -N_LAGS:],
+                                 room, n_test, n_horizons, layout)
+    preds = preds[0]                   # (N, 2)
+    target_std = uncertainty[0]        # (N, 2) 타깃별 표준편차 (oxygen_std, co2_std 컬럼)
+    uncertainty = target_std.mean(axis=1)
 
-    # === 모델 학습 및 예측 ===
-    if model_type == "rf":
-        model = train_random_forest(X_train, y_train)
-        preds, uncertainty = predict_random_forest_with_uncertainty(model, X_test)
-    elif model_type == "lstm":
-        model = build_lstm_model(input_shape)
-        model = train_lstm_model(model, X_train, y_train)
-        preds, uncertainty = predict_lstm_with_uncertainty(model, X_test)
-    else:
-        raise ValueError(f"알 수 없는 model_type: {model_type}")
-
-    preds = np.array(preds)           # shape (N, 2)
-    uncertainty = np.array(uncertainty)  # 예상 shape (M,) or (M,1) or (N,2)
-
-    print(f"Before adjustment: preds.shape={preds.shape}, uncertainty.shape={uncertainty.shape}")
-
-    # 1) 만약 uncertainty가 (N, 2)라면 각 변수별 평균 또는 최대값 등으로 1차원으로 변환
-    if uncertainty.ndim == 2 and uncertainty.shape[1] == 2:
-        uncertainty = uncertainty.mean(axis=1)
-        print(f"Uncertainty reduced to 1D: {uncertainty.shape}")
-
-    # 2) uncertainty가 (M, 1)이라면 1차원으로 평탄화
-    elif uncertainty.ndim == 2 and uncertainty.shape[1] == 1:
-        uncertainty = uncertainty.ravel()
-        print(f"Uncertainty flattened: {uncertainty.shape}")
-
-    # 3) 길이 맞추기 (자르거나 채우기)
-    if len(uncertainty) > len(preds):
-        uncertainty = uncertainty[:len(preds)]
-        print(f"Uncertainty truncated to match preds: {uncertainty.shape}")
-    elif len(uncertainty) < len(preds):
-        fill_len = len(preds) - len(uncertainty)
-        uncertainty = np.concatenate([uncertainty, np.full(fill_len, uncertainty[-1])])
-        print(f"Uncertainty padded to match preds: {uncertainty.shape}")
-
-    if len(preds) != len(uncertainty):
-        raise ValueError(f"예측값 개수({len(preds)})와 불확실성 개수({len(uncertainty)})가 다릅니다.")
-
-    # === 시뮬레이션 더미 데이터 생성 ===
-    time_sim = np.arange(0, sim_hours + dt_min, dt_min)
-    oxygen_sim = np.random.rand(len(time_sim)) * 20 + 1  # 예시값, 실제 시뮬레이션으로 대체 가능
-    co2_sim = np.random.rand(len(time_sim)) * 0.05       # 예시값
+    # === 시뮬레이션 구간 ===
     uncertainty_sim = np.zeros(len(time_sim))            # 시뮬레이션 데이터는 불확실성 0 또는 NaN 가능
 
     df_sim = pd.DataFrame({
@@ -105,18 +233,21 @@ def run_prediction_ai(
         "oxygen": oxygen_sim,
         "co2": co2_sim,
         "uncertainty": uncertainty_sim,
+        "oxygen_std": uncertainty_sim,
+        "co2_std": uncertainty_sim,
         "type": "simulated"
     })
 
     # === 예측 데이터 시간 생성 ===
-    time_pred_start = time_sim[-1] + dt_min
-    time_pred = np.arange(time_pred_start, time_pred_start + len(preds)*dt_min, dt_min)
+    time_pred = time_sim[-1] + dt_min * np.arange(1, len(preds) + 1)
 
     df_pred = pd.DataFrame({
         "time": time_pred,
         "oxygen": preds[:, 0],
         "co2": preds[:, 1],
         "uncertainty": uncertainty,
+        "oxygen_std": target_std[:, 0],
+        "co2_std": target_std[:, 1],
         "type": "predicted"
     })
 
@@ -126,3 +257,50 @@ def run_prediction_ai(
     return df_all
 
 
+def run_prediction_batch(
+    sim_hours,
+    predict_hours,
+    room_volume_m3,
+    people,
+    plants,
+    ach,
+    dt_min,
+    light_on,
+    model_type="rf",
+    sim_model="mass_balance",
+    strategy="recursive",
+    runtime=DEFAULT_RUNTIME,
+):
+    """
+    여러 방을 run_simulation_batch와 같은 열(column) 입력으로 받아
+    한꺼번에 시뮬레이션한 뒤 그 끝에서 이어서 예측한다.
+    모든 방을 한 배치로 묶으므로 모델 호출 수는 방 개수와 관계없이 예측 스텝(블록) 수만큼이다.
+    """
+    sim = run_simulation_batch(room_volume_m3, people, plants, ach, sim_hours, dt_min, light_on, model=sim_model)
+    n = len(sim)
+    if np.any(sim.lengths < N_LAGS):
+        raise ValueError(f"시뮬레이션 구간이 너무 짧습니다. 최소 {N_LAGS}개 시점이 필요합니다.")
+    model, predict_fn, layout, n_horizons = _load_model(model_type, strategy, sim_model, runtime)
+
+    # 방마다 시뮬레이션 길이가 다르므로 마지막 N_LAGS개 위치를 따로 모은다
+    rows = np.arange(n)[:, None]
+    last = sim.lengths[:, None] - N_LAGS + np.arange(N_LAGS)
+    room = np.broadcast_to(params_matrix(room_volume_m3, people, plants, ach, light_on, dt_min),
+                           (n, len(PARAM_NAMES)))
+    dt = np.broadcast_to(np.asarray(dt_min, dtype=float), (n,))
+    n_pred = _n_steps(np.broadcast_to(predict_hours, (n,)), dt)
+
+    preds, std = rollout(predict_fn, model, sim.o2_pct[rows, last], sim.co2_pct[rows, last],
+                         room, int(n_pred.max()), n_horizons, layout)
+
+    step = np.arange(1, preds.shape[1] + 1)
+    valid = step[None, :] <= n_pred[:, None]
+    times = sim.times_min[np.arange(n), sim.lengths - 1][:, None] + step[None, :] * dt[:, None]
+    return BatchForecastResult(
+        np.where(valid, times, np.nan),
+        np.where(valid, preds[:, :, 0], np.nan),
+        np.where(valid, preds[:, :, 1], np.nan),
+        np.where(valid, std[:, :, 0], np.nan),
+        np.where(valid, std[:, :, 1], np.nan),
+        n_pred,
+    )
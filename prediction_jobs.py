@@ -0,0 +1,124 @@
+"""
+AI 예측 작업 큐.
+run_prediction_ai를 Streamlit 스크립트 스레드가 아니라 별도 프로세스 풀에서 실행한다.
+앱은 submit으로 작업 ID를 받아 두고 재실행될 때마다 poll로 상태를 확인한다.
+같은 입력의 작업이 이미 실행 중이거나 끝나 있으면 새로 실행하지 않고 그 작업을 공유한다.
+
+작업 프로세스 수는 PREDICTION_WORKERS 환경 변수(기본 2)로 정한다.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import model_registry
+from prediction import run_prediction_ai
+
+DEFAULT_WORKERS = int(os.environ.get("PREDICTION_WORKERS", 2))
+
+
+def job_key(inputs):
+    """입력 dict의 정규화 해시 (중복 작업 판별용)"""
+    normalized = {k: (v.item() if hasattr(v, "item") else v) for k, v in inputs.items()}
+    canonical = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _init_worker(train_lock):
+    # 여러 작업 프로세스가 같은 모델을 동시에 학습하지 않도록 학습 구간을 프로세스 간에 직렬화
+    model_registry.set_train_lock(train_lock)
+
+
+class PredictionJobQueue:
+    """
+    프로세스 풀 기반 예측 작업 큐.
+    끝난 작업 결과는 최근 max_finished개까지 보관하고 오래된 것부터 버린다.
+    """
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_finished=64):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # 스레드가 많은 Streamlit 서버와 TensorFlow는 fork와 맞지 않으므로 spawn으로 띄운다
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=ctx,
+                initializer=_init_worker, initargs=(ctx.Lock(),),
+            )
+        return self._executor
+
+    def submit(self, **inputs):
+        """run_prediction_ai(**inputs) 작업을 등록하고 작업 ID를 반환"""
+        key = job_key(inputs)
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._jobs.move_to_end(key)
+                return key
+            try:
+                future = self._get_executor().submit(run_prediction_ai, **inputs)
+            except BrokenProcessPool:
+                # 작업 프로세스가 비정상 종료되면 풀을 새로 만든다
+                self._executor = None
+                future = self._get_executor().submit(run_prediction_ai, **inputs)
+            self._jobs[key] = future
+            self._trim()
+        return key
+
+    def _trim(self):
+        finished = [k for k, f in self._jobs.items() if f.done()]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
+
+    def poll(self, job_id):
+        """
+        작업 상태 dict를 반환한다.
+        status: "pending" | "running" | "done" | "error" | "unknown"
+        """
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None:
+            return {"status": "unknown", "result": None, "error": None}
+        if not future.done():
+            return {"status": "running" if future.running() else "pending", "result": None, "error": None}
+        error = future.exception()
+        if error is not None:
+            return {"status": "error", "result": None, "error": error}
+        return {"status": "done", "result": future.result(), "error": None}
+
+    def stats(self):
+        with self._lock:
+            futures = list(self._jobs.values())
+        done = sum(f.done() for f in futures)
+        return {"workers": self.max_workers, "in_flight": len(futures) - done, "finished": done}
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+            self._jobs.clear()
+
+
+# 프로세스 전역 큐: 모든 사용자 세션이 같은 작업 프로세스를 공유한다
+_JOB_QUEUE = PredictionJobQueue()
+
+
+def submit_prediction(**inputs):
+    return _JOB_QUEUE.submit(**inputs)
+
+
+def poll_prediction(job_id):
+    return _JOB_QUEUE.poll(job_id)
+
+
+def prediction_job_stats():
+    return _JOB_QUEUE.stats()
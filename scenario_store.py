@@ -0,0 +1,176 @@
+"""
+SQLite 기반 사용자 시나리오 저장소.
+사용자/이름/즐겨찾기를 색인해 두어 목록 조회가 인덱스 질의 한 번으로 끝나고,
+시나리오를 저장할 때 계산해 둔 시뮬레이션 결과도 함께 보관해 불러올 때 다시 계산하지 않는다.
+처음 열 때 기존 user_scenarios/<user>/<name>.json 파일을 한 번 옮겨 온다.
+
+    scenarios         (user, name) -> 입력값 JSON, 즐겨찾기
+    scenario_results  (user, name) -> 입력 해시, (T, 3) 결과 배열
+"""
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from simulator import SimulationResult, scenario_key
+
+SCENARIO_DB = "scenarios.db"
+SCENARIO_DIR = "user_scenarios"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    user TEXT NOT NULL,
+    name TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    favorite INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scenarios_favorite ON scenarios (user, favorite, name);
+CREATE TABLE IF NOT EXISTS scenario_results (
+    user TEXT NOT NULL,
+    name TEXT NOT NULL,
+    input_key TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (user, name),
+    FOREIGN KEY (user, name) REFERENCES scenarios (user, name) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _pack_result(sim):
+    buf = io.BytesIO()
+    np.save(buf, sim.to_numpy(), allow_pickle=False)
+    return buf.getvalue()
+
+
+def _unpack_result(data, params):
+    arr = np.load(io.BytesIO(data), allow_pickle=False)
+    return SimulationResult(arr[:, 0], arr[:, 1], arr[:, 2], params, dtype=arr.dtype)
+
+
+class ScenarioStore:
+    """
+    스레드마다 연결을 따로 열고 WAL 모드로 동작해 여러 세션이 동시에 읽고 쓸 수 있다.
+    """
+    def __init__(self, path=SCENARIO_DB, json_dir=SCENARIO_DIR):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.migrate_json(json_dir)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def migrate_json(self, json_dir=SCENARIO_DIR):
+        """기존 JSON 시나리오 파일을 한 번만 옮겨 온다 (이미 DB에 있는 이름은 건드리지 않음)"""
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+        rows = []
+        if os.path.isdir(json_dir):
+            for user in os.listdir(json_dir):
+                user_dir = os.path.join(json_dir, user)
+                if not os.path.isdir(user_dir):
+                    continue
+                for filename in os.listdir(user_dir):
+                    if not filename.endswith(".json"):
+                        continue
+                    filepath = os.path.join(user_dir, filename)
+                    with open(filepath, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    rows.append((user, filename[:-5], json.dumps(data.get("inputs"), ensure_ascii=False),
+                                 int(bool(data.get("favorite", False))), os.path.getmtime(filepath)))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO scenarios (user, name, inputs, favorite, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),))
+        return len(rows)
+
+    def save(self, user, name, inputs, favorite=False, result=None):
+        """
+        시나리오를 저장(덮어쓰기)한다.
+        result(SimulationResult)가 이 입력으로 계산된 결과이면 함께 저장한다.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scenarios (user, name, inputs, favorite, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (user, name, json.dumps(inputs, ensure_ascii=False), int(bool(favorite)), time.time()),
+            )
+            conn.execute("DELETE FROM scenario_results WHERE user = ? AND name = ?", (user, name))
+            if result is not None and result.params is not None and scenario_key(result.params) == scenario_key(inputs):
+                conn.execute(
+                    "INSERT INTO scenario_results (user, name, input_key, data) VALUES (?, ?, ?, ?)",
+                    (user, name, scenario_key(inputs), _pack_result(result)),
+                )
+
+    def list(self, user):
+        """(전체 이름 목록, 즐겨찾기 이름 목록)"""
+        rows = self._connect().execute(
+            "SELECT name, favorite FROM scenarios WHERE user = ? ORDER BY name", (user,)
+        ).fetchall()
+        return [name for name, _ in rows], [name for name, favorite in rows if favorite]
+
+    def load(self, user, name):
+        """저장된 입력값, 없으면 None"""
+        row = self._connect().execute(
+            "SELECT inputs FROM scenarios WHERE user = ? AND name = ?", (user, name)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_result(self, user, name):
+        """저장된 시뮬레이션 결과, 없거나 입력이 바뀌었으면 None"""
+        row = self._connect().execute(
+            "SELECT s.inputs, r.input_key, r.data FROM scenarios s "
+            "JOIN scenario_results r ON r.user = s.user AND r.name = s.name "
+            "WHERE s.user = ? AND s.name = ?", (user, name)
+        ).fetchone()
+        if row is None:
+            return None
+        inputs = json.loads(row[0])
+        if scenario_key(inputs) != row[1]:
+            return None
+        return _unpack_result(row[2], dict(inputs, model=inputs.get("model", "linear")))
+
+    def set_favorite(self, user, name, favorite=True):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE scenarios SET favorite = ? WHERE user = ? AND name = ?",
+                         (int(bool(favorite)), user, name))
+
+    def delete(self, user, name):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM scenarios WHERE user = ? AND name = ?", (user, name))
+
+
+_DEFAULT_STORE = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def get_scenario_store():
+    """프로세스 전역 저장소 (처음 사용할 때 열고 JSON 파일을 옮겨 온다)"""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = ScenarioStore()
+        return _DEFAULT_STORE
@@ -1,50 +1,480 @@
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import streamlit as st
 
+from downsample import downsample_indices
+
 class SimulationResult:
-    def __init__(self, times_min, o2_pct, co2_pct):
-        self.times_min = times_min
-        self.o2_pct = o2_pct
-        self.co2_pct = co2_pct
+    """
+    시뮬레이션 결과.
+    시간/O2/CO2를 하나의 연속된 (3, T) 배열에 담고 각 열은 그 배열의 뷰로 노출한다.
+    to_numpy / to_pandas / to_arrow는 이 배열을 복사하지 않고 공유한다.
+    """
+    __slots__ = ("_data", "params")
+
+    COLUMNS = ("times_min", "o2_pct", "co2_pct")
+
+    def __init__(self, times_min, o2_pct, co2_pct, params=None, dtype=np.float64):
+        times_min = np.asarray(times_min)
+        data = np.empty((3, len(times_min)), dtype=dtype)
+        data[0] = times_min
+        data[1] = o2_pct
+        data[2] = co2_pct
+        self._data = data
+        # 결과를 만든 입력값 (이어서 계산할 때 사용)
+        self.params = params
+
+    @property
+    def times_min(self):
+        return self._data[0]
+
+    @property
+    def o2_pct(self):
+        return self._data[1]
+
+    @property
+    def co2_pct(self):
+        return self._data[2]
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    def freeze(self):
+        """여러 곳에서 공유할 결과가 수정되지 않도록 읽기 전용으로 만든다"""
+        self._data.flags.writeable = False
+        return self
+
+    def to_numpy(self):
+        """(T, 3) 배열 뷰 (열 순서: 시간, O2, CO2)"""
+        return self._data.T
+
+    def to_pandas(self, columns=COLUMNS):
+        import pandas as pd
+        return pd.DataFrame(self._data.T, columns=list(columns), copy=False)
+
+    def to_arrow(self, columns=COLUMNS):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Arrow 내보내기에는 pyarrow가 필요합니다.") from e
+        return pa.Table.from_arrays([pa.array(col) for col in self._data], names=list(columns))
+
+    def to_parquet(self, path, columns=COLUMNS):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet 내보내기에는 pyarrow가 필요합니다.") from e
+        pq.write_table(self.to_arrow(columns), path)
+
+BASE_O2_PCT = 21.0  # 초기 산소 %
+BASE_CO2_PCT = 0.04  # 초기 CO2 %
+
+# 위험 기준
+DANGER_O2_PCT = 19.5  # 이 값 미만이면 저산소 위험
+DANGER_CO2_PCT = 0.1  # 이 값 초과면 CO2 위험
+
+# 물질수지 모델 상수 (앉아 있는 성인 기준 근사값)
+CO2_EMISSION_M3_PER_MIN = 0.0052 * 60 / 1000  # 1인당 CO2 배출량 (0.0052 L/s)
+RESPIRATORY_QUOTIENT = 0.83  # 호흡계수 (배출 CO2 / 소비 O2)
+PLANT_CO2_UPTAKE_M3_PER_MIN = 1.0e-5  # 빛이 있을 때 화분 1개의 CO2 흡수량
+
+
+def _time_axis(duration_min, dt_min):
+    """0분부터 duration_min까지 dt_min 간격의 시간 축 (소수 간격 허용)"""
+    if dt_min <= 0:
+        raise ValueError(f"시간 간격은 0보다 커야 합니다: {dt_min}")
+    return np.arange(_n_steps(duration_min, dt_min) + 1, dtype=float) * dt_min
+
+
+def _n_steps(duration_min, dt_min):
+    # 부동소수 오차로 마지막 점이 빠지지 않도록 약간의 여유를 둔다
+    return np.floor(np.asarray(duration_min) / np.asarray(dt_min) + 1e-9).astype(int)
+
+
+def _linear_model(times_min, room_volume_m3, people, plants, ach, duration_min, light_on):
+    """
+    단순 선형 모델의 O2/CO2 계산 커널.
+    모든 인자는 브로드캐스트 가능한 배열이어서 단일/배치 실행이 같은 식을 공유한다.
+    """
+    frac = times_min / duration_min
+
+    # 사람 호흡에 의한 산소 소비, CO2 증가 (단순 비례)
+    o2_drop = people * 0.01 * frac
+    co2_rise = people * 0.005 * frac
+
+    # 환기에 따른 희석 (ACH 고려, 단순 비례 감소), 최소 50% 유지
+    ventilation_factor = np.maximum(1 - ach * times_min / (duration_min * 60), 0.5)
+
+    # 식물 광합성 효과 (빛이 있고 식물이 있을 때만)
+    active_plants = np.where(np.logical_and(light_on, plants > 0), plants, 0)
+    o2_increase = active_plants * 0.005 * frac
+    co2_decrease = active_plants * 0.003 * frac
+
+    o2_pct = np.maximum((BASE_O2_PCT - o2_drop + o2_increase) * ventilation_factor, 10)  # 10% 이상으로 제한
+    co2_pct = np.maximum((BASE_CO2_PCT + co2_rise - co2_decrease) * ventilation_factor, 0)
+    return o2_pct, co2_pct
+
 
-def run_simulation(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on):
+def _mass_balance_rates(room_volume_m3, people, plants, light_on):
+    """사람/식물에 의한 O2, CO2 농도 변화율 (%/분)"""
+    active_plants = np.where(np.logical_and(light_on, plants > 0), plants, 0)
+    co2_source = people * CO2_EMISSION_M3_PER_MIN - active_plants * PLANT_CO2_UPTAKE_M3_PER_MIN
+    o2_source = active_plants * PLANT_CO2_UPTAKE_M3_PER_MIN - people * CO2_EMISSION_M3_PER_MIN / RESPIRATORY_QUOTIENT
+    return o2_source / room_volume_m3 * 100, co2_source / room_volume_m3 * 100
+
+
+def _mass_balance_model(times_min, room_volume_m3, people, plants, ach, duration_min, light_on,
+                        o2_start=BASE_O2_PCT, co2_start=BASE_CO2_PCT):
+    """
+    완전 혼합(well-mixed) 실내 물질수지 모델.
+        dC/dt = S / V + λ (C_out - C),   λ = ACH / 60 (1/분)
+    입력이 일정하므로 적분 없이 지수 해석해를 출력 시점에서 바로 계산한다.
+        C(t) = C_out + (C0 - C_out) e^(-λt) + (S / V) (1 - e^(-λt)) / λ
+    λ = 0 이면 (1 - e^(-λt)) / λ 는 t 로 수렴한다.
+    """
+    lam = np.asarray(ach, dtype=float) / 60.0
+    decay = np.exp(-lam * times_min)
+    safe_lam = np.where(lam > 0, lam, 1.0)
+    growth = np.where(lam > 0, -np.expm1(-lam * times_min) / safe_lam, times_min)
+
+    o2_rate, co2_rate = _mass_balance_rates(room_volume_m3, people, plants, light_on)
+    o2_pct = BASE_O2_PCT + (o2_start - BASE_O2_PCT) * decay + o2_rate * growth
+    co2_pct = BASE_CO2_PCT + (co2_start - BASE_CO2_PCT) * decay + co2_rate * growth
+    return np.maximum(o2_pct, 0), np.maximum(co2_pct, 0)
+
+
+MODELS = {
+    "linear": _linear_model,
+    "mass_balance": _mass_balance_model,
+}
+
+
+def _get_model(model):
+    if model not in MODELS:
+        raise ValueError(f"알 수 없는 model: {model}")
+    return MODELS[model]
+
+
+def run_simulation(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear"):
     """
     단순 시뮬레이션 예제:
     시간 경과에 따라 O2는 점점 줄고 CO2는 증가하는 간단 모델.
     식물 있으면 광합성으로 O2 증가, CO2 감소 효과 포함.
+    전체 시간 축을 NumPy 배열 연산으로 한 번에 계산한다.
+
+    model="mass_balance" 이면 부피/환기율을 반영한 물질수지 모델을 사용한다.
+    """
+    kernel = _get_model(model)
+    times_min = _time_axis(duration_min, dt_min)
+    o2_pct, co2_pct = kernel(times_min, room_volume_m3, people, plants, ach, duration_min, light_on)
+    params = dict(
+        room_volume_m3=room_volume_m3,
+        people=people,
+        plants=plants,
+        ach=ach,
+        duration_min=duration_min,
+        dt_min=dt_min,
+        light_on=light_on,
+        model=model,
+    )
+    return SimulationResult(times_min, o2_pct, co2_pct, params)
+
+
+def iter_simulation(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear",
+                    chunk_size=256, o2_threshold=None, co2_threshold=None):
+    """
+    결과를 (시간, O2, CO2) 배열 묶음(chunk)으로 나눠 차례로 내보내는 스트리밍 버전.
+    o2_threshold / co2_threshold를 주면 지정한 기준을 모두 넘은 chunk까지만 계산하고 멈춘다.
+    (O2는 기준 미만, CO2는 기준 초과를 위험으로 본다)
+    """
+    kernel = _get_model(model)
+    if dt_min <= 0:
+        raise ValueError(f"시간 간격은 0보다 커야 합니다: {dt_min}")
+    n_total = int(_n_steps(duration_min, dt_min)) + 1
+    o2_pending = o2_threshold is not None
+    co2_pending = co2_threshold is not None
+    stop_early = o2_pending or co2_pending
+
+    for start in range(0, n_total, chunk_size):
+        times_min = np.arange(start, min(start + chunk_size, n_total), dtype=float) * dt_min
+        o2_pct, co2_pct = kernel(times_min, room_volume_m3, people, plants, ach, duration_min, light_on)
+        yield times_min, o2_pct, co2_pct
+
+        if o2_pending and np.any(o2_pct < o2_threshold):
+            o2_pending = False
+        if co2_pending and np.any(co2_pct > co2_threshold):
+            co2_pending = False
+        if stop_early and not (o2_pending or co2_pending):
+            return
+
+
+def find_danger_times(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear",
+                      o2_threshold=DANGER_O2_PCT, co2_threshold=DANGER_CO2_PCT, chunk_size=256):
+    """
+    O2가 기준 미만, CO2가 기준 초과로 처음 바뀌는 시각(분)을 반환한다. 넘지 않으면 None.
+    두 기준을 모두 찾으면 남은 구간은 계산하지 않는다.
+    """
+    o2_time = None
+    co2_time = None
+    for times_min, o2_pct, co2_pct in iter_simulation(
+        room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model=model,
+        chunk_size=chunk_size, o2_threshold=o2_threshold, co2_threshold=co2_threshold,
+    ):
+        if o2_time is None and o2_threshold is not None:
+            below = np.flatnonzero(o2_pct < o2_threshold)
+            if below.size:
+                o2_time = float(times_min[below[0]])
+        if co2_time is None and co2_threshold is not None:
+            above = np.flatnonzero(co2_pct > co2_threshold)
+            if above.size:
+                co2_time = float(times_min[above[0]])
+    return o2_time, co2_time
+
+
+# 마지막 상태만으로 이어서 계산할 수 있는 모델
+RESUMABLE_MODELS = {"mass_balance"}
+
+
+def extend_simulation(sim: SimulationResult, extra_min):
     """
-    times_min = [i for i in range(0, int(duration_min)+1, int(dt_min))]
-    o2_pct = []
-    co2_pct = []
+    기존 결과의 마지막 상태에서 extra_min 분만큼 이어서 계산한 새 결과를 반환한다.
+    앞부분은 다시 계산하지 않고 배열 뒤에 덧붙인다.
+    선형 모델은 곡선 전체가 duration_min에 비례해 바뀌므로 처음부터 다시 계산한다.
+    """
+    if sim.params is None:
+        raise ValueError("입력값(params)이 없는 결과는 이어서 계산할 수 없습니다.")
+    params = dict(sim.params, duration_min=sim.params["duration_min"] + extra_min)
+    if params["model"] not in RESUMABLE_MODELS:
+        return run_simulation(**params)
+
+    dt_min = params["dt_min"]
+    n_done = len(sim.times_min) - 1
+    n_total = int(_n_steps(params["duration_min"], dt_min))
+    if n_total <= n_done:
+        return SimulationResult(sim.times_min, sim.o2_pct, sim.co2_pct, params)
+
+    # 전체 계산과 같은 격자를 유지하도록 시간은 절대 스텝 번호로 만든다
+    step_idx = np.arange(n_done + 1, n_total + 1, dtype=float)
+    new_times = step_idx * dt_min
+    o2_new, co2_new = _mass_balance_model(
+        new_times - sim.times_min[-1],
+        params["room_volume_m3"], params["people"], params["plants"], params["ach"],
+        params["duration_min"], params["light_on"],
+        o2_start=sim.o2_pct[-1], co2_start=sim.co2_pct[-1],
+    )
+    return SimulationResult(
+        np.concatenate([sim.times_min, new_times]),
+        np.concatenate([sim.o2_pct, o2_new]),
+        np.concatenate([sim.co2_pct, co2_new]),
+        params,
+    )
+
+
+class BatchSimulationResult:
+    """
+    여러 시나리오의 결과를 (N, T) 2차원 배열로 묶은 결과.
+    시나리오마다 길이가 다르면 남는 칸은 NaN으로 채우고 lengths에 실제 길이를 둔다.
+    """
+    def __init__(self, times_min, o2_pct, co2_pct, lengths):
+        self.times_min = times_min
+        self.o2_pct = o2_pct
+        self.co2_pct = co2_pct
+        self.lengths = lengths
 
-    base_o2 = 21.0  # 초기 산소 %
-    base_co2 = 0.04  # 초기 CO2 %
+    def __len__(self):
+        return len(self.lengths)
 
-    for t in times_min:
-        # 사람 호흡에 의한 산소 소비, CO2 증가 (단순 비례)
-        o2_drop = people * 0.01 * t / duration_min
-        co2_rise = people * 0.005 * t / duration_min
+    def __getitem__(self, i):
+        n = self.lengths[i]
+        return SimulationResult(self.times_min[i, :n], self.o2_pct[i, :n], self.co2_pct[i, :n])
 
-        # 환기에 따른 희석 (ACH 고려, 단순 비례 감소)
-        ventilation_factor = (1 - ach * t / (duration_min*60))
-        ventilation_factor = max(ventilation_factor, 0.5)  # 최소 50% 유지
 
-        # 식물 광합성 효과
-        if light_on and plants > 0:
-            o2_increase = plants * 0.005 * t / duration_min
-            co2_decrease = plants * 0.003 * t / duration_min
+def _as_columns(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on):
+    """배치 입력을 같은 길이의 1차원 배열들로 맞춘다 (스칼라는 전체에 적용)"""
+    columns = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a)) for a in
+          (room_volume_m3, people, plants, ach, duration_min, dt_min, light_on))
+    )
+    if np.any(columns[5] <= 0):
+        raise ValueError("시간 간격은 0보다 커야 합니다.")
+    return columns
+
+
+def run_simulation_batch(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on, model="linear"):
+    """
+    N개의 시나리오를 열(column) 배열로 받아 한 번의 브로드캐스트 연산으로 계산한다.
+    스칼라 인자는 모든 시나리오에 공통으로 적용된다.
+    """
+    room_volume_m3, people, plants, ach, duration_min, dt_min, light_on = _as_columns(
+        room_volume_m3, people, plants, ach, duration_min, dt_min, light_on
+    )
+
+    kernel = _get_model(model)
+    n_steps = _n_steps(duration_min, dt_min)
+    step_idx = np.arange(n_steps.max() + 1)
+    valid = step_idx[None, :] <= n_steps[:, None]
+    times_min = step_idx[None, :] * dt_min[:, None].astype(float)
+
+    o2_pct, co2_pct = kernel(
+        times_min,
+        room_volume_m3[:, None].astype(float),
+        people[:, None],
+        plants[:, None],
+        ach[:, None],
+        duration_min[:, None].astype(float),
+        light_on[:, None].astype(bool),
+    )
+
+    times_min = np.where(valid, times_min, np.nan)
+    o2_pct = np.where(valid, o2_pct, np.nan)
+    co2_pct = np.where(valid, co2_pct, np.nan)
+    return BatchSimulationResult(times_min, o2_pct, co2_pct, n_steps + 1)
+
+
+def _normalize_inputs(inputs):
+    """입력 dict를 타입/기본값을 맞춘 정규형으로 변환 (캐시 키용)"""
+    return {
+        "room_volume_m3": float(inputs["room_volume_m3"]),
+        "people": int(inputs["people"]),
+        "plants": int(inputs["plants"]),
+        "ach": float(inputs["ach"]),
+        "duration_min": float(inputs["duration_min"]),
+        "dt_min": round(float(inputs["dt_min"]), 9),
+        "light_on": bool(inputs["light_on"]),
+        "model": str(inputs.get("model", "linear")),
+    }
+
+
+def scenario_key(inputs):
+    """정규화된 입력의 SHA-256 해시"""
+    canonical = json.dumps(_normalize_inputs(inputs), sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _prefix_key(inputs):
+    """duration_min을 제외한 입력의 해시 (이어서 계산할 후보 찾기용)"""
+    normalized = _normalize_inputs(inputs)
+    del normalized["duration_min"]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SimulationCache:
+    """
+    정규화된 입력 해시를 키로 하는 LRU 시뮬레이션 캐시.
+    항목 수(max_entries)와 결과 배열의 총 바이트(max_bytes) 중 하나라도 넘으면
+    가장 오래 사용되지 않은 항목부터 제거한다.
+    """
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # duration_min만 다른 입력끼리 가장 최근 결과의 키, 항목 키 -> 그 항목이 등록한 prefix
+        self._prefixes = {}
+        self._entry_prefixes = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_run(self, inputs):
+        key = scenario_key(inputs)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            prefix = _prefix_key(inputs)
+            base = self._entries.get(self._prefixes.get(prefix))
+
+        normalized = _normalize_inputs(inputs)
+        if (base is not None and normalized["model"] in RESUMABLE_MODELS
+                and base.params["duration_min"] < normalized["duration_min"]):
+            # 더 짧은 기존 결과가 있으면 남은 시간만 이어서 계산
+            sim = extend_simulation(base, normalized["duration_min"] - base.params["duration_min"])
         else:
-            o2_increase = 0
-            co2_decrease = 0
+            sim = run_simulation(**normalized)
+        # 여러 세션이 같은 결과를 공유하므로 읽기 전용으로 고정
+        sim.freeze()
+        self.put(key, sim, prefix)
+        return sim
+
+    def put(self, key, sim, prefix=None):
+        """결과를 넣는다. prefix를 주면 이어서 계산할 후보로도 등록한다 (항목이 제거되면 함께 제거)"""
+        nbytes = sim.nbytes
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = sim
+            self._nbytes += nbytes
+            if prefix is not None:
+                self._prefixes[prefix] = key
+                self._entry_prefixes[key] = prefix
+            while self._entries and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
 
-        current_o2 = (base_o2 - o2_drop + o2_increase) * ventilation_factor
-        current_co2 = (base_co2 + co2_rise - co2_decrease) * ventilation_factor
+    def put_result(self, sim):
+        """저장소 등에서 불러온 결과를 자기 입력(sim.params)의 키로 넣는다 (이어서 계산할 후보로도 등록)"""
+        sim.freeze()
+        self.put(scenario_key(sim.params), sim, _prefix_key(sim.params))
+        return sim
 
-        o2_pct.append(max(current_o2, 10))  # 10% 이상으로 제한
-        co2_pct.append(max(current_co2, 0))
+    def _remove(self, key):
+        """항목과 그 항목을 가리키는 prefix를 지운다 (락을 잡은 상태에서 호출)"""
+        self._nbytes -= self._entries.pop(key).nbytes
+        prefix = self._entry_prefixes.pop(key, None)
+        if prefix is not None and self._prefixes.get(prefix) == key:
+            del self._prefixes[prefix]
 
-    return SimulationResult(times_min, o2_pct, co2_pct)
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+            self._entry_prefixes.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "prefixes": len(self._prefixes),
+                "nbytes": self._nbytes,
+            }
+
+
+# 프로세스 전역 캐시: Streamlit 재실행과 사용자 세션 간에 공유된다
+_SIMULATION_CACHE = SimulationCache()
+
+
+def run_simulation_cached(**inputs):
+    """run_simulation과 같은 인자를 받되 동일 입력이면 캐시된 결과를 돌려준다"""
+    return _SIMULATION_CACHE.get_or_run(inputs)
+
+
+def cache_simulation_result(sim):
+    """저장소 등에서 불러온 결과를 캐시에 넣어 같은 입력을 다시 계산하지 않게 한다"""
+    return _SIMULATION_CACHE.put_result(sim)
+
+
+def simulation_cache_stats():
+    return _SIMULATION_CACHE.stats()
 
 
 def get_inputs(prefix="", unique_id=""):
@@ -72,12 +502,62 @@ def get_inputs(prefix="", unique_id=""):
     )
 
 
-def plot_results(sim: SimulationResult, label_prefix=""):
+# --- 그래프 ---
+# 그래프 폭(8인치 x 100dpi)보다 많은 점은 화면에서 구분되지 않으므로 그리기 전에 줄인다
+PLOT_DPI = 100
+PLOT_WIDTH_PX = 8 * PLOT_DPI
+PLOT_3D_MAX_POINTS = 2000
+FIGURE_CACHE_SIZE = 64
+
+# 결과 해시 -> 그린 그래프 (matplotlib는 PNG 바이트, plotly는 Figure). 재실행마다 다시 그리지 않는다
+_FIGURE_CACHE = OrderedDict()
+_FIGURE_CACHE_LOCK = threading.Lock()
+
+
+def result_key(sim: SimulationResult):
+    """결과의 해시: 단일 방 모델의 입력값이 있으면 입력 해시, 아니면 결과 배열의 해시"""
+    if sim.params is not None and sim.params.get("model", "linear") in MODELS:
+        try:
+            return scenario_key(sim.params)
+        except (KeyError, TypeError, ValueError):
+            pass
+    return hashlib.blake2b(np.ascontiguousarray(sim.to_numpy()).data, digest_size=16).hexdigest()
+
+
+def _cached_figure(key, render):
+    with _FIGURE_CACHE_LOCK:
+        if key in _FIGURE_CACHE:
+            _FIGURE_CACHE.move_to_end(key)
+            return _FIGURE_CACHE[key]
+    figure = render()
+    with _FIGURE_CACHE_LOCK:
+        _FIGURE_CACHE[key] = figure
+        while len(_FIGURE_CACHE) > FIGURE_CACHE_SIZE:
+            _FIGURE_CACHE.popitem(last=False)
+    return figure
+
+
+def _plot_points(sim: SimulationResult, max_points=PLOT_WIDTH_PX, method="minmax"):
+    """그릴 (시간, O2, CO2) 점 (O2/CO2가 같은 인덱스를 공유)"""
+    # to_numpy().T[1:]는 O2/CO2 두 행의 (2, T) 뷰
+    idx = downsample_indices(sim.times_min, sim.to_numpy().T[1:], max_points, method)
+    return sim.times_min[idx], sim.o2_pct[idx], sim.co2_pct[idx]
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=PLOT_DPI, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _render_results(sim: SimulationResult, label_prefix):
+    times_min, o2_pct, co2_pct = _plot_points(sim)
     fig, ax1 = plt.subplots(figsize=(8, 4))
     ax2 = ax1.twinx()
 
-    ax1.plot(sim.times_min, sim.o2_pct, label=label_prefix + 'O₂ (%)', color='blue', linewidth=2)
-    ax2.plot(sim.times_min, sim.co2_pct, label=label_prefix + 'CO₂ (%)', color='orange', linewidth=2)
+    ax1.plot(times_min, o2_pct, label=label_prefix + 'O₂ (%)', color='blue', linewidth=2)
+    ax2.plot(times_min, co2_pct, label=label_prefix + 'CO₂ (%)', color='orange', linewidth=2)
 
     ax1.set_xlabel("시간 (분)")
     ax1.set_ylabel("O₂ (%)")
@@ -89,15 +569,22 @@ def plot_results(sim: SimulationResult, label_prefix=""):
     lines_2, labels_2 = ax2.get_legend_handles_labels()
     ax1.legend(lines_1 + lines_2, labels_1 + labels_2, loc='upper right')
 
-    st.pyplot(fig)
+    return _to_png(fig)
 
 
-def plot_3d(sim: SimulationResult):
+def plot_results(sim: SimulationResult, label_prefix=""):
+    png = _cached_figure(("results", result_key(sim), label_prefix),
+                         lambda: _render_results(sim, label_prefix))
+    st.image(png, use_container_width=True)
+
+
+def _render_3d(sim: SimulationResult):
+    times_min, o2_pct, co2_pct = _plot_points(sim, PLOT_3D_MAX_POINTS // 2, method="lttb")
     fig = go.Figure()
     fig.add_trace(go.Scatter3d(
-        x=sim.times_min,
-        y=sim.o2_pct,
-        z=sim.co2_pct,
+        x=times_min,
+        y=o2_pct,
+        z=co2_pct,
         mode='lines+markers',
         line=dict(color='blue'),
         name='O₂ vs CO₂ vs 시간'
@@ -107,17 +594,24 @@ def plot_3d(sim: SimulationResult):
         yaxis_title='O₂ (%)',
         zaxis_title='CO₂ (%)'
     ), height=600)
+    return fig
+
+
+def plot_3d(sim: SimulationResult):
+    fig = _cached_figure(("3d", result_key(sim)), lambda: _render_3d(sim))
     st.plotly_chart(fig)
 
 
-def plot_compare_results(sim1: SimulationResult, sim2: SimulationResult):
+def _render_compare(sim1: SimulationResult, sim2: SimulationResult):
+    t1, o2_1, co2_1 = _plot_points(sim1)
+    t2, o2_2, co2_2 = _plot_points(sim2)
     fig, ax1 = plt.subplots(figsize=(8, 4))
     ax2 = ax1.twinx()
 
-    ax1.plot(sim1.times_min, sim1.o2_pct, label='시나리오 1 O₂', color='blue', linestyle='-')
-    ax1.plot(sim2.times_min, sim2.o2_pct, label='시나리오 2 O₂', color='blue', linestyle='--')
-    ax2.plot(sim1.times_min, sim1.co2_pct, label='시나리오 1 CO₂', color='orange', linestyle='-')
-    ax2.plot(sim2.times_min, sim2.co2_pct, label='시나리오 2 CO₂', color='orange', linestyle='--')
+    ax1.plot(t1, o2_1, label='시나리오 1 O₂', color='blue', linestyle='-')
+    ax1.plot(t2, o2_2, label='시나리오 2 O₂', color='blue', linestyle='--')
+    ax2.plot(t1, co2_1, label='시나리오 1 CO₂', color='orange', linestyle='-')
+    ax2.plot(t2, co2_2, label='시나리오 2 CO₂', color='orange', linestyle='--')
 
     ax1.set_xlabel("시간 (분)")
     ax1.set_ylabel("O₂ (%)")
@@ -129,4 +623,32 @@ def plot_compare_results(sim1: SimulationResult, sim2: SimulationResult):
     lines_2, labels_2 = ax2.get_legend_handles_labels()
     ax1.legend(lines_1 + lines_2, labels_1 + labels_2, loc='upper right')
 
+    return _to_png(fig)
+
+
+def plot_compare_results(sim1: SimulationResult, sim2: SimulationResult):
+    png = _cached_figure(("compare", result_key(sim1), result_key(sim2)),
+                         lambda: _render_compare(sim1, sim2))
+    st.image(png, use_container_width=True)
+
+
+def plot_uncertainty_bands(result):
+    """몬테카를로 결과(monte_carlo.MonteCarloResult)의 백분위 띠: 바깥/안쪽 범위와 중앙값"""
+    fig, axes = plt.subplots(2, 1, figsize=(8, 6), sharex=True)
+    p = list(result.percentiles)
+    mid = len(p) // 2
+    for ax, bands, label, color, danger in (
+        (axes[0], result.o2_bands, "O₂ (%)", "blue", DANGER_O2_PCT),
+        (axes[1], result.co2_bands, "CO₂ (%)", "orange", DANGER_CO2_PCT),
+    ):
+        for k in range(mid):
+            ax.fill_between(result.times_min, bands[k], bands[-1 - k], color=color, alpha=0.15 + 0.15 * k,
+                            label=f"{p[k]:g}~{p[-1 - k]:g} 백분위")
+        ax.plot(result.times_min, bands[mid], color=color, linewidth=2, label=f"중앙값 ({p[mid]:g})")
+        ax.axhline(danger, color="red", linestyle="--", alpha=0.6, label="위험 기준")
+        ax.set_ylabel(label)
+        ax.grid(True, linestyle='--', alpha=0.4)
+        ax.legend(loc='upper right', fontsize=8)
+    axes[-1].set_xlabel("시간 (분)")
     st.pyplot(fig)
+    plt.close(fig)
@@ -1,45 +1,37 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 
 from simulator import (
     run_simulation,
+    run_simulation_batch,
+    run_simulation_cached,
+    cache_simulation_result,
+    simulation_cache_stats,
     SimulationResult,
     get_inputs,
     plot_results,
     plot_3d,
     plot_compare_results,
+    plot_uncertainty_bands,
+    DANGER_O2_PCT,
+    DANGER_CO2_PCT,
 )
-from prediction import run_prediction_ai, plot_prediction
-
-from auth_and_scenario import login, save_scenario, load_scenarios, load_scenario, signup
-
-#자동 분석
-def show_danger_warnings(sim):
-    max_co2 = max(sim.co2_pct)
-    min_o2 = min(sim.o2_pct)
+from analysis import summarize_result
+from monte_carlo import run_monte_carlo
+from sweep import get_sweep_engine
+from prediction import plot_prediction
+from prediction_jobs import submit_prediction, poll_prediction
+from trend import GAS_LABELS, analyze_trends, resolve_columns, trend_report
 
-    st.markdown("### ⚠️ 자동 분석 결과")
-
-    # CO2 기준 예시 (0.1% 이상 위험)
-    if max_co2 > 0.1:
-        st.warning(f"CO₂ 농도가 최대 {max_co2:.4f}%로 위험 수준을 초과했습니다.")
-    else:
-        st.success(f"CO₂ 농도가 최대 {max_co2:.4f}%로 안전한 수준입니다.")
+from auth_and_scenario import login, save_scenario, load_scenarios, load_scenario, load_scenario_result, signup
 
-    # O2 기준 예시 (19.5% 이하 저산소 위험)
-    if min_o2 < 19.5:
-        st.warning(f"산소 농도가 최소 {min_o2:.2f}%로 저산소 위험이 있습니다.")
-    else:
-        st.success(f"산소 농도가 최소 {min_o2:.2f}%로 정상 범위입니다.")
-
-    # 추가로 경향 분석 (예: 증가/감소 여부)
-    co2_trend = np.polyfit(sim.times_min, sim.co2_pct, 1)[0]  # 1차 회귀선 기울기
-    if co2_trend > 0:
-        st.info("CO₂ 농도가 점차 증가하는 추세입니다.")
-    else:
-        st.info("CO₂ 농도가 안정적이거나 감소하는 추세입니다.")
+# AI 예측 작업이 진행 중일 때 화면을 다시 그리는 간격
+AI_POLL_INTERVAL_SEC = 1.0
 
 #임시 테스트용
 
@@ -99,15 +91,21 @@ def main():
 
     # --- 시나리오 관리 ---
     st.sidebar.header("시나리오 관리")
-    scenarios = load_scenarios(user)
+    all_scenarios, _ = load_scenarios(user)
     selected_scenario = st.sidebar.selectbox(
         "저장된 시나리오 불러오기",
-        ["새 시나리오"] + list(scenarios),
+        ["새 시나리오"] + all_scenarios,
         key="scenario_selectbox"
     )
 
     if selected_scenario != "새 시나리오":
         inputs = load_scenario(user, selected_scenario)
+        # 저장해 둔 결과가 있으면 캐시에 넣어 실행 버튼을 눌러도 다시 계산하지 않는다 (시나리오마다 한 번만)
+        if st.session_state.get('cached_scenario') != (user, selected_scenario):
+            stored = load_scenario_result(user, selected_scenario)
+            if stored is not None:
+                cache_simulation_result(stored)
+            st.session_state['cached_scenario'] = (user, selected_scenario)
     else:
         inputs = get_inputs(unique_id="new_scenario")
 
@@ -115,7 +113,7 @@ def main():
     tab_sim, tab_ai, tab_interpretation = st.tabs(["🖥 시뮬레이터", "🤖 AI 예측", "📖 결과 해석 가이드"])
 
     with tab_sim:
-        sim_mode = st.radio("시뮬레이터 모드 선택", ("단일 시뮬레이션", "시나리오 비교"), horizontal=True)
+        sim_mode = st.radio("시뮬레이터 모드 선택", ("단일 시뮬레이션", "시나리오 비교", "불확실성 분석", "환기 설계"), horizontal=True)
 
         if sim_mode == "단일 시뮬레이션":
             output_choice = st.radio("결과 표시 방식 선택", ["📋 표", "📈 2D 그래프", "🌐 3D 그래프"], horizontal=True)
@@ -125,19 +123,17 @@ def main():
             with col_run:
                 if st.button("🚀 시뮬레이션 실행", key="run_single_sim", use_container_width=True):
                     with st.spinner("시뮬레이션 계산 중..."):
-                        sim = run_simulation(**inputs)
+                        sim = run_simulation_cached(**inputs)
                         st.session_state['last_sim'] = sim
+                    stats = simulation_cache_stats()
+                    st.caption(f"캐시 적중 {stats['hits']}회 / 미적중 {stats['misses']}회")
 
             if 'last_sim' in st.session_state:
                 sim = st.session_state['last_sim']
 
                 if output_choice == "📋 표":
                     st.subheader("📋 시뮬레이션 결과 (표)")
-                    df = pd.DataFrame({
-                        "시간 (분)": sim.times_min,
-                        "O₂ (%)": sim.o2_pct,
-                        "CO₂ (%)": sim.co2_pct
-                    })
+                    df = sim.to_pandas(columns=["시간 (분)", "O₂ (%)", "CO₂ (%)"])
                     st.dataframe(df.style.format({"O₂ (%)": "{:.3f}", "CO₂ (%)": "{:.5f}"}))
 
                     with col_save:
@@ -167,11 +163,70 @@ def main():
                 scenario_name = st.text_input("시나리오 이름 저장", key="scenario_name_input")
                 if st.button("💾 시나리오 저장", key="save_scenario_button", use_container_width=True):
                     if scenario_name.strip():
-                        save_scenario(user, scenario_name.strip(), inputs)
+                        save_scenario(user, scenario_name.strip(), inputs,
+                                      result=st.session_state.get('last_sim'))
                         st.success(f"시나리오 '{scenario_name.strip()}' 저장 완료!")
                     else:
                         st.error("시나리오 이름을 입력하세요.")
 
+        elif sim_mode == "불확실성 분석":
+            st.write("재실 인원은 포아송 분포(평균 = 입력값), 환기 횟수는 로그정규 분포(중앙값 = 입력값)로 뽑아 반복 계산합니다.")
+            col_n, col_sigma = st.columns(2)
+            with col_n:
+                n_draws = st.number_input("반복 횟수", min_value=100, max_value=100_000, value=5000, step=100)
+            with col_sigma:
+                ach_sigma = st.slider("환기 횟수 불확실성 (로그 표준편차)", 0.0, 1.0, 0.3, 0.05)
+
+            if st.button("🎲 몬테카를로 실행", key="run_monte_carlo", use_container_width=True):
+                with st.spinner("몬테카를로 시뮬레이션 중..."):
+                    st.session_state['last_mc'] = run_monte_carlo(
+                        inputs, n_draws=int(n_draws),
+                        distributions={"people": ("poisson",), "ach": ("lognormal", ach_sigma)},
+                    )
+
+            if 'last_mc' in st.session_state:
+                mc = st.session_state['last_mc']
+                plot_uncertainty_bands(mc)
+                times_df = pd.DataFrame({
+                    "백분위": [f"{p:g}" for p in mc.percentiles],
+                    f"O₂ < {DANGER_O2_PCT}% 도달 (분)": mc.o2_danger_time,
+                    f"CO₂ > {DANGER_CO2_PCT}% 도달 (분)": mc.co2_danger_time,
+                })
+                st.markdown(f"**위험 기준 도달 시각** ({mc.n_draws}회, 빈 칸은 기간 안에 도달하지 않음)")
+                st.dataframe(times_df)
+                st.caption(f"기간 안에 도달할 확률 — O₂: {mc.o2_danger_prob:.1%}, CO₂: {mc.co2_danger_prob:.1%}")
+
+        elif sim_mode == "환기 설계":
+            st.write(f"물질수지 모델로 CO₂ {DANGER_CO2_PCT}% 이하, O₂ {DANGER_O2_PCT}% 이상을 유지하는 최소 조건을 찾습니다.")
+            max_people = st.number_input("최대 재실 인원", min_value=1, max_value=200, value=min(max(int(inputs["people"]), 10), 200))
+            max_ach = st.number_input("탐색할 최대 환기율 (ACH)", min_value=0.5, max_value=100.0, value=20.0, step=0.5)
+
+            if st.button("📐 최소 환기율 / 식물 수 계산", key="run_sweep", use_container_width=True):
+                engine = get_sweep_engine("mass_balance")
+                people = np.arange(1, int(max_people) + 1)
+                with st.spinner("탐색 중..."):
+                    min_ach = engine.find_boundary(inputs, "ach", 0.0, float(max_ach), tol=0.01, people=people)
+                    min_plants = engine.find_boundary(inputs, "plants", 0, 10_000, people=people)
+                    grid = engine.grid_search(inputs, {"people": people, "ach": np.linspace(0.0, float(max_ach), 81)})
+                st.session_state['last_sweep'] = (people, min_ach, min_plants, grid)
+
+            if 'last_sweep' in st.session_state:
+                people, min_ach, min_plants, grid = st.session_state['last_sweep']
+                st.markdown("**인원별 최소 조건** (빈 칸은 탐색 범위 안에서 기준을 지킬 수 없음)")
+                st.dataframe(pd.DataFrame({
+                    "재실 인원": people,
+                    f"최소 ACH (식물 {int(inputs['plants'])}개)": np.round(min_ach, 2),
+                    f"최소 식물 수 (ACH {float(inputs['ach']):g})": min_plants,
+                }))
+                fig = go.Figure(go.Heatmap(
+                    x=grid.axes["ach"], y=grid.axes["people"], z=grid.map("co2_max"),
+                    colorscale="RdYlGn_r", zmid=DANGER_CO2_PCT, colorbar=dict(title="최대 CO₂ (%)"),
+                ))
+                fig.add_trace(go.Scatter(x=min_ach, y=people, mode="lines+markers", name="최소 ACH",
+                                         line=dict(color="black")))
+                fig.update_layout(xaxis_title="환기율 (ACH)", yaxis_title="재실 인원", height=500)
+                st.plotly_chart(fig)
+
         else:  # 시나리오 비교 모드
             st.write("두 시나리오 조건을 입력하세요.")
             inputs1 = get_inputs("시나리오 1 ", unique_id="s1")
@@ -179,8 +234,9 @@ def main():
 
             if st.button("⚡ 두 시나리오 실행", key="run_compare_sim", use_container_width=True):
                 with st.spinner("비교 시뮬레이션 실행 중..."):
-                    sim1 = run_simulation(**inputs1)
-                    sim2 = run_simulation(**inputs2)
+                    # 두 시나리오를 한 번의 배치 연산으로 계산
+                    batch = run_simulation_batch(**{k: [inputs1[k], inputs2[k]] for k in inputs1})
+                    sim1, sim2 = batch[0], batch[1]
                     st.session_state['last_sim1'] = sim1
                     st.session_state['last_sim2'] = sim2
 
@@ -230,6 +286,8 @@ def main():
             sim_hours = st.number_input("⏱ 시뮬레이션 시간 (분)", min_value=10, max_value=180, value=60, step=10)
             predict_hours = st.number_input("🔮 예측 시간 (분)", min_value=5, max_value=60, value=20, step=5)
             dt_min = st.slider("📏 시간 간격 (분)", min_value=0.1, max_value=5.0, value=1.0, step=0.1)
+            strategy_label = st.radio("🧭 예측 방식", ["재귀 (1스텝씩)", "직접 (여러 스텝 한 번에)"], horizontal=True)
+            strategy = "direct" if strategy_label.startswith("직접") else "recursive"
         with col_right:
             room_volume_m3 = st.number_input("🏠 공간 부피 (m³)", value=30.0, min_value=1.0, step=1.0)
             people = st.number_input("👥 사람 수", value=2, min_value=0, step=1)
@@ -237,35 +295,48 @@ def main():
             ach = st.number_input("💨 환기율 (ACH, 회/h)", value=0.5, min_value=0.0, step=0.1, format="%.2f")
             light_on = st.checkbox("💡 식물 광합성(빛 있음)", value=True)
 
-        # 예측 버튼은 여기 안에서만 사용 — 전역 버튼 제거해서 미정의 변수 문제 해결
+        # 예측은 작업 프로세스에서 실행하고, 이 세션은 작업 ID만 들고 재실행 때마다 상태를 확인한다
         if st.button("🚀 예측 실행", use_container_width=True):
-            with st.spinner("AI 예측 중..."):
-                # run_prediction 함수가 해당 인자를 받는 것으로 가정
-                df_all = run_prediction_ai(
-                    sim_hours=sim_hours,
-                    predict_hours=predict_hours,
-                    room_volume_m3=room_volume_m3,
-                    people=people,
-                    plants=plants,
-                    ach=ach,
-                    dt_min=dt_min,
-                    light_on=light_on,
-                )
-                st.success("✅ 예측 완료!")
-
-                # 탭으로 결과 보기 (그래프 / 데이터 / 트렌드)
-                result_tabs = st.tabs(["📊 그래프", "📋 데이터", "📈 트렌드 분석"])
-                with result_tabs[0]:
-                    plot_prediction(df_all)
-                with result_tabs[1]:
-                    st.dataframe(df_all)
-                with result_tabs[2]:
-                    trend_report = analyze_trend_with_plot(df_all)
-                    if trend_report:
-                        st.markdown(trend_report)
-
-                st.markdown("### 🔍 AI 인사이트")
-                st.info(analyze_ai_prediction(df_all))
+            st.session_state['ai_job'] = submit_prediction(
+                sim_hours=sim_hours,
+                predict_hours=predict_hours,
+                room_volume_m3=room_volume_m3,
+                people=people,
+                plants=plants,
+                ach=ach,
+                dt_min=dt_min,
+                light_on=light_on,
+                strategy=strategy,
+            )
+
+        job_id = st.session_state.get('ai_job')
+        job = poll_prediction(job_id) if job_id else None
+        if job is not None and job["status"] == "unknown":
+            # 완료된 작업이 오래되어 정리되었거나 서버가 재시작됨
+            del st.session_state['ai_job']
+            job = None
+            st.warning("이전 예측 결과가 만료되었습니다. 예측을 다시 실행해 주세요.")
+        if job is not None and job["status"] in ("pending", "running"):
+            st.info("⏳ AI 예측 중입니다. 완료되면 자동으로 결과가 표시됩니다.")
+        elif job is not None and job["status"] == "error":
+            st.error(f"예측 중 오류가 발생했습니다: {job['error']}")
+        elif job is not None and job["status"] == "done":
+            df_all = job["result"]
+            st.success("✅ 예측 완료!")
+
+            # 탭으로 결과 보기 (그래프 / 데이터 / 트렌드)
+            result_tabs = st.tabs(["📊 그래프", "📋 데이터", "📈 트렌드 분석"])
+            with result_tabs[0]:
+                plot_prediction(df_all)
+            with result_tabs[1]:
+                st.dataframe(df_all)
+            with result_tabs[2]:
+                trend_report = analyze_trend_with_plot(df_all)
+                if trend_report:
+                    st.markdown(trend_report)
+
+            st.markdown("### 🔍 AI 인사이트")
+            st.info(analyze_ai_prediction(df_all))
                 
     # ===============================
     # 결과 해석 가이드 탭
@@ -301,6 +372,11 @@ def main():
             """
         )
 
+    # 예측 작업이 끝날 때까지 모든 탭을 그린 뒤 주기적으로 다시 실행해 결과를 가져온다
+    if job is not None and job["status"] in ("pending", "running"):
+        time.sleep(AI_POLL_INTERVAL_SEC)
+        st.rerun()
+
 
 
 def analyze_ai_prediction(df):
@@ -338,101 +414,76 @@ def analyze_ai_prediction(df):
 
 def show_danger_warnings(sim: SimulationResult):
     """산소/이산화탄소 위험 수준 경고 표시"""
-    danger_o2_threshold = 19.5
-    danger_co2_threshold = 0.1
-    danger_o2_time = None
-    danger_co2_time = None
-    for i, (o2_val, co2_val) in enumerate(zip(sim.o2_pct, sim.co2_pct)):
-        if danger_o2_time is None and o2_val < danger_o2_threshold:
-            danger_o2_time = sim.times_min[i]
-        if danger_co2_time is None and co2_val > danger_co2_threshold:
-            danger_co2_time = sim.times_min[i]
-    if danger_o2_time is not None:
-        st.error(f"⚠️ 산소 농도가 {danger_o2_threshold}% 이하로 떨어진 시점: {danger_o2_time:.1f}분")
-    if danger_co2_time is not None:
-        st.error(f"⚠️ CO₂ 농도가 {danger_co2_threshold}% 이상으로 상승한 시점: {danger_co2_time:.1f}분")
+    summary = summarize_result(sim, o2_threshold=DANGER_O2_PCT, co2_threshold=DANGER_CO2_PCT)
+    max_co2 = summary["co2_max"]
+    min_o2 = summary["o2_min"]
+
+    st.markdown("### ⚠️ 자동 분석 결과")
+
+    if max_co2 > DANGER_CO2_PCT:
+        st.warning(f"CO₂ 농도가 최대 {max_co2:.4f}%로 위험 수준을 초과했습니다.")
+    else:
+        st.success(f"CO₂ 농도가 최대 {max_co2:.4f}%로 안전한 수준입니다.")
+
+    if min_o2 < DANGER_O2_PCT:
+        st.warning(f"산소 농도가 최소 {min_o2:.2f}%로 저산소 위험이 있습니다.")
+    else:
+        st.success(f"산소 농도가 최소 {min_o2:.2f}%로 정상 범위입니다.")
+
+    if summary["o2_danger_time"] is not None:
+        st.error(f"⚠️ 산소 농도가 {DANGER_O2_PCT}% 이하로 떨어진 시점: {summary['o2_danger_time']:.1f}분")
+    if summary["co2_danger_time"] is not None:
+        st.error(f"⚠️ CO₂ 농도가 {DANGER_CO2_PCT}% 이상으로 상승한 시점: {summary['co2_danger_time']:.1f}분")
+
+    # 경향 분석 (1차 회귀선 기울기)
+    if summary["co2_slope"] > 0:
+        st.info("CO₂ 농도가 점차 증가하는 추세입니다.")
+    else:
+        st.info("CO₂ 농도가 안정적이거나 감소하는 추세입니다.")
 
 
 def analyze_trend_with_plot(df: pd.DataFrame):
     """
-    O₂ 및 CO₂의 변화 속도 분석 + 시각화
+    O₂ 및 CO₂의 변화 속도 분석 + 시각화 (계산은 trend.analyze_trends)
     입력 df 포맷 허용:
       - prediction.run_prediction 반환 (columns: time, oxygen, co2, type)
       - 또는 컬럼명이 'time_min','O2 (%)','CO2 (%)'인 경우도 처리
     반환: 텍스트 리포트 (string)
     """
-    # --- 컬럼 호환성 맞추기 ---
-    df = df.copy()
-    if "time" in df.columns:
-        df["time_min"] = df["time"]
-    if "oxygen" in df.columns:
-        df["O2 (%)"] = df["oxygen"]
-    if "co2" in df.columns:
-        df["CO2 (%)"] = df["co2"]
-
-    if "time_min" not in df.columns:
-        st.error("❌ 데이터에 'time_min' 컬럼이 없습니다. (요청: prediction.run_prediction의 반환 확인)")
+    if resolve_columns(df) is None:
+        st.error("❌ 데이터에 시간/산소/이산화탄소 컬럼이 없습니다. (요청: prediction.run_prediction의 반환 확인)")
         return None
-
-    fig, axes = plt.subplots(2, 1, figsize=(8, 6), sharex=True)
-    fig.subplots_adjust(hspace=0.4)
-    report_lines = []
-
-    times = df["time_min"].values
-    # 시간 간격 안정화
-    if len(times) < 2:
+    if len(df) < 2:
         st.warning("데이터 길이가 짧아 트렌드 분석을 수행할 수 없습니다.")
         return None
-    dt = np.mean(np.diff(times))
 
-    for idx, gas in enumerate(["O2 (%)", "CO2 (%)"]):
-        if gas not in df.columns:
-            st.warning(f"⚠ '{gas}' 데이터 없음 — 분석 건너뜀")
-            continue
+    result = analyze_trends(df)
 
-        values = df[gas].values
-        rate = np.gradient(values, dt)  # 변화율 (%/분)
-        accel = np.gradient(rate, dt)   # 가속도 (%/분^2)
-
-        # 텍스트 분석 지표
-        avg_rate = np.mean(rate)
-        avg_accel = np.mean(accel)
-
-        if avg_rate > 0.0005:
-            trend = "전반적으로 증가 추세"
-        elif avg_rate < -0.0005:
-            trend = "전반적으로 감소 추세"
-        else:
-            trend = "안정 추세"
-
-        if avg_accel > 0.0002:
-            accel_trend = "변화 속도가 점점 빨라짐"
-        elif avg_accel < -0.0002:
-            accel_trend = "변화 속도가 점점 느려짐"
-        else:
-            accel_trend = "변화 속도 일정"
-
-        report_lines.append(f"""
-**{gas} 트렌드 분석**
-- 평균 변화율: {avg_rate:.4f} %/분
-- 평균 가속도: {avg_accel:.5f} %/분²
-- 전반적 경향: {trend}
-- 변화 속도 분석: {accel_trend}
-""")
-
-        # 그래프: 농도 + 변화율
-        axes[idx].plot(times, values, label=f"{gas} 농도", color="tab:blue" if "O2" in gas else "tab:green")
-        axes[idx].set_ylabel(f"{gas}")
-        ax2 = axes[idx].twinx()
-        ax2.plot(times, rate, label="변화율", color="tab:red", linestyle="--", alpha=0.8)
+    fig, axes = plt.subplots(2, 1, figsize=(8, 6), sharex=True)
+    fig.subplots_adjust(hspace=0.4)
+    for g, gas in enumerate(GAS_LABELS):
+        ax2 = axes[g].twinx()
+        # type 구간마다 따로 그려 시뮬레이션/예측 경계에서 선이 이어지지 않게 한다
+        for n, (label, start, end) in enumerate(result.groups):
+            times = result.times[start:end]
+            linestyle = "--" if label == "predicted" else "-"
+            axes[g].plot(times, result.values[g, start:end], linestyle=linestyle,
+                         color="tab:blue" if g == 0 else "tab:green",
+                         label=f"{gas} 농도" if n == 0 else None)
+            ax2.plot(times, result.rate[g, start:end], color="tab:red", linestyle=":", alpha=0.8,
+                     label="변화율" if n == 0 else None)
+        axes[g].set_ylabel(f"{gas}")
         ax2.set_ylabel("변화율 (%/분)", color="tab:red")
-        axes[idx].grid(True, alpha=0.3)
+        axes[g].grid(True, alpha=0.3)
+        for change in result.regime_changes:
+            if change["gas"] == result.gases[g]:
+                axes[g].axvline(change["time"], color="gray", linestyle="-.", alpha=0.5)
 
     axes[-1].set_xlabel("시간 (분)")
     st.pyplot(fig)
+    plt.close(fig)
 
-    return "\n".join(report_lines)
-
+    return trend_report(result)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,233 @@
+"""
+환기 설계용 입력 탐색/최적화.
+"N명이 duration_min 동안 있을 때 CO2를 기준 아래로 유지하는 최소 ACH(또는 식물 수)는?" 같은 질문에
+격자 탐색, 이분 탐색, 라틴 하이퍼큐브 표본 추출로 답한다.
+
+모든 탐색은 점들을 열(column) 배열로 모아 analysis.extrema 한 번으로 (O2 최소, CO2 최대)를 구하고,
+이미 계산한 점은 캐시에서 꺼낸다. 점이 많으면 chunk로 나눠 프로세스 풀에서 계산한다.
+"""
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analysis import extrema
+from simulator import DANGER_CO2_PCT, DANGER_O2_PCT
+
+INPUT_NAMES = ("room_volume_m3", "people", "plants", "ach", "duration_min", "dt_min", "light_on")
+INTEGER_INPUTS = ("people", "plants")
+# 값이 커질수록 기준을 지키기 쉬워지면 +1, 어려워지면 -1 (이분 탐색에 쓰는 단조성)
+MONOTONE_DIRECTION = {"ach": 1, "plants": 1, "room_volume_m3": 1, "people": -1}
+
+
+def _evaluate_chunk(columns, model):
+    """작업 프로세스에서도 쓰는 한 chunk 계산: (O2 최소, CO2 최대)"""
+    return extrema(*(columns[name] for name in INPUT_NAMES), model=model)
+
+
+def _point_keys(columns, model):
+    """점마다 정규화한 입력 튜플 (캐시 키)"""
+    return list(zip(
+        columns["room_volume_m3"].astype(float).tolist(),
+        columns["people"].astype(int).tolist(),
+        columns["plants"].astype(int).tolist(),
+        columns["ach"].astype(float).tolist(),
+        columns["duration_min"].astype(float).tolist(),
+        np.round(columns["dt_min"].astype(float), 9).tolist(),
+        columns["light_on"].astype(bool).tolist(),
+        [model] * len(columns["ach"]),
+    ))
+
+
+class SweepResult:
+    """
+    탐색한 점들과 결과.
+    points: 입력 이름 -> (M,) 배열, o2_min / co2_max / feasible: (M,) 배열.
+    격자 탐색이면 axes(이름 -> 값 배열)가 있고 map()으로 격자 모양의 가능 영역 지도를 얻는다.
+    """
+    def __init__(self, points, o2_min, co2_max, feasible, axes=None):
+        self.points = points
+        self.o2_min = o2_min
+        self.co2_max = co2_max
+        self.feasible = feasible
+        self.axes = axes
+
+    def __len__(self):
+        return len(self.feasible)
+
+    def map(self, values="feasible"):
+        """격자 모양 (axes 순서)의 feasible / o2_min / co2_max 배열"""
+        if self.axes is None:
+            raise ValueError("격자 탐색 결과에서만 지도를 만들 수 있습니다.")
+        shape = tuple(len(v) for v in self.axes.values())
+        return getattr(self, values).reshape(shape)
+
+    def best(self, minimize):
+        """
+        기준을 지키는 점 중 minimize(입력 이름 또는 이름 목록, 앞의 것이 우선)가 가장 작은 점의 입력 dict.
+        없으면 None.
+        """
+        names = [minimize] if isinstance(minimize, str) else list(minimize)
+        idx = np.flatnonzero(self.feasible)
+        if idx.size == 0:
+            return None
+        # np.lexsort는 마지막 키가 우선
+        order = np.lexsort([self.points[name][idx] for name in reversed(names)])
+        i = idx[order[0]]
+        best = {name: self.points[name][i].item() for name in INPUT_NAMES}
+        best.update(o2_min=float(self.o2_min[i]), co2_max=float(self.co2_max[i]))
+        return best
+
+
+class SweepEngine:
+    """
+    점 계산 캐시와 (필요할 때 만드는) 프로세스 풀을 가진 탐색기.
+    n_workers > 1 이고 새로 계산할 점이 chunk_size보다 많으면 chunk들을 프로세스 풀에 나눈다.
+    """
+    def __init__(self, model="mass_balance", n_workers=1, chunk_size=50_000, cache_size=1_000_000,
+                 o2_limit=DANGER_O2_PCT, co2_limit=DANGER_CO2_PCT):
+        self.model = model
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.o2_limit = o2_limit
+        self.co2_limit = co2_limit
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=ctx)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def columns(self, base, **overrides):
+        """base 입력 dict에 overrides(스칼라 또는 배열)를 덮어써 같은 길이의 열 배열로 만든다"""
+        merged = {name: overrides.get(name, base[name]) for name in INPUT_NAMES}
+        arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(merged[name])) for name in INPUT_NAMES))
+        return dict(zip(INPUT_NAMES, arrays))
+
+    def evaluate(self, columns):
+        """점마다 (O2 최소, CO2 최대). 캐시에 없는 점만 계산한다"""
+        keys = _point_keys(columns, self.model)
+        o2_min = np.empty(len(keys))
+        co2_max = np.empty(len(keys))
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    o2_min[i], co2_max[i] = cached
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return o2_min, co2_max
+
+        missing = np.asarray(missing)
+        chunks = [missing[i:i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)]
+        parts = [{name: col[chunk] for name, col in columns.items()} for chunk in chunks]
+        if self.n_workers > 1 and len(chunks) > 1:
+            results = self._get_executor().map(_evaluate_chunk, parts, [self.model] * len(parts))
+        else:
+            results = (_evaluate_chunk(part, self.model) for part in parts)
+        for chunk, (o2, co2) in zip(chunks, results):
+            o2_min[chunk] = o2
+            co2_max[chunk] = co2
+
+        with self._lock:
+            for i in missing:
+                self._cache[keys[i]] = (o2_min[i], co2_max[i])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return o2_min, co2_max
+
+    def is_feasible(self, o2_min, co2_max):
+        return (o2_min >= self.o2_limit) & (co2_max <= self.co2_limit)
+
+    def _result(self, columns, axes=None):
+        o2_min, co2_max = self.evaluate(columns)
+        return SweepResult(columns, o2_min, co2_max, self.is_feasible(o2_min, co2_max), axes)
+
+    def grid_search(self, base, axes):
+        """axes(입력 이름 -> 값 목록)의 모든 조합을 계산한 SweepResult (map()으로 가능 영역 지도)"""
+        axes = {name: np.asarray(values) for name, values in axes.items()}
+        grids = np.meshgrid(*axes.values(), indexing="ij")
+        columns = self.columns(base, **{name: grid.ravel() for name, grid in zip(axes, grids)})
+        return self._result(columns, axes)
+
+    def latin_hypercube(self, base, bounds, n_samples, seed=0):
+        """
+        bounds(입력 이름 -> (하한, 상한))의 라틴 하이퍼큐브 표본 n_samples개를 계산한 SweepResult.
+        각 차원을 n_samples개 구간으로 나눠 구간마다 한 점씩 뽑고 차원마다 순서를 섞는다.
+        """
+        rng = np.random.default_rng(seed)
+        samples = {}
+        for name, (low, high) in bounds.items():
+            u = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+            values = low + u * (high - low)
+            samples[name] = np.round(values).astype(int) if name in INTEGER_INPUTS else values
+        return self._result(self.columns(base, **samples))
+
+    def find_boundary(self, base, param, low, high, tol=0.01, **overrides):
+        """
+        다른 입력(overrides는 배열이어도 됨)마다 기준을 지키는 param의 경계값을 이분 탐색으로 구한다.
+        ach/plants/room_volume_m3는 최솟값, people은 최댓값을 찾는다 (MONOTONE_DIRECTION).
+        이 단조성은 mass_balance 모델에서 성립한다 (linear 모델은 환기가 O2도 낮추므로 격자 탐색을 쓴다).
+        [low, high] 안에서 기준을 지킬 수 없으면 NaN. 정수 입력은 tol과 관계없이 정확한 정수를 찾는다.
+        모든 시나리오를 한 배치로 묶어 반복마다 evaluate를 한 번만 호출한다.
+        """
+        if param not in MONOTONE_DIRECTION:
+            raise ValueError(f"이분 탐색할 수 없는 입력입니다: {param} (가능: {tuple(MONOTONE_DIRECTION)})")
+        direction = MONOTONE_DIRECTION[param]
+        integer = param in INTEGER_INPUTS
+        n = len(self.columns(base, **overrides)["ach"])
+        # good: 기준을 지키는 쪽 끝, bad: 못 지키는 쪽 끝
+        good = np.full(n, high if direction > 0 else low, dtype=float)
+        bad = np.full(n, low if direction > 0 else high, dtype=float)
+
+        def feasible(values):
+            values = np.round(values).astype(int) if integer else values
+            return self.is_feasible(*self.evaluate(self.columns(base, **overrides, **{param: values})))
+
+        reachable = feasible(good)
+        already = feasible(bad)
+        step = 1 if integer else tol
+        active = reachable & ~already & (np.abs(good - bad) > step)
+        while np.any(active):
+            mid = (good + bad) / 2
+            if integer:
+                mid = np.floor(mid) if direction > 0 else np.ceil(mid)
+            ok = feasible(np.where(active, mid, good))
+            good = np.where(active & ok, mid, good)
+            bad = np.where(active & ~ok, mid, bad)
+            active &= np.abs(good - bad) > step
+        return np.where(already, bad, np.where(reachable, good, np.nan))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
+
+
+# 프로세스 전역 탐색기: 모델별로 하나씩, 세션 간에 점 캐시를 공유한다
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_sweep_engine(model="mass_balance"):
+    with _ENGINES_LOCK:
+        if model not in _ENGINES:
+            _ENGINES[model] = SweepEngine(model=model)
+        return _ENGINES[model]
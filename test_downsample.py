@@ -0,0 +1,51 @@
+"""
+그래프용 다운샘플링이 점 수를 줄이면서 극값과 양 끝 점을 지키는지 확인한다.
+
+    python -m pytest -q test_downsample.py
+"""
+import numpy as np
+import pytest
+
+from downsample import downsample_indices, lttb_indices, minmax_indices
+
+
+def _series(n):
+    rng = np.random.default_rng(0)
+    x = np.arange(n, dtype=float)
+    ys = np.stack([np.sin(x / 500) + 0.01 * rng.normal(size=n), np.cumsum(rng.normal(size=n))])
+    ys[0, n // 3] = 5.0    # 짧은 급등도 남아야 한다
+    return x, ys
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    x, ys = _series(100_003)
+    n_buckets = 200
+    idx = minmax_indices(ys, n_buckets)
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert len(idx) <= 2 * ys.shape[0] * n_buckets + 2
+    bucket = -(-len(x) // n_buckets)
+    for start in range(0, len(x), bucket):
+        for y in ys:
+            seg = y[start:start + bucket]
+            assert seg.max() in y[idx] and seg.min() in y[idx]
+
+
+def test_lttb_picks_one_point_per_bucket_and_keeps_ends():
+    x, ys = _series(50_000)
+    idx = lttb_indices(x, ys[0], 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert len(x) // 3 in idx
+
+
+def test_short_series_are_not_downsampled():
+    x, ys = _series(100)
+    np.testing.assert_array_equal(downsample_indices(x, ys, 800), np.arange(100))
+    np.testing.assert_array_equal(downsample_indices(x, ys, 800, method="lttb"), np.arange(100))
+
+
+def test_unknown_method():
+    x, ys = _series(100)
+    with pytest.raises(ValueError):
+        downsample_indices(x, ys, 10, method="every_nth")
@@ -0,0 +1,83 @@
+"""
+model_registry가 버전을 원자적으로 공개하는지 확인한다.
+
+    python -m pytest -q test_model_registry.py
+"""
+import os
+import threading
+import time
+
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry, schema_hash
+
+SCHEMA = {"features": ["a", "b"], "targets": ["y"]}
+
+
+def _save_text(model, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(model)
+
+
+def _load_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def text_serializer(monkeypatch):
+    """모델 파일을 쓰는 데 시간이 걸리는 가짜 직렬화기"""
+    def slow_save(model, path):
+        time.sleep(0.05)
+        _save_text(model, path)
+
+    monkeypatch.setitem(model_registry.SERIALIZERS, "text", (slow_save, _load_text, "model.txt"))
+
+
+def test_reader_never_sees_half_written_version(tmp_path, text_serializer):
+    writer = ModelRegistry(str(tmp_path))
+    reader = ModelRegistry(str(tmp_path))
+    errors = []
+    seen = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                entry = reader.load_latest("text", SCHEMA)
+                reader.unload()
+                if entry is not None:
+                    seen.append((entry[0], entry[1]["version"]))
+            except Exception as e:  # noqa: BLE001 - 어떤 예외든 실패로 기록
+                errors.append(e)
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    savers = [threading.Thread(target=writer.save, args=("text", SCHEMA, f"model {i}")) for i in range(4)]
+    for t in savers:
+        t.start()
+    for t in savers:
+        t.join()
+    done.set()
+    thread.join()
+
+    assert errors == []
+    schema_dir = tmp_path / "text" / schema_hash(SCHEMA)
+    assert sorted(os.listdir(schema_dir)) == ["v1", "v2", "v3", "v4"]
+    assert all(model.startswith("model ") for model, _ in seen)
+    assert reader.load_latest("text", SCHEMA)[1]["version"] == 4
+
+
+def test_directories_without_meta_are_skipped(tmp_path, text_serializer):
+    registry = ModelRegistry(str(tmp_path))
+    registry.save("text", SCHEMA, "first")
+    # 예전 방식으로 저장하다 멈춘 버전 디렉터리 (meta.json 없음)
+    os.makedirs(tmp_path / "text" / schema_hash(SCHEMA) / "v2")
+    registry.unload()
+    model, meta = registry.load_latest("text", SCHEMA)
+    assert (model, meta["version"]) == ("first", 1)
+    # 새 버전은 남아 있는 디렉터리와 겹치지 않는 번호로 저장된다
+    assert registry.save("text", SCHEMA, "second")["version"] == 3
+    registry.unload()
+    assert registry.load_latest("text", SCHEMA)[0] == "second"
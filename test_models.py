@@ -0,0 +1,49 @@
+"""
+랜덤 포레스트의 평균/표준편차를 트리별 예측을 쌓아 계산한 기준값과 비교한다.
+
+    python -m pytest -q test_models.py
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import RandomForestRegressor
+
+from models import (
+    FlatForest,
+    export_random_forest,
+    predict_flat_forest_with_uncertainty,
+    predict_random_forest_with_uncertainty,
+)
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = np.stack([X[:, 0] * 2 + X[:, 1] ** 2, np.sin(X[:, 2]) - X[:, 3]], axis=1) + 0.1 * rng.normal(size=(400, 2))
+    model = RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+    X_test = rng.normal(size=(300, 6))
+    stacked = np.stack([est.predict(X_test) for est in model.estimators_])
+    return model, X_test, stacked
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3, -1])
+def test_random_forest_moments_match_stacked_predictions(forest, n_jobs):
+    model, X_test, stacked = forest
+    preds, std = predict_random_forest_with_uncertainty(model, X_test, n_jobs=n_jobs)
+    np.testing.assert_allclose(preds, stacked.mean(axis=0), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(std, stacked.std(axis=0), rtol=0, atol=1e-12)
+
+
+def test_flat_forest_matches_stacked_predictions(forest, tmp_path):
+    model, X_test, stacked = forest
+    flat = export_random_forest(model)
+    # 잎 값은 float32로 저장하므로 그만큼의 오차만 허용한다
+    preds, std = predict_flat_forest_with_uncertainty(flat, X_test, batch_size=64)
+    np.testing.assert_allclose(preds, stacked.mean(axis=0), rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(std, stacked.std(axis=0), rtol=1e-6, atol=1e-6)
+
+    flat.save(tmp_path / "forest.npz")
+    loaded = FlatForest.load(tmp_path / "forest.npz")
+    np.testing.assert_array_equal(loaded.leaf_values(X_test), flat.leaf_values(X_test))
@@ -0,0 +1,88 @@
+"""
+monte_carlo의 스트리밍 분위수와 고정 seed 결과를 같은 표본의 정확한 통계와 비교한다.
+
+    python -m pytest -q test_monte_carlo.py
+"""
+import numpy as np
+import pytest
+
+from analysis import first_crossing_times
+from monte_carlo import DEFAULT_DISTRIBUTIONS, N_BINS, StreamingHistogram, run_monte_carlo, sample_inputs
+from simulator import DANGER_CO2_PCT, run_simulation_batch
+
+INPUTS = dict(room_volume_m3=30.0, people=4, plants=2, ach=1.0, duration_min=240, dt_min=1.0,
+              light_on=True, model="mass_balance")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _reference(n_draws, seed):
+    """run_monte_carlo가 chunk 하나로 뽑는 것과 같은 표본을 직접 시뮬레이션한 결과"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+    columns = sample_inputs(INPUTS, DEFAULT_DISTRIBUTIONS, n_draws, rng)
+    args = (columns["room_volume_m3"], columns["people"], columns["plants"], columns["ach"],
+            INPUTS["duration_min"], INPUTS["dt_min"], INPUTS["light_on"])
+    batch = run_simulation_batch(*args, model=INPUTS["model"])
+    _, co2_time = first_crossing_times(*args, model=INPUTS["model"])
+    return batch.o2_pct, batch.co2_pct, co2_time
+
+
+def test_streaming_histogram_matches_exact_quantiles():
+    rng = np.random.default_rng(1)
+    values = np.stack([rng.normal(0, 1, 20_000), rng.lognormal(0, 0.5, 20_000)], axis=1)
+    hist = StreamingHistogram.from_sample(values[:1000])
+    for chunk in np.array_split(values, 7):
+        hist.update(chunk)
+    exact = np.percentile(values, PERCENTILES, axis=0)
+    width = (hist.width * 2)[None, :]
+    assert np.all(np.abs(hist.quantiles(PERCENTILES) - exact) <= width)
+    np.testing.assert_allclose(hist.mean(), values.mean(axis=0), rtol=1e-12)
+
+
+def test_histogram_merge_equals_single_pass():
+    rng = np.random.default_rng(2)
+    values = rng.normal(5, 2, (6000, 3))
+    whole = StreamingHistogram([0, 0, 0], [10, 10, 10]).update(values)
+    a = StreamingHistogram([0, 0, 0], [10, 10, 10]).update(values[:2500])
+    b = StreamingHistogram([0, 0, 0], [10, 10, 10]).update(values[2500:])
+    merged = a.merge(b)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    np.testing.assert_allclose(merged.quantiles(PERCENTILES), whole.quantiles(PERCENTILES))
+
+
+def test_histogram_counts_nan_as_never_reached():
+    hist = StreamingHistogram([0.0], [10.0], 100).update(np.array([[1.0], [2.0], [np.nan], [np.nan]]))
+    assert hist.fraction_valid()[0] == pytest.approx(0.5)
+    q = hist.quantiles([25, 90])[:, 0]
+    assert 1.0 <= q[0] <= 1.1 + 1e-12   # 값 1.0이 든 구간 [1.0, 1.1] 안
+    assert np.isnan(q[1])
+
+
+def test_fixed_seed_moments_match_direct_simulation():
+    n_draws = 4000
+    result = run_monte_carlo(INPUTS, n_draws=n_draws, chunk_size=n_draws, seed=7, percentiles=PERCENTILES)
+    o2, co2, co2_time = _reference(n_draws, seed=7)
+    steps = np.round(result.times_min / INPUTS["dt_min"]).astype(int)
+
+    np.testing.assert_allclose(result.o2_mean, o2[:, steps].mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(result.co2_mean, co2[:, steps].mean(axis=0), rtol=1e-12)
+    # 분위수는 히스토그램 구간 두 개 폭 안에서 맞아야 한다 (구간은 표본 범위를 양쪽 25%씩 넓혀 N_BINS로 나눔)
+    for bands, values in ((result.o2_bands, o2), (result.co2_bands, co2)):
+        exact = np.percentile(values[:, steps], PERCENTILES, axis=0)
+        span = values[:, steps].max(axis=0) - values[:, steps].min(axis=0)
+        assert np.all(np.abs(bands - exact) <= 2 * 1.5 * span / N_BINS + 1e-12)
+    assert result.co2_danger_prob == pytest.approx(np.mean(np.isfinite(co2_time)))
+    assert 0 < result.co2_danger_prob < 1
+
+
+def test_same_seed_is_deterministic_and_chunking_is_unbiased():
+    a = run_monte_carlo(INPUTS, n_draws=3000, chunk_size=500, seed=3)
+    b = run_monte_carlo(INPUTS, n_draws=3000, chunk_size=500, seed=3)
+    np.testing.assert_array_equal(a.co2_bands, b.co2_bands)
+    np.testing.assert_array_equal(a.co2_danger_time, b.co2_danger_time, strict=True)
+
+    # 다른 seed/chunk 분할도 같은 분포의 표본이므로 평균은 표준오차 범위 안에서 같다
+    _, co2, _ = _reference(20_000, seed=11)
+    co2_end = co2[:, -1]
+    tolerance = 5 * co2_end.std() / np.sqrt(3000)
+    assert a.co2_mean[-1] == pytest.approx(co2_end.mean(), abs=tolerance)
+    assert a.co2_danger_prob == pytest.approx(np.mean(co2_end > DANGER_CO2_PCT), abs=0.05)
@@ -0,0 +1,85 @@
+"""
+multizone.run_multizone_simulation의 두 풀이 방법을 서로, 그리고 단일 방 물질수지 모델과 비교한다.
+
+    python -m pytest -q test_multizone.py
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from multizone import run_multizone_simulation
+from simulator import run_simulation
+
+VOLUMES = np.array([30.0, 12.0, 80.0, 5.0])
+PEOPLE = np.array([2, 6, 10, 0])
+PLANTS = np.array([0, 3, 20, 5])
+ACH = np.array([0.5, 0.0, 4.0, 1.5])
+LIGHT = np.array([True, True, False, True])
+DURATION, DT = 240, 1.0
+AIRFLOW = np.array([
+    [0, 40, 0, 0],
+    [10, 0, 25, 0],
+    [0, 0, 0, 60],
+    [30, 0, 0, 0],
+], dtype=float)
+
+
+def _run(airflow, method, dt_min=DT, **kwargs):
+    return run_multizone_simulation(VOLUMES, PEOPLE, PLANTS, ACH, airflow, DURATION, dt_min, LIGHT,
+                                    method=method, **kwargs)
+
+
+@pytest.mark.parametrize("method", ["exact", "crank_nicolson"])
+def test_unconnected_zones_match_single_room_model(method):
+    result = _run(np.zeros((4, 4)), method)
+    # Crank-Nicolson은 2차 정확도라 dt = 1분에서 1e-4 정도 다르다
+    atol = 1e-10 if method == "exact" else 1e-4
+    for i in range(4):
+        sim = run_simulation(VOLUMES[i], PEOPLE[i], PLANTS[i], ACH[i], DURATION, DT, LIGHT[i], model="mass_balance")
+        np.testing.assert_array_equal(result[i].times_min, sim.times_min)
+        np.testing.assert_allclose(result[i].o2_pct, sim.o2_pct, rtol=0, atol=atol)
+        np.testing.assert_allclose(result[i].co2_pct, sim.co2_pct, rtol=0, atol=atol)
+
+
+def test_crank_nicolson_converges_to_exact_at_second_order():
+    errors = []
+    for dt_min in (1.0, 0.5, 0.25):
+        exact = _run(AIRFLOW, "exact", dt_min)
+        cn = _run(AIRFLOW, "crank_nicolson", dt_min)
+        errors.append(max(np.abs(cn.o2_pct - exact.o2_pct).max(), np.abs(cn.co2_pct - exact.co2_pct).max()))
+    assert errors[0] < 1e-4
+    # dt를 절반으로 줄이면 오차가 약 1/4
+    for coarse, fine in zip(errors, errors[1:]):
+        assert 3.5 < coarse / fine < 4.5
+
+
+def test_closed_loop_conserves_co2_mass():
+    # 외기 환기와 발생원이 없고 공기가 방 사이에서만 돌면 CO2 총량(부피 가중 합)이 일정하다
+    airflow = np.array([[0, 50, 0], [0, 0, 50], [50, 0, 0]], dtype=float)
+    volumes = np.array([20.0, 40.0, 10.0])
+    result = run_multizone_simulation(volumes, 0, 0, 0.0, airflow, 120, 0.5, False,
+                                      co2_start=np.array([0.2, 0.04, 0.08]))
+    total = volumes @ result.co2_pct
+    np.testing.assert_allclose(total, total[0], rtol=1e-10)
+    # 충분히 지나면 모든 방이 같은 농도로 섞인다
+    np.testing.assert_allclose(result.co2_pct[:, -1], total[0] / volumes.sum(), rtol=1e-3)
+
+
+def test_sparse_airflow_and_zone_lookup():
+    import scipy.sparse as sp
+
+    dense = _run(AIRFLOW, "exact", zone_names=["a", "b", "c", "d"])
+    sparse = _run(sp.csr_matrix(AIRFLOW), "exact", zone_names=["a", "b", "c", "d"])
+    np.testing.assert_allclose(sparse.co2_pct, dense.co2_pct)
+    assert dense.zone("b").params["zone"] == "b"
+    np.testing.assert_array_equal(dense.zone("b").co2_pct, dense.co2_pct[1])
+
+
+def test_invalid_inputs():
+    with pytest.raises(ValueError):
+        _run(np.zeros((3, 3)), "exact")
+    with pytest.raises(ValueError):
+        _run(-np.ones((4, 4)), "exact")
+    with pytest.raises(ValueError):
+        _run(np.zeros((4, 4)), "euler")
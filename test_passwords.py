@@ -0,0 +1,101 @@
+"""
+비밀번호 해시 검증과 users.json 이전을 확인한다.
+
+    python -m pytest -q test_passwords.py
+"""
+import json
+import sqlite3
+
+import pytest
+
+import passwords
+from passwords import hash_password, is_hashed, verify_password
+from user_store import UserStore
+
+# 테스트에서는 작업량을 낮춰 빠르게 돈다
+FAST = {"scrypt": 10, "pbkdf2_sha256": 1000}
+
+
+@pytest.mark.parametrize("scheme", ["scrypt", "pbkdf2_sha256"])
+def test_hash_roundtrip_and_rehash(scheme):
+    stored = hash_password("correct horse", scheme=scheme, cost=FAST[scheme])
+    assert is_hashed(stored)
+    assert verify_password(stored, "correct horse", scheme=scheme, cost=FAST[scheme]) == (True, False)
+    assert verify_password(stored, "wrong", scheme=scheme, cost=FAST[scheme]) == (False, False)
+    # 설정(작업량)이 바뀌면 로그인에 성공했을 때 다시 해시해야 한다
+    assert verify_password(stored, "correct horse", scheme=scheme, cost=FAST[scheme] + 1) == (True, True)
+
+
+def test_plaintext_is_accepted_once_and_marked_for_rehash():
+    assert verify_password("1234", "1234", cost=FAST["scrypt"]) == (True, True)
+    assert verify_password("1234", "12345", cost=FAST["scrypt"]) == (False, False)
+
+
+def test_missing_user_verifies_a_dummy_hash(monkeypatch):
+    calls = []
+    original = passwords._scrypt
+    monkeypatch.setattr(passwords, "_scrypt", lambda *args: calls.append(args) or original(*args))
+    assert verify_password(None, "anything", cost=FAST["scrypt"]) == (False, False)
+    # 더미 해시를 실제로 계산해 검증한다 (처음에는 더미 해시를 만드는 호출도 있다)
+    assert len(calls) >= 1
+    calls.clear()
+    verify_password(None, "anything", cost=FAST["scrypt"])
+    assert len(calls) == 1
+
+
+def test_argon2_falls_back_to_scrypt_when_not_installed(monkeypatch):
+    monkeypatch.setattr(passwords, "_argon2_available", lambda: False)
+    stored = hash_password("pw", scheme="argon2", cost=3)
+    assert stored.startswith(f"scrypt${passwords.DEFAULT_COSTS['scrypt']}$")
+    assert verify_password(stored, "pw", scheme="argon2", cost=3) == (True, False)
+
+
+def test_argon2_hash_without_library_fails_closed(monkeypatch):
+    monkeypatch.setattr(passwords, "_argon2_available", lambda: False)
+    stored = "$argon2id$v=19$m=65536,t=3,p=4$c2FsdHNhbHRzYWx0$aGFzaGhhc2hoYXNoaGFzaGhhc2g"
+    assert verify_password(stored, "pw", cost=FAST["scrypt"]) == (False, False)
+
+
+def test_migration_hashes_users_json_and_keeps_a_backup(tmp_path, monkeypatch):
+    monkeypatch.setattr("user_store.hash_password",
+                        lambda password: hash_password(password, cost=FAST["scrypt"]))
+    json_path = tmp_path / "users.json"
+    json_path.write_text(json.dumps({"alice": {"password": "1234"}, "bob": {"password": "pw"}}))
+    db_path = tmp_path / "users.db"
+
+    store = UserStore(str(db_path), json_path=str(json_path))
+    assert not json_path.exists()
+    assert (tmp_path / "users.json.bak").exists()
+    rows = dict(sqlite3.connect(db_path).execute("SELECT user, password FROM users"))
+    assert set(rows) == {"alice", "bob"}
+    assert all(is_hashed(p) for p in rows.values())
+    assert verify_password(store.get_password("alice"), "1234", cost=FAST["scrypt"])[0]
+
+
+def test_json_added_after_migration_is_left_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr("user_store.hash_password",
+                        lambda password: hash_password(password, cost=FAST["scrypt"]))
+    db_path = tmp_path / "users.db"
+    json_path = tmp_path / "users.json"
+    UserStore(str(db_path), json_path=str(json_path))
+    # 이전이 끝난 DB를 다시 열 때 나중에 놓인 users.json은 지우지 않는다
+    json_path.write_text(json.dumps({"dave": {"password": "pw"}}))
+    UserStore(str(db_path), json_path=str(json_path))
+    assert json_path.exists()
+
+
+def test_plaintext_rows_from_earlier_migration_are_hashed(tmp_path, monkeypatch):
+    monkeypatch.setattr("user_store.hash_password",
+                        lambda password: hash_password(password, cost=FAST["scrypt"]))
+    db_path = tmp_path / "users.db"
+    UserStore(str(db_path), json_path="")
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO users VALUES ('carol', 'plain', 0)")
+        conn.execute("DELETE FROM meta WHERE key = 'plaintext_hashed'")
+    conn.close()
+
+    store = UserStore(str(db_path), json_path="")
+    stored = store.get_password("carol")
+    assert is_hashed(stored)
+    assert verify_password(stored, "plain", cost=FAST["scrypt"])[0]
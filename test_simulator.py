@@ -0,0 +1,138 @@
+"""
+벡터화한 시뮬레이션 커널이 시점마다 한 번씩 계산하던 반복문 구현과 같은 값을 내는지,
+시뮬레이션 캐시가 크기 제한과 이어서 계산하기를 지키는지 확인한다.
+
+    python -m pytest -q test_simulator.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from simulator import (
+    BASE_CO2_PCT,
+    BASE_O2_PCT,
+    SimulationCache,
+    _linear_model,
+    _mass_balance_model,
+    _mass_balance_rates,
+    run_simulation,
+)
+
+# (room_volume_m3, people, plants, ach, duration_min, dt_min, light_on)
+PARAMS = [
+    (30.0, 2, 0, 0.5, 180, 1, True),
+    (12.0, 6, 3, 0.0, 60, 2, True),
+    (80.0, 10, 20, 4.0, 600, 5, False),
+    (5.0, 0, 5, 1.5, 45, 1, True),
+    (200.0, 3, 0, 12.0, 1440, 10, False),
+]
+ATOL = 1e-12
+
+
+def _loop_linear(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on):
+    """기준선 run_simulation의 시점별 반복문 (정수 dt_min)"""
+    times_min = list(range(0, int(duration_min) + 1, int(dt_min)))
+    o2_pct, co2_pct = [], []
+    for t in times_min:
+        o2_drop = people * 0.01 * t / duration_min
+        co2_rise = people * 0.005 * t / duration_min
+        ventilation_factor = max(1 - ach * t / (duration_min * 60), 0.5)
+        if light_on and plants > 0:
+            o2_increase = plants * 0.005 * t / duration_min
+            co2_decrease = plants * 0.003 * t / duration_min
+        else:
+            o2_increase = 0
+            co2_decrease = 0
+        o2_pct.append(max((21.0 - o2_drop + o2_increase) * ventilation_factor, 10))
+        co2_pct.append(max((0.04 + co2_rise - co2_decrease) * ventilation_factor, 0))
+    return np.array(times_min, dtype=float), np.array(o2_pct), np.array(co2_pct)
+
+
+def _loop_mass_balance(room_volume_m3, people, plants, ach, duration_min, dt_min, light_on):
+    """물질수지 모델을 스텝마다 한 스텝 해석해로 진행하는 반복문"""
+    o2_rate, co2_rate = (float(r) for r in _mass_balance_rates(room_volume_m3, people, plants, light_on))
+    lam = ach / 60.0
+    decay = math.exp(-lam * dt_min)
+    growth = -math.expm1(-lam * dt_min) / lam if lam > 0 else dt_min
+    o2, co2 = BASE_O2_PCT, BASE_CO2_PCT
+    o2_pct, co2_pct = [o2], [co2]
+    for _ in range(int(duration_min // dt_min)):
+        o2 = BASE_O2_PCT + (o2 - BASE_O2_PCT) * decay + o2_rate * growth
+        co2 = BASE_CO2_PCT + (co2 - BASE_CO2_PCT) * decay + co2_rate * growth
+        o2_pct.append(o2)
+        co2_pct.append(co2)
+    return np.maximum(o2_pct, 0), np.maximum(co2_pct, 0)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_linear_matches_loop(params):
+    times, o2_ref, co2_ref = _loop_linear(*params)
+    room_volume_m3, people, plants, ach, duration_min, dt_min, light_on = params
+    o2, co2 = _linear_model(times, room_volume_m3, people, plants, ach, duration_min, light_on)
+    np.testing.assert_allclose(o2, o2_ref, rtol=0, atol=ATOL)
+    np.testing.assert_allclose(co2, co2_ref, rtol=0, atol=ATOL)
+
+    sim = run_simulation(*params)
+    np.testing.assert_array_equal(sim.times_min, times)
+    np.testing.assert_allclose(sim.o2_pct, o2_ref, rtol=0, atol=ATOL)
+    np.testing.assert_allclose(sim.co2_pct, co2_ref, rtol=0, atol=ATOL)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_mass_balance_matches_loop(params):
+    o2_ref, co2_ref = _loop_mass_balance(*params)
+    sim = run_simulation(*params, model="mass_balance")
+    assert len(sim.times_min) == len(o2_ref)
+    # 반복문은 스텝마다 반올림 오차가 쌓이므로 해석해와 약간 다를 수 있다
+    np.testing.assert_allclose(sim.o2_pct, o2_ref, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(sim.co2_pct, co2_ref, rtol=0, atol=1e-9)
+
+
+def test_mass_balance_kernel_broadcasts_over_scenarios():
+    times = np.arange(0, 121, 1.0)
+    volume = np.array([[10.0], [50.0]])
+    ach = np.array([[0.0], [2.0]])
+    o2, co2 = _mass_balance_model(times, volume, 4, 2, ach, 120, True)
+    for i in range(2):
+        o2_ref, co2_ref = _loop_mass_balance(volume[i, 0], 4, 2, ach[i, 0], 120, 1, True)
+        np.testing.assert_allclose(o2[i], o2_ref, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(co2[i], co2_ref, rtol=0, atol=1e-9)
+
+
+def test_fractional_dt_keeps_last_point():
+    sim = run_simulation(30.0, 2, 0, 0.5, 1.0, 0.1, True)
+    assert len(sim.times_min) == 11
+    assert sim.times_min[-1] == pytest.approx(1.0)
+
+
+def _inputs(**overrides):
+    return dict(dict(room_volume_m3=30.0, people=2, plants=0, ach=0.5, duration_min=30, dt_min=1.0,
+                     light_on=True, model="mass_balance"), **overrides)
+
+
+def test_cache_evicts_resume_prefixes_with_entries():
+    cache = SimulationCache(max_entries=16)
+    for i in range(200):
+        cache.get_or_run(_inputs(room_volume_m3=10.0 + i))
+    stats = cache.stats()
+    assert stats["entries"] == 16
+    assert stats["prefixes"] == 16
+
+
+def test_cache_resumes_from_shorter_result():
+    cache = SimulationCache()
+    cache.get_or_run(_inputs(duration_min=30))
+    longer = cache.get_or_run(_inputs(duration_min=90))
+    ref = run_simulation(**_inputs(duration_min=90))
+    np.testing.assert_allclose(longer.co2_pct, ref.co2_pct, rtol=0, atol=1e-12)
+
+
+def test_put_result_registers_stored_result():
+    cache = SimulationCache(max_entries=2)
+    stored = run_simulation(**_inputs())
+    cache.put_result(stored)
+    assert cache.get_or_run(_inputs()) is stored
+    cache.get_or_run(_inputs(people=3))
+    cache.get_or_run(_inputs(people=4))
+    assert cache.stats()["prefixes"] == 2
@@ -0,0 +1,71 @@
+"""
+sweep.SweepEngine의 이분 탐색 경계를 촘촘한 격자 전수 탐색과 비교한다.
+
+    python -m pytest -q test_sweep.py
+"""
+import numpy as np
+import pytest
+
+from simulator import run_simulation
+from sweep import SweepEngine
+
+BASE = dict(room_volume_m3=30.0, people=4, plants=0, ach=0.5, duration_min=240, dt_min=1.0, light_on=True)
+
+
+def _brute_force_min(engine, base, param, grid):
+    """grid 중 기준을 지키는 가장 작은 값 (없으면 NaN)"""
+    result = engine.grid_search(base, {param: grid})
+    feasible = result.map()
+    return grid[np.argmax(feasible)] if feasible.any() else np.nan
+
+
+@pytest.mark.parametrize("people", [1, 2, 4, 8])
+def test_min_ach_matches_brute_force_grid(people):
+    engine = SweepEngine()
+    base = dict(BASE, people=people)
+    tol = 0.01
+    grid = np.arange(0.0, 10.0, 0.002)
+    expected = _brute_force_min(engine, base, "ach", grid)
+    assert 0.0 < expected < 10.0
+    found = engine.find_boundary(base, "ach", 0.0, 10.0, tol=tol)[0]
+    assert found == pytest.approx(expected, abs=tol + 0.002)
+    # 찾은 값은 기준을 지키는 쪽이어야 한다
+    assert engine.is_feasible(*engine.evaluate(engine.columns(base, ach=found)))[0]
+
+
+def test_batched_boundary_matches_per_scenario_search():
+    engine = SweepEngine()
+    people = np.array([1, 3, 6, 12, 25])
+    batched = engine.find_boundary(BASE, "ach", 0.0, 10.0, tol=0.005, people=people)
+    single = [SweepEngine().find_boundary(dict(BASE, people=int(p)), "ach", 0.0, 10.0, tol=0.005)[0]
+              for p in people]
+    np.testing.assert_allclose(batched, single, equal_nan=True)
+
+
+def test_integer_boundary_is_exact():
+    engine = SweepEngine()
+    base = dict(BASE, ach=1.0)
+    grid = np.arange(0, 60)
+    result = engine.grid_search(base, {"people": grid})
+    expected = grid[result.map()].max()
+    assert engine.find_boundary(base, "people", 0, 59)[0] == expected
+
+
+def test_unreachable_and_already_feasible():
+    engine = SweepEngine()
+    # 사람이 많고 방이 작으면 상한까지 환기해도 기준을 지킬 수 없다
+    assert np.isnan(engine.find_boundary(dict(BASE, people=200, room_volume_m3=5.0), "ach", 0.0, 1.0)[0])
+    # 아무도 없으면 환기가 없어도 기준을 지킨다
+    assert engine.find_boundary(dict(BASE, people=0), "ach", 0.0, 10.0)[0] == 0.0
+
+
+def test_evaluate_matches_run_simulation_and_caches():
+    engine = SweepEngine()
+    achs = np.array([0.2, 1.0, 3.0])
+    o2_min, co2_max = engine.evaluate(engine.columns(BASE, ach=achs))
+    for ach, o2, co2 in zip(achs, o2_min, co2_max):
+        sim = run_simulation(**dict(BASE, ach=ach), model="mass_balance")
+        assert o2 == pytest.approx(sim.o2_pct.min(), abs=1e-12)
+        assert co2 == pytest.approx(sim.co2_pct.max(), abs=1e-12)
+    engine.evaluate(engine.columns(BASE, ach=achs))
+    assert engine.stats() == {"hits": 3, "misses": 3, "entries": 3}
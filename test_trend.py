@@ -0,0 +1,103 @@
+"""
+trend의 구간별 미분/이동 기울기를 구간마다 따로 계산한 NumPy 기준값과 비교한다.
+
+    python -m pytest -q test_trend.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from trend import analyze_trends, rolling_slope, segment_gradient, trend_report
+
+
+def _segment_index(lengths):
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    ends = starts + lengths
+    seg_id = np.repeat(np.arange(len(lengths)), lengths)
+    return starts, ends, starts[seg_id], ends[seg_id]
+
+
+def test_segment_gradient_matches_np_gradient_per_segment():
+    rng = np.random.default_rng(0)
+    lengths = np.array([7, 1, 12, 2])
+    times = np.cumsum(rng.uniform(0.1, 2.0, lengths.sum()))
+    values = rng.normal(size=(2, lengths.sum()))
+    starts, ends, seg_start, seg_end = _segment_index(lengths)
+
+    grad = segment_gradient(values, times, seg_start, seg_end)
+    for s, e in zip(starts, ends):
+        if e - s == 1:
+            assert np.all(np.isnan(grad[:, s]))
+        else:
+            np.testing.assert_allclose(grad[:, s:e], np.gradient(values[:, s:e], times[s:e], axis=1), rtol=1e-12)
+
+
+def test_rolling_slope_matches_polyfit_windows():
+    rng = np.random.default_rng(1)
+    lengths = np.array([9, 6])
+    times = np.cumsum(rng.uniform(0.5, 1.5, lengths.sum()))
+    values = rng.normal(size=(1, lengths.sum()))
+    _, _, seg_start, _ = _segment_index(lengths)
+    window = 4
+
+    slope = rolling_slope(values, times, seg_start, window)
+    for i in range(len(times)):
+        lo = max(seg_start[i], i - window + 1)
+        if i - lo + 1 < 2:
+            assert np.isnan(slope[0, i])
+        else:
+            expected = np.polyfit(times[lo:i + 1], values[0, lo:i + 1], 1)[0]
+            assert slope[0, i] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_rolling_slope_keeps_precision_on_long_offset_series():
+    # 큰 시간 값과 긴 시계열에서도 기울기가 정확해야 한다 (누적합 방식은 자릿수를 잃었다)
+    times = 1e7 + np.arange(200_000, dtype=float) * 0.1
+    values = (20.9 + 1e-6 * (times - times[0]))[None, :]
+    slope = rolling_slope(values, times, np.zeros(len(times), dtype=int), 5)
+    np.testing.assert_allclose(slope[0, 1:], 1e-6, rtol=1e-6)
+
+
+def _frame():
+    t_sim = np.arange(0.0, 30.0, 1.0)
+    t_pred = 30.0 + np.cumsum(np.full(20, 0.5))
+    return pd.DataFrame({
+        "time": np.concatenate([t_sim, t_pred]),
+        # 시뮬레이션 구간은 감소, 예측 구간은 증가하는 O2 / 계속 증가하는 CO2
+        "oxygen": np.concatenate([21.0 - 0.01 * t_sim, 20.7 + 0.004 * (t_pred - 30.0)]),
+        "co2": np.concatenate([0.04 + 0.002 * t_sim, 0.1 + 0.002 * (t_pred - 30.0)]),
+        "type": ["simulated"] * 30 + ["predicted"] * 20,
+    })
+
+
+def test_analyze_trends_group_stats_do_not_cross_segments():
+    result = analyze_trends(_frame())
+    assert [g[0] for g in result.groups] == ["simulated", "predicted"]
+    sim, pred = result.group_stats["simulated"], result.group_stats["predicted"]
+    assert sim["oxygen"]["mean_rate"] == pytest.approx(-0.01)
+    assert pred["oxygen"]["mean_rate"] == pytest.approx(0.004)
+    assert sim["oxygen"]["trend"] == "감소"
+    assert pred["oxygen"]["trend"] == "증가"
+    assert sim["co2"]["slope"] == pytest.approx(0.002)
+    assert abs(sim["co2"]["mean_accel"]) < 1e-12
+    # 구간 경계의 값 점프는 구간 안의 추세 전환으로 잡히지 않는다
+    assert result.regime_changes == []
+    assert "O₂ (%) 트렌드 분석" in trend_report(result)
+
+
+def test_analyze_trends_detects_regime_change_within_segment():
+    t = np.arange(0.0, 60.0, 1.0)
+    df = pd.DataFrame({
+        "time_min": t,
+        "O2 (%)": np.where(t < 30, 21.0 - 0.01 * t, 20.7),
+        "CO2 (%)": 0.04 + 0.002 * t,
+    })
+    result = analyze_trends(df, window=3)
+    changes = [c for c in result.regime_changes if c["gas"] == "O2 (%)"]
+    assert [(c["from"], c["to"]) for c in changes] == [("감소", "안정")]
+    assert 30 <= changes[0]["time"] <= 32
+
+
+def test_analyze_trends_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        analyze_trends(pd.DataFrame({"t": [0, 1], "x": [1, 2]}))
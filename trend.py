@@ -0,0 +1,228 @@
+"""
+농도 시계열 추세 분석.
+시뮬레이션 + 예측을 이어 붙인 표처럼 시간 간격이 고르지 않고 구간(type)마다 성격이 다른 데이터에서
+모든 기체의 변화율, 가속도, 이동 회귀 기울기, 추세 전환 시점을 (K, T) 배열 연산 한 번으로 구한다.
+미분과 이동 기울기는 type 구간 경계를 넘지 않는다 (경계에서는 한쪽 차분).
+입력 DataFrame은 복사하거나 열을 추가하지 않고 필요한 열만 배열로 읽는다.
+"""
+import numpy as np
+
+from analysis import _slope_from_sums
+
+# (시간 열, 기체 열 목록) 후보: prediction.run_prediction_ai 결과와 시뮬레이터 표 형식
+COLUMN_LAYOUTS = (
+    ("time", ("oxygen", "co2")),
+    ("time_min", ("O2 (%)", "CO2 (%)")),
+)
+GAS_LABELS = ("O₂ (%)", "CO₂ (%)")
+
+# 추세 판정 기준 (%/분, %/분²)
+RATE_TOL = 0.0005
+ACCEL_TOL = 0.0002
+TREND_NAMES = {1: "증가", -1: "감소", 0: "안정"}
+
+
+class TrendResult:
+    """
+    times (T,), values/rate/accel/slope (K, T), groups: type 구간별 (라벨, 시작, 끝) 목록.
+    group_stats[라벨][기체] = 평균 변화율/가속도/회귀 기울기, regime_changes = 추세 전환 목록.
+    """
+    def __init__(self, times, gases, values, rate, accel, slope, groups, group_stats, regime_changes):
+        self.times = times
+        self.gases = gases
+        self.values = values
+        self.rate = rate
+        self.accel = accel
+        self.slope = slope
+        self.groups = groups
+        self.group_stats = group_stats
+        self.regime_changes = regime_changes
+
+
+def resolve_columns(df):
+    """df에서 쓸 (시간 열, 기체 열 목록), 맞는 형식이 없으면 None"""
+    for time_col, gas_cols in COLUMN_LAYOUTS:
+        if time_col in df.columns and all(c in df.columns for c in gas_cols):
+            return time_col, gas_cols
+    return None
+
+
+def _segments(labels, n_rows):
+    """연속된 같은 라벨 구간의 (시작 인덱스 배열, 끝 인덱스 배열, 구간 라벨)"""
+    if labels is None:
+        return np.array([0]), np.array([n_rows]), [None]
+    labels = np.asarray(labels)
+    n = len(labels)
+    if n == 0:
+        return np.array([0]), np.array([0]), [None]
+    starts = np.concatenate([[0], np.flatnonzero(labels[1:] != labels[:-1]) + 1])
+    ends = np.concatenate([starts[1:], [n]])
+    return starts, ends, [labels[s] for s in starts]
+
+
+def segment_gradient(values, times, seg_start, seg_end):
+    """
+    고르지 않은 시간 격자에서 (K, T) 값의 시간 미분.
+    내부 점은 np.gradient와 같은 2차 정확도 중심 차분, 구간의 첫/끝 점은 1차 한쪽 차분,
+    점이 하나뿐인 구간은 NaN.
+    seg_start/seg_end: (T,) 각 점이 속한 구간의 시작 인덱스와 (끝 인덱스 + 1)
+    """
+    k, n = values.shape
+    grad = np.full((k, n), np.nan)
+    if n < 2:
+        return grad
+    idx = np.arange(n)
+    h = np.diff(times)                # h[i] = t[i+1] - t[i]
+    dy = np.diff(values, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        forward = dy / h               # (K, T-1): i -> i+1
+        is_first = idx == seg_start
+        is_last = idx == seg_end - 1
+
+        interior = ~is_first & ~is_last
+        i = idx[interior]
+        if i.size:
+            hs, hd = h[i - 1], h[i]
+            grad[:, i] = (hs ** 2 * values[:, i + 1] + (hd ** 2 - hs ** 2) * values[:, i]
+                          - hd ** 2 * values[:, i - 1]) / (hs * hd * (hs + hd))
+        first = idx[is_first & ~is_last]
+        grad[:, first] = forward[:, first]
+        last = idx[is_last & ~is_first]
+        grad[:, last] = forward[:, last - 1]
+    return grad
+
+
+def rolling_slope(values, times, seg_start, window):
+    """
+    각 점에서 끝나는 최근 window개 점(같은 구간 안에서만)의 1차 회귀 기울기 (K, T).
+    창 안의 j번째 앞 점들을 배열째로 밀어 가며 회귀 합계를 누적한다 (window번의 배열 연산).
+    합계는 각 점 기준의 상대 시간/값으로 쌓아 긴 시계열에서도 자릿수 손실이 없다.
+    구간의 첫 점은 NaN.
+    """
+    n = values.shape[1]
+    idx = np.arange(n)
+    count = np.zeros(n)
+    sum_t = np.zeros(n)
+    sum_tt = np.zeros(n)
+    sum_y = np.zeros_like(values, dtype=float)
+    sum_ty = np.zeros_like(values, dtype=float)
+    for j in range(window):
+        src = idx - j
+        valid = src >= seg_start
+        src = np.where(valid, src, idx)
+        dt = times[src] - times
+        dy = values[:, src] - values
+        count += valid
+        sum_t += dt
+        sum_tt += dt * dt
+        sum_y += dy
+        sum_ty += dt * dy
+    slope = _slope_from_sums(count, sum_t, sum_tt, sum_y, sum_ty)
+    slope[:, count < 2] = np.nan
+    return slope
+
+
+def _classify(x, tol):
+    return np.where(x > tol, 1, np.where(x < -tol, -1, 0))
+
+
+def analyze_trends(df, group_col="type", window=5, rate_tol=RATE_TOL, accel_tol=ACCEL_TOL):
+    """
+    df의 모든 기체 열에 대한 추세 분석 (TrendResult). 맞는 열이 없으면 ValueError.
+    행은 시간 순서로 정렬되어 있다고 가정한다.
+    """
+    columns = resolve_columns(df)
+    if columns is None:
+        raise ValueError(f"시간/기체 컬럼을 찾을 수 없습니다. (가능한 형식: {COLUMN_LAYOUTS})")
+    time_col, gas_cols = columns
+    times = df[time_col].to_numpy(dtype=float)
+    values = np.stack([df[c].to_numpy(dtype=float) for c in gas_cols])
+
+    starts, ends, labels = _segments(df[group_col].to_numpy() if group_col in df.columns else None, len(df))
+    lengths = ends - starts
+    seg_id = np.repeat(np.arange(len(starts)), lengths)
+    seg_start = starts[seg_id]
+    seg_end = ends[seg_id]
+
+    rate = segment_gradient(values, times, seg_start, seg_end)
+    accel = segment_gradient(rate, times, seg_start, seg_end)
+    slope = rolling_slope(values, times, seg_start, window)
+
+    # 구간별 평균 (NaN 제외)을 reduceat으로 한 번에 구한 뒤 같은 라벨끼리 합친다
+    label_names = list(dict.fromkeys(labels))
+    label_idx = np.array([label_names.index(label) for label in labels])
+
+    def grouped_mean(x):
+        valid = np.isfinite(x)
+        sums = np.add.reduceat(np.where(valid, x, 0.0), starts, axis=1)
+        counts = np.add.reduceat(valid, starts, axis=1)
+        total = np.zeros((x.shape[0], len(label_names)))
+        count = np.zeros((x.shape[0], len(label_names)))
+        np.add.at(total.T, label_idx, sums.T)
+        np.add.at(count.T, label_idx, counts.T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return total / count
+
+    mean_rate = grouped_mean(rate)
+    mean_accel = grouped_mean(accel)
+    group_stats = {}
+    for j, label in enumerate(label_names):
+        in_label = label_idx[seg_id] == j
+        t_sel = times[in_label]
+        group_stats[label] = {}
+        for g, gas in enumerate(gas_cols):
+            y_sel = values[g, in_label]
+            overall_slope = _slope_from_sums(len(t_sel), t_sel.sum(), (t_sel * t_sel).sum(),
+                                             y_sel.sum(), (t_sel * y_sel).sum())
+            group_stats[label][gas] = {
+                "mean_rate": float(mean_rate[g, j]),
+                "mean_accel": float(mean_accel[g, j]),
+                "slope": float(overall_slope),
+                "trend": TREND_NAMES[int(_classify(mean_rate[g, j], rate_tol))],
+                "accel_trend": int(_classify(mean_accel[g, j], accel_tol)),
+            }
+
+    # 추세 전환: 이동 기울기로 판정한 증가/감소/안정 상태가 같은 구간 안에서 바뀌는 점
+    state = _classify(slope, rate_tol)
+    defined = np.isfinite(slope)
+    changed = np.zeros_like(state, dtype=bool)
+    changed[:, 1:] = ((state[:, 1:] != state[:, :-1]) & defined[:, 1:] & defined[:, :-1]
+                      & (seg_id[1:] == seg_id[:-1]))
+    regime_changes = [
+        {
+            "gas": gas_cols[g],
+            "group": labels[seg_id[i]],
+            "time": float(times[i]),
+            "from": TREND_NAMES[int(state[g, i - 1])],
+            "to": TREND_NAMES[int(state[g, i])],
+        }
+        for g, i in zip(*np.nonzero(changed))
+    ]
+    regime_changes.sort(key=lambda c: c["time"])
+
+    groups = [(label, int(s), int(e)) for label, s, e in zip(labels, starts, ends)]
+    return TrendResult(times, gas_cols, values, rate, accel, slope, groups, group_stats, regime_changes)
+
+
+_ACCEL_TEXT = {1: "변화 속도가 점점 빨라짐", -1: "변화 속도가 점점 느려짐", 0: "변화 속도 일정"}
+
+
+def trend_report(result, max_changes=10):
+    """TrendResult를 마크다운 텍스트 리포트로"""
+    lines = []
+    for g, gas in enumerate(result.gases):
+        label = GAS_LABELS[g] if g < len(GAS_LABELS) else gas
+        lines.append(f"\n**{label} 트렌드 분석**")
+        for group, stats in result.group_stats.items():
+            name = f" ({group})" if group is not None else ""
+            lines.append(
+                f"- 평균 변화율{name}: {stats[gas]['mean_rate']:.4f} %/분, "
+                f"평균 가속도: {stats[gas]['mean_accel']:.5f} %/분², "
+                f"경향: {stats[gas]['trend']} 추세, {_ACCEL_TEXT[stats[gas]['accel_trend']]}"
+            )
+        changes = [c for c in result.regime_changes if c["gas"] == gas]
+        for c in changes[:max_changes]:
+            lines.append(f"- {c['time']:.1f}분: {c['from']} → {c['to']} 추세 전환")
+        if len(changes) > max_changes:
+            lines.append(f"- … 외 {len(changes) - max_changes}건의 추세 전환")
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+"""
+SQLite 기반 사용자 저장소.
+가입할 때 users.json 전체를 다시 쓰지 않고 한 행만 추가하며,
+아이디가 기본 키이므로 여러 세션/프로세스가 동시에 가입해도 사용자가 사라지거나 중복되지 않는다.
+조회한 사용자는 메모리 dict에 두어 로그인마다 파일을 다시 읽지 않는다.
+처음 열 때 기존 users.json을 해시해서 한 번 옮겨 오고, 옮긴 파일은 users.json.bak으로 이름을 바꿔 둔다.
+
+    users  user -> 비밀번호 해시 (passwords.hash_password 형식)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from passwords import hash_password, is_hashed
+
+USER_DB = "users.db"
+USER_JSON = "users.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _hashed(password):
+    return password if is_hashed(password) else hash_password(password)
+
+
+class UserStore:
+    """
+    스레드마다 연결을 따로 열고 WAL 모드로 동작한다.
+    _cache에는 DB에서 확인한 사용자 -> 비밀번호 해시를 둔다.
+    해시는 같은 비밀번호를 다시 해시할 때만 바뀌므로 다른 프로세스의 캐시가 예전 해시를 들고 있어도 검증 결과는 같다.
+    """
+    def __init__(self, path=USER_DB, json_path=USER_JSON):
+        self.path = path
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.migrate_json(json_path)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def migrate_json(self, json_path=USER_JSON):
+        """
+        기존 users.json을 한 번만 해시해서 옮겨 온다 (이미 DB에 있는 아이디는 건드리지 않음).
+        예전에 평문 그대로 옮겨 온 행도 해시로 바꾼다.
+        이번 호출에서 옮겨 온 파일만 <json_path>.bak으로 이름을 바꾸고, 이미 이전이 끝난 DB에서는 파일을 건드리지 않는다.
+        """
+        conn = self._connect()
+        migrated = 0
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            users = {}
+            try:
+                if json_path:
+                    with open(json_path, "r") as f:
+                        users = json.load(f)
+            except FileNotFoundError:
+                pass
+            now = time.time()
+            rows = [(user, _hashed(record["password"]), now) for user, record in users.items()]
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO users (user, password, created_at) VALUES (?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(now),))
+            migrated = len(users)
+            if json_path and users:
+                try:
+                    os.replace(json_path, json_path + ".bak")
+                except FileNotFoundError:
+                    pass   # 다른 프로세스가 먼저 옮김
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'plaintext_hashed'").fetchone():
+            plain = [(user, password) for user, password in conn.execute("SELECT user, password FROM users")
+                     if not is_hashed(password)]
+            with conn:
+                conn.executemany("UPDATE users SET password = ? WHERE user = ? AND password = ?",
+                                 [(hash_password(password), user, password) for user, password in plain])
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('plaintext_hashed', ?)",
+                             (str(time.time()),))
+        return migrated
+
+    def get_password(self, user):
+        """저장된 비밀번호, 없는 아이디면 None"""
+        with self._cache_lock:
+            if user in self._cache:
+                return self._cache[user]
+        # 다른 프로세스에서 가입했을 수 있으므로 캐시에 없으면 DB를 확인한다
+        row = self._connect().execute("SELECT password FROM users WHERE user = ?", (user,)).fetchone()
+        if row is None:
+            return None
+        with self._cache_lock:
+            self._cache[user] = row[0]
+        return row[0]
+
+    def exists(self, user):
+        return self.get_password(user) is not None
+
+    def add(self, user, password):
+        """새 사용자를 추가한다. 이미 있는 아이디면 False (확인과 추가가 한 번의 INSERT로 이루어진다)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (user, password, created_at) VALUES (?, ?, ?)",
+                    (user, password, time.time()),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        with self._cache_lock:
+            self._cache[user] = password
+        return True
+
+    def set_password(self, user, password):
+        """저장된 비밀번호(해시)를 바꾼다"""
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE users SET password = ? WHERE user = ?", (password, user))
+        with self._cache_lock:
+            self._cache[user] = password
+
+    def users(self):
+        """전체 사용자 dict (users.json과 같은 형식)"""
+        rows = self._connect().execute("SELECT user, password FROM users").fetchall()
+        return {user: {"password": password} for user, password in rows}
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+_DEFAULT_STORE = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def get_user_store():
+    """프로세스 전역 저장소 (처음 사용할 때 열고 users.json을 옮겨 온다)"""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = UserStore()
+        return _DEFAULT_STORE